@@ -1,2 +1,13 @@
 from scripts.series_turbine import series_tubine
-from scripts.turbine_base_model import TurbineBase
\ No newline at end of file
+from scripts.turbine_base_model import TurbineBase
+from scripts.turbine_network import build_turbine_network, initialize_turbine_network
+from scripts.site_model import build_site_model, set_site_inputs, solve_site
+from scripts.scenario_engine import ScenarioEngine
+from scripts.parallel_runner import ParallelScenarioRunner
+from scripts.warm_start import WarmStartCache
+from scripts.result_cache import ResultCache
+from scripts.steam_tables import SteamTables
+from scripts.results_store import ResultsStore, read_results
+from scripts.stochastic import ProgressiveHedging
+from scripts.sensitivity import SensitivityCase
+from scripts.rto import RTODaemon
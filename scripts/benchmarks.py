@@ -0,0 +1,600 @@
+'''
+Benchmarks of the turbine models.
+
+run_suite() times build, initialization and solve, and records ipopt
+iterations and model size for
+
+    * a single TurbineBase with each calculation method,
+    * a chain of N TurbineBase stages over T time points,
+    * the series HP/MP/LP flowsheet over T time points,
+
+and writes the results as JSON so runs can be compared with compare().
+Run it as a module from the repository root, as it uses relative imports:
+
+    python -m scripts.benchmarks --output benchmarks.json --baseline old.json
+'''
+
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+from pyomo.environ import ConcreteModel, Constraint, SolverFactory, TransformationFactory, check_optimal_termination, units, value
+from pyomo.core.expr.numeric_expr import ExternalFunctionExpression
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.network import Arc
+
+from idaes.core import FlowsheetBlock
+from idaes.core.util.initialization import propagate_state
+from idaes.core.util import scaling as iscale
+from idaes.core.util.model_statistics import (
+    degrees_of_freedom,
+    number_variables,
+    number_unfixed_variables,
+    number_activated_constraints,
+    number_activated_equalities,
+)
+from idaes.models.properties.general_helmholtz import (
+    HelmholtzParameterBlock,
+    PhaseType,
+    StateVars,
+    AmountBasis,
+    )
+
+from .turbine_base_model import TurbineBase
+from .solver_stats import solve_with_stats
+from .multi_period import build_multi_period_model
+from .series_turbine import update_inputs, initialise, initialise_units
+from .turbine_network import build_turbine_network
+from .continuation import set_smoothing_eps, solve_with_continuation
+from .scenario_engine import ScenarioEngine
+
+
+CALCULATION_METHODS = ("isentropic", "simple_willans", "part_load_willans", "Tsat_willans", "BPST_willans", "CT_willans")
+WILLANS_METHODS = tuple(method for method in CALCULATION_METHODS if "willans" in method)
+
+# Inlet flows (t/h) of the smoothing benchmark, from near zero work to full load
+SMOOTHING_FLOWS = (5.0, 20.0, 50.0, 100.0, 187.0, 300.0)
+
+# Turbine of turbine_test.py, flow in t/h, temperature in C and pressures in bar
+DEFAULT_CONDITIONS = {
+    "flow": 187.0,
+    "temperature_in": 381.0,
+    "pressure_in": 42.3,
+    "pressure_out": 11.4,
+}
+
+# Condensing turbines need a lower outlet pressure
+METHOD_CONDITIONS = {
+    "CT_willans": {"pressure_out": 0.6},
+}
+
+# Specified variables of each calculation method, as in turbine_test.py
+METHOD_FIXED_VARS = {
+    "isentropic": {"efficiency_isentropic": 0.75},
+    "simple_willans": {
+        "willans_slope": 190 * 18,
+        "willans_intercept": 136.6,
+        "willans_max_mol": 100 * 15.4,
+    },
+    "part_load_willans": {
+        "willans_max_mol": 217.4 * 15.4,
+        "willans_a": 1.5435,
+        "willans_b": 200.0,
+        "willans_efficiency": 1 / (0.3759 + 1),
+    },
+    "Tsat_willans": {"willans_max_mol": 217.4 * 15.4},
+    "BPST_willans": {"willans_max_mol": 217.4 * 15.4},
+    "CT_willans": {"willans_max_mol": 217.4 * 15.4},
+}
+
+# params of main.py, used for the series flowsheet
+SERIES_PARAMS = {
+    "HP_inlet_flow": 428,
+    "LP_passout_limit": 150,
+    "MP_demand_flow": 225,
+    "LP_demand_flow": 204.5,
+    "HP_pressure": 45,
+    "MP_pressure": 12.5,
+    "LP_pressure": 4.5,
+    "HP_temperature": 400,
+}
+
+
+def _water():
+    return HelmholtzParameterBlock(
+                    pure_component="h2o",
+                    phase_presentation=PhaseType.LG,
+                    state_vars=StateVars.PH,
+                    amount_basis=AmountBasis.MASS,
+                    )
+
+
+def _fix_turbine(turbine, calculation_method, fixed_vars=None):
+    turbine.efficiency_motor.fix(1.0)
+    for name, v in (METHOD_FIXED_VARS[calculation_method] if fixed_vars is None else fixed_vars).items():
+        getattr(turbine, name).fix(v)
+
+
+def build_turbine(calculation_method="isentropic", conditions=None, fixed_vars=None, n_time=1, lean=False):
+    """
+    Build a single TurbineBase with a fixed inlet state and outlet pressure.
+
+    Args:
+        calculation_method: TurbineBase calculation method
+        conditions: dict updating DEFAULT_CONDITIONS
+        fixed_vars: dict of turbine variable name to fixed value, defaults to
+            METHOD_FIXED_VARS[calculation_method]
+        n_time: number of time points
+        lean: build the turbine in lean mode
+    """
+    c = dict(DEFAULT_CONDITIONS, **METHOD_CONDITIONS.get(calculation_method, {}), **(conditions or {}))
+    m = ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False, time_set=list(range(n_time)))
+    m.fs.water = _water()
+    m.fs.turbine = TurbineBase(property_package=m.fs.water, calculation_method=calculation_method, lean=lean)
+    turbine = m.fs.turbine
+
+    h_in = value(m.fs.water.htpx(T=(c["temperature_in"] + 273.15) * units.K, p=c["pressure_in"] * units.bar))
+    turbine.inlet.flow_mass.fix(c["flow"] / 3.6)
+    turbine.inlet.enth_mass.fix(h_in)
+    turbine.inlet.pressure.fix(c["pressure_in"] * 1e5)
+    turbine.outlet.pressure.fix(c["pressure_out"] * 1e5)
+    _fix_turbine(turbine, calculation_method, fixed_vars)
+    return m
+
+
+def build_chain(n_stages, n_time=1, calculation_method="isentropic", conditions=None, lean=False):
+    """
+    Build a chain of n_stages TurbineBase units connected by arcs, with the
+    pressure falling geometrically from the inlet to the outlet pressure.
+    """
+    c = dict(DEFAULT_CONDITIONS, **METHOD_CONDITIONS.get(calculation_method, {}), **(conditions or {}))
+    m = ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False, time_set=list(range(n_time)))
+    m.fs.water = _water()
+    m.fs.stage = TurbineBase(range(n_stages), property_package=m.fs.water, calculation_method=calculation_method, lean=lean)
+    m.fs.link = Arc(
+        range(n_stages - 1),
+        rule=lambda fs, i: {"source": fs.stage[i].outlet, "destination": fs.stage[i + 1].inlet},
+    )
+    TransformationFactory("network.expand_arcs").apply_to(m)
+
+    first = m.fs.stage[0]
+    h_in = value(m.fs.water.htpx(T=(c["temperature_in"] + 273.15) * units.K, p=c["pressure_in"] * units.bar))
+    first.inlet.flow_mass.fix(c["flow"] / 3.6)
+    first.inlet.enth_mass.fix(h_in)
+    first.inlet.pressure.fix(c["pressure_in"] * 1e5)
+    pressures = np.geomspace(c["pressure_in"], c["pressure_out"], n_stages + 1)[1:]
+    for i, P in enumerate(pressures):
+        m.fs.stage[i].outlet.pressure.fix(P * 1e5)
+        _fix_turbine(m.fs.stage[i], calculation_method)
+    return m
+
+
+def initialize_chain(m, routine="explicit"):
+    for i in m.fs.stage:
+        if i > 0:
+            propagate_state(m.fs.link[i - 1])
+        m.fs.stage[i].initialize(routine=routine)
+
+
+def external_function_calls(m):
+    """
+    Number of external function (Helmholtz EoS) calls in one evaluation of
+    the active constraints. Named Expressions are counted once, as the NL
+    writer passes them to the solver as shared defined variables.
+    """
+    seen = set()
+    calls = 0
+    stack = [c.body for c in m.component_data_objects(Constraint, active=True, descend_into=True)]
+    while stack:
+        e = stack.pop()
+        if not hasattr(e, "is_expression_type") or not e.is_expression_type():
+            continue
+        if e.is_named_expression_type():
+            if id(e) in seen:
+                continue
+            seen.add(id(e))
+        elif isinstance(e, ExternalFunctionExpression):
+            calls += 1
+        stack.extend(e.args)
+    return calls
+
+
+def model_size(m):
+    """
+    Model size statistics (see idaes report_statistics), Jacobian nonzeros
+    and external function calls per constraint evaluation
+    """
+    nonzeros = sum(
+        len(list(identify_variables(c.body, include_fixed=False)))
+        for c in m.component_data_objects(Constraint, active=True, descend_into=True)
+    )
+    return {
+        "variables": number_variables(m),
+        "unfixed_variables": number_unfixed_variables(m),
+        "constraints": number_activated_constraints(m),
+        "equalities": number_activated_equalities(m),
+        "nonzeros": nonzeros,
+        "external_function_calls": external_function_calls(m),
+        "degrees_of_freedom": degrees_of_freedom(m),
+    }
+
+
+def _summary(times):
+    return {"median": float(np.median(times)), "min": float(np.min(times)), "max": float(np.max(times))}
+
+
+def benchmark_case(build, initialize, n_repeats=3, solver_options=None):
+    """
+    Time build(), initialize(m) and the ipopt solve of a freshly built model
+    n_repeats times.
+
+    Returns:
+        dict of build_time, initialize_time and solve_time summaries (s),
+        ipopt iterations, termination and model size
+    """
+    solver = SolverFactory("ipopt")
+    solver.options = dict(solver_options) if solver_options is not None else {"tol": 1e-6, "max_iter": 1000}
+    times = {"build_time": [], "initialize_time": [], "solve_time": []}
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        m = build()
+        times["build_time"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        initialize(m)
+        times["initialize_time"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result, stats = solve_with_stats(solver, m)
+        times["solve_time"].append(time.perf_counter() - start)
+
+    record = {k: _summary(v) for k, v in times.items()}
+    record["iterations"] = stats["iterations"]
+    record["termination"] = str(result.solver.termination_condition)
+    record["optimal"] = check_optimal_termination(result)
+    record["size"] = model_size(m)
+    # Each constraint, Jacobian and Hessian evaluation calls every external function once
+    evaluations = [stats.get(k) for k in ("constraint_evaluations", "jacobian_evaluations", "hessian_evaluations")]
+    if None not in evaluations:
+        record["external_evaluations"] = record["size"]["external_function_calls"] * sum(evaluations)
+    return record
+
+
+def benchmark_initialization(calculation_method="isentropic", n_repeats=5, routines=(None, "explicit"), **kwargs):
+    """
+    Time TurbineBase.initialize for each routine on freshly built models.
+
+    Keyword arguments are passed to build_turbine.
+
+    Returns:
+        dict of routine name to timing statistics (s) and the resulting
+        mechanical work (W), plus the speed-up of the last routine over the
+        first
+    """
+    results = {}
+    for routine in routines:
+        times = []
+        for _ in range(n_repeats):
+            m = build_turbine(calculation_method, **kwargs)
+            start = time.perf_counter()
+            m.fs.turbine.initialize(routine=routine)
+            times.append(time.perf_counter() - start)
+        results[str(routine)] = dict(
+            _summary(times),
+            work_mechanical=value(m.fs.turbine.work_mechanical[m.fs.time.first()]),
+        )
+    first, last = str(routines[0]), str(routines[-1])
+    results["speedup"] = results[first]["median"] / results[last]["median"]
+    return results
+
+
+def benchmark_construction(stage_counts=(4, 8, 16, 32, 64), n_time=1, **turbine_config):
+    """
+    Time build_turbine_network for one machine of n stages (n + 1 headers).
+
+    Returns:
+        dict of stage count to build time (s) and build time per stage, which
+        stays flat when construction scales linearly
+    """
+    results = {}
+    for n in stage_counts:
+        headers = [f"H{i}" for i in range(n + 1)]
+        m = ConcreteModel()
+        m.fs = FlowsheetBlock(dynamic=False, time_set=list(range(n_time)))
+        m.fs.water = _water()
+        start = time.perf_counter()
+        build_turbine_network(m.fs, headers, {"TG": headers}, property_package=m.fs.water, **turbine_config)
+        elapsed = time.perf_counter() - start
+        results[n] = {"build_time": elapsed, "per_stage": elapsed / n}
+    return results
+
+
+def _series(n_time):
+    m = ConcreteModel()
+    build_multi_period_model(m, n_time)
+    update_inputs(m, SERIES_PARAMS)
+    return m
+
+
+def benchmark_series_initialization(n_time=1, solver_options=None):
+    """
+    Final-solve ipopt iterations of the series flowsheet after the
+    hand-ordered (initialise_units) and the sequential (initialise)
+    initialisation.
+
+    Returns:
+        dict of method to iterations, termination and initialise time, plus
+        the change in iterations from units to sequential
+    """
+    solver = SolverFactory("ipopt")
+    solver.options = dict(solver_options) if solver_options is not None else {"tol": 1e-3, "max_iter": 1000}
+    results = {}
+    for name, initialize in (("units", initialise_units), ("sequential", initialise)):
+        m = _series(n_time)
+        start = time.perf_counter()
+        initialize(m)
+        elapsed = time.perf_counter() - start
+        result, stats = solve_with_stats(solver, m)
+        results[name] = {
+            "iterations": stats["iterations"],
+            "termination": str(result.solver.termination_condition),
+            "initialize_time": elapsed,
+        }
+    if None not in (results["units"]["iterations"], results["sequential"]["iterations"]):
+        results["iteration_change"] = results["sequential"]["iterations"] - results["units"]["iterations"]
+    return results
+
+
+def check_persistent_reuse(solver_options=None):
+    """
+    Solve three series scenarios with different params through a persistent
+    ScenarioEngine and check the NL problem is written only for the first.
+
+    Returns:
+        list of the "rewritten" flags of the three solves
+
+    Raises:
+        AssertionError if a later scenario rewrote the NL problem
+    """
+    engine = ScenarioEngine(solver_options=solver_options, persistent=True)
+    scenarios = [
+        SERIES_PARAMS,
+        dict(SERIES_PARAMS, HP_inlet_flow=420, LP_demand_flow=200, MP_pressure=12.0),
+        dict(SERIES_PARAMS, HP_inlet_flow=435, MP_demand_flow=230, HP_temperature=405),
+    ]
+    rewritten = [engine.solve(params).get("rewritten") for params in scenarios]
+    assert rewritten[1:] == [False, False], f"Consecutive scenarios rewrote the NL problem: {rewritten}"
+    return rewritten
+
+
+def _smoothing_record(runs):
+    iterations = [r["iterations"] for r in runs if r["optimal"] and r["iterations"] is not None]
+    failures = sum(1 for r in runs if not r["optimal"])
+    return {
+        "iterations": int(sum(iterations)),
+        "median_iterations": float(np.median(iterations)) if iterations else None,
+        "failures": failures,
+        "failure_rate": failures / len(runs),
+    }
+
+
+def benchmark_smoothing(methods=WILLANS_METHODS, flows=SMOOTHING_FLOWS, target=1e-3, start=1.0, factor=0.1, solver_options=None):
+    """
+    ipopt iterations and failures of the Willans methods solved directly with
+    the target smoothing eps and by continuation from start down to target,
+    over a range of inlet flows (t/h). Each solve starts from a freshly built
+    and initialised turbine.
+
+    Returns:
+        dict of method to "fixed" and "continuation" records of total and
+        median iterations of the optimal solves, failures and failure rate,
+        plus "all" summed over the methods
+    """
+    solver = SolverFactory("ipopt")
+    solver.options = dict(solver_options) if solver_options is not None else {"tol": 1e-6, "max_iter": 1000}
+    runs = {"fixed": {}, "continuation": {}}
+    for method in methods:
+        for mode in runs:
+            runs[mode][method] = []
+            for flow in flows:
+                m = build_turbine(method, conditions={"flow": flow})
+                try:
+                    m.fs.turbine.initialize()
+                    if mode == "fixed":
+                        set_smoothing_eps(m, target)
+                        result, stats = solve_with_stats(solver, m)
+                        stats["optimal"] = check_optimal_termination(result)
+                    else:
+                        result, stats = solve_with_continuation(solver, m, target=target, start=start, factor=factor)
+                    runs[mode][method].append({"iterations": stats["iterations"], "optimal": stats["optimal"]})
+                except Exception:  # pylint: disable=broad-except
+                    runs[mode][method].append({"iterations": None, "optimal": False})
+
+    results = {
+        method: {mode: _smoothing_record(runs[mode][method]) for mode in runs}
+        for method in methods
+    }
+    results["all"] = {mode: _smoothing_record([r for v in runs[mode].values() for r in v]) for mode in runs}
+    return results
+
+
+def benchmark_scaling(methods=("BPST_willans", "CT_willans"), flows=SMOOTHING_FLOWS, solver_options=None):
+    """
+    ipopt iterations and restoration phases of freshly built and initialised
+    turbines solved unscaled and with the TurbineBase scaling factors
+    (nlp_scaling_method user-scaling), over a range of inlet flows (t/h).
+
+    Returns:
+        dict of method to "unscaled" and "scaled" records of total
+        iterations, restoration phases and failures
+    """
+    options = dict(solver_options) if solver_options is not None else {"tol": 1e-6, "max_iter": 1000}
+    results = {}
+    for method in methods:
+        results[method] = {}
+        for mode in ("unscaled", "scaled"):
+            solver = SolverFactory("ipopt")
+            solver.options = dict(options, nlp_scaling_method="user-scaling") if mode == "scaled" else dict(options)
+            record = {"iterations": 0, "restoration_phases": 0, "failures": 0}
+            for flow in flows:
+                m = build_turbine(method, conditions={"flow": flow})
+                try:
+                    m.fs.turbine.initialize()
+                    if mode == "scaled":
+                        iscale.calculate_scaling_factors(m)
+                    result, stats = solve_with_stats(solver, m)
+                except Exception:  # pylint: disable=broad-except
+                    record["failures"] += 1
+                    continue
+                if not check_optimal_termination(result):
+                    record["failures"] += 1
+                record["iterations"] += stats["iterations"] or 0
+                record["restoration_phases"] += stats["restoration_phases"]
+            results[method][mode] = record
+    return results
+
+
+def _metadata():
+    import pyomo
+    import idaes
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "pyomo": pyomo.version.version,
+        "idaes": idaes.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+    }
+
+
+def run_suite(
+    output=None,
+    methods=CALCULATION_METHODS,
+    stages=(1, 2, 4, 8),
+    time_points=(1, 4, 24),
+    n_repeats=3,
+    solver_options=None,
+    lean_modes=(False, True),
+):
+    """
+    Run all benchmark cases and optionally write the report as JSON.
+
+    Returns:
+        dict with "metadata" and "results", one record per case keyed by
+        "case" (e.g. "method:CT_willans", "chain:4x24:lean", "series:24")
+    """
+    cases = []
+    for lean in lean_modes:
+        suffix = ":lean" if lean else ""
+        for method in methods:
+            cases.append((
+                f"method:{method}{suffix}",
+                lambda method=method, lean=lean: build_turbine(method, lean=lean),
+                lambda m: m.fs.turbine.initialize(),
+            ))
+        for n in stages:
+            for t in time_points:
+                cases.append((
+                    f"chain:{n}x{t}{suffix}",
+                    lambda n=n, t=t, lean=lean: build_chain(n, t, lean=lean),
+                    initialize_chain,
+                ))
+    for t in time_points:
+        cases.append((f"series:{t}", lambda t=t: _series(t), initialise))
+
+    results = []
+    for name, build, initialize in cases:
+        try:
+            record = benchmark_case(build, initialize, n_repeats=n_repeats, solver_options=solver_options)
+        except Exception as err:  # pylint: disable=broad-except
+            record = {"error": str(err)}
+        record["case"] = name
+        results.append(record)
+
+    report = {"metadata": _metadata(), "results": results}
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def compare(baseline, current, tolerance=0.25):
+    """
+    Compare two benchmark reports (dicts or JSON paths).
+
+    Returns:
+        list of (case, key, baseline, current) where a median time, the
+        iteration count or the external function evaluations grew by more
+        than tolerance
+    """
+    reports = []
+    for r in (baseline, current):
+        if isinstance(r, str):
+            with open(r) as f:
+                r = json.load(f)
+        reports.append({record["case"]: record for record in r["results"]})
+    old, new = reports
+
+    regressions = []
+    for case in old.keys() & new.keys():
+        for key in ("build_time", "initialize_time", "solve_time", "iterations", "external_evaluations"):
+            a, b = old[case].get(key), new[case].get(key)
+            if isinstance(a, dict):
+                a, b = a["median"], (b or {}).get("median")
+            if a is not None and b is not None and b > a * (1 + tolerance):
+                regressions.append((case, key, a, b))
+    return sorted(regressions)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the turbine models")
+    parser.add_argument("--output", default="benchmarks.json", help="JSON report to write")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="only 1-2 stages and 1-4 time points")
+    args = parser.parse_args()
+
+    kwargs = {"stages": (1, 2), "time_points": (1, 4)} if args.quick else {}
+    report = run_suite(args.output, n_repeats=args.repeats, **kwargs)
+    for record in report["results"]:
+        if "error" in record:
+            print(f"{record['case']:<28} error: {record['error']}")
+        else:
+            print(
+                f"{record['case']:<28} build {record['build_time']['median']:.3f}s "
+                f"init {record['initialize_time']['median']:.3f}s solve {record['solve_time']['median']:.3f}s "
+                f"iterations {record['iterations']} nonzeros {record['size']['nonzeros']} "
+                f"external evaluations {record.get('external_evaluations')}"
+            )
+    print("series initialisation", benchmark_series_initialization())
+    print("persistent NL rewrites", check_persistent_reuse())
+    for method, record in benchmark_smoothing().items():
+        for mode in ("fixed", "continuation"):
+            r = record[mode]
+            print(
+                f"smoothing {method:<18} {mode:<13} iterations {r['iterations']} "
+                f"(median {r['median_iterations']}) failure rate {r['failure_rate']:.0%}"
+            )
+    for method, record in benchmark_scaling().items():
+        for mode in ("unscaled", "scaled"):
+            r = record[mode]
+            print(
+                f"scaling {method:<20} {mode:<13} iterations {r['iterations']} "
+                f"restoration phases {r['restoration_phases']} failures {r['failures']}"
+            )
+    if args.baseline:
+        for case, key, a, b in compare(args.baseline, report):
+            print(f"REGRESSION {case} {key}: {a:.4g} -> {b:.4g}")
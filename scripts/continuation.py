@@ -0,0 +1,100 @@
+'''
+Smoothing continuation for the Willans work calculation.
+
+The Willans line methods of TurbineBase clip the work at zero with
+smooth_min(x, 0, smoothing_eps). A small eps is close to the exact kink but
+hard for ipopt to converge from a poor starting point, a large eps converges
+easily but biases the work near zero load. solve_with_continuation solves
+first with a loose eps, then tightens every smoothing_eps Param of the model
+in steps down to the target, each step warm-started from the previous
+solution, so only the first solve has to cross the kink region.
+
+    result, stats = solve_with_continuation(solver, m, target=1e-3)
+'''
+
+import numpy as np
+from pyomo.environ import Block, check_optimal_termination
+
+import idaes.logger as idaeslog
+
+from .solver_stats import solve_with_stats
+from .turbine_base_model import WILLANS_SMOOTHING_EPS, TurbineBaseData
+
+
+_log = idaeslog.getLogger(__name__)
+
+# ipopt options of the warm-started steps: start near the previous solution
+# rather than pushing it back into the interior
+WARM_START_OPTIONS = {"mu_init": 1e-4, "bound_push": 1e-8, "bound_frac": 1e-8}
+
+
+def smoothing_params(m):
+    """smoothing_eps Params of every Willans TurbineBase in m"""
+    return [
+        b.smoothing_eps
+        for b in m.component_data_objects(Block, descend_into=True)
+        if isinstance(b, TurbineBaseData) and hasattr(b, "smoothing_eps")
+    ]
+
+
+def set_smoothing_eps(m, eps):
+    """Set the smoothing parameter of every Willans TurbineBase in m"""
+    for p in smoothing_params(m):
+        p.set_value(eps)
+
+
+def eps_schedule(start=1.0, target=WILLANS_SMOOTHING_EPS, factor=0.1):
+    """Geometric sequence of eps from start down to target, target included"""
+    if target >= start:
+        return [target]
+    n = int(np.ceil(np.log(target / start) / np.log(factor) - 1e-9))
+    return [max(start * factor**i, target) for i in range(n)] + [target]
+
+
+def solve_with_continuation(solver, m, target=WILLANS_SMOOTHING_EPS, start=1.0, factor=0.1, tee=False):
+    """
+    Solve m with the Willans smoothing parameter tightened from start to target.
+
+    Args:
+        solver: ipopt SolverFactory object, its options are used for every
+            step, with WARM_START_OPTIONS added after the first
+        m: model holding one or more Willans TurbineBase units
+        target: eps of the final solve
+        start: eps of the first solve
+        factor: eps ratio between steps
+
+    Returns:
+        (result of the last solve, stats) where stats has "steps", a list of
+        dicts of eps, iterations and termination, the total "iterations" and
+        "optimal". The continuation stops at the first step that is not
+        optimal, leaving the target eps set on the model.
+    """
+    params = smoothing_params(m)
+    schedule = eps_schedule(start, target, factor) if params else [target]
+    base_options = dict(solver.options)
+    steps = []
+    try:
+        for i, eps in enumerate(schedule):
+            set_smoothing_eps(m, eps)
+            if i > 0:
+                solver.options.update(WARM_START_OPTIONS)
+            result, stats = solve_with_stats(solver, m, tee=tee)
+            optimal = check_optimal_termination(result)
+            steps.append({
+                "eps": eps,
+                "iterations": stats["iterations"],
+                "termination": str(result.solver.termination_condition),
+            })
+            if not optimal:
+                _log.warning(f"Continuation step eps={eps:.3g} did not converge: {steps[-1]['termination']}")
+                break
+    finally:
+        solver.options = base_options
+        set_smoothing_eps(m, target)
+
+    iterations = [s["iterations"] for s in steps]
+    return result, {
+        "steps": steps,
+        "iterations": None if None in iterations else sum(iterations),
+        "optimal": optimal and len(steps) == len(schedule),
+    }
@@ -0,0 +1,184 @@
+'''
+Multi-period operation of the series turbine flowsheet.
+
+One flowsheet is built over N time points and the scenario Params, fixed
+inputs and demand constraints are all indexed by time. Demands come from the
+"Steam Demand Data" sheet of the site workbook, either as an hourly table
+(a header row holding params keys such as MP_demand_flow and LP_demand_flow,
+one row per period beneath it) or, when the sheet has no such table, as the
+steady-state header totals from its steam balance.
+'''
+
+import os
+import time
+
+import pandas as pd
+from pyomo.environ import ConcreteModel, SolverFactory, check_optimal_termination, value
+
+from .series_turbine import PARAM_KEYS, build_model, add_scenario_params, update_inputs, initialise, period_results
+from .scenario_engine import ScenarioEngine
+from .workbook_io import Workbook, results_cells, write_cells
+
+
+WORKBOOK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Kinleith Steam System v4.xlsm")
+DEMAND_SHEET = "Steam Demand Data"
+SCENARIO_SHEET = "Scenario Setup"
+RESULTS_SHEET = "Results Summary"
+# Below the summary tables already on the results sheet
+RESULTS_ANCHOR = "B40"
+
+
+def read_steady_state_demands(path=WORKBOOK, sheet_name=DEMAND_SHEET):
+    """
+    Read the MP and LP header demands (t/h) from the "2.Steam Balance" block
+    of the demand sheet.
+    """
+    columns = None
+    with Workbook(path) as wb:
+        for row in wb.iter_rows(sheet_name):
+            labels = [c.strip() if isinstance(c, str) else c for c in row]
+            if columns is None:
+                if any(isinstance(c, str) and "Steam Balance" in c for c in labels):
+                    columns = {c: j for j, c in enumerate(labels) if c in ("LP", "MP", "HP")}
+            elif any(isinstance(c, str) and "Pulp Demand" in c for c in labels):
+                return {
+                    "MP_demand_flow": float(row[columns["MP"]] or 0),
+                    "LP_demand_flow": float(row[columns["LP"]] or 0),
+                }
+    raise ValueError(f"No steam balance demands found on sheet '{sheet_name}'")
+
+
+def read_demand_profile(path=WORKBOOK, sheet_name=DEMAND_SHEET, n_periods=None):
+    """
+    Read an hourly demand table from the demand sheet. The table starts at a
+    header row holding params keys and ends at the first row with no values.
+
+    Returns:
+        list of dicts, one per period, holding the params entries in the table
+    """
+    with Workbook(path) as wb:
+        table = wb.read_table(sheet_name, PARAM_KEYS, n_rows=n_periods)
+    return [{k: v for k, v in entry.items() if v == v} for entry in table.to_dict("records")]
+
+
+def read_scenarios(path=WORKBOOK, sheet_name=SCENARIO_SHEET, labels=None):
+    """
+    Read scenarios from the scenario sheet, either from a scenario table (a
+    header row of params keys, one scenario per row) or, given labels, from
+    "Parameter" / "Value" pairs: a label cell followed by its value.
+
+    The sheet as shipped has only label/value blocks of mill parameters
+    (production rates, liquor flows, ...), none of which is a series turbine
+    params entry, so it holds no scenarios until a scenario table is added to
+    it or labels map some of its parameters onto params keys.
+
+    Args:
+        labels: dict of sheet label to params key, e.g.
+            {"MP header demand (t/hr)": "MP_demand_flow"}
+
+    Returns:
+        DataFrame with one column per params key found, one row per scenario
+        (a single row from label/value pairs), NaN where a scenario leaves
+        the entry to the base params
+    """
+    with Workbook(path) as wb:
+        if labels is None:
+            try:
+                return wb.read_table(sheet_name, PARAM_KEYS)
+            except ValueError:
+                raise ValueError(
+                    f"Sheet '{sheet_name}' has no scenario table with a header row of {PARAM_KEYS}; "
+                    "add one or pass labels mapping its Parameter/Value entries onto params keys"
+                ) from None
+        unknown = set(labels.values()) - set(PARAM_KEYS)
+        if unknown:
+            raise ValueError(f"labels map onto unknown params keys {sorted(unknown)}")
+        entry = {}
+        for row in wb.iter_rows(sheet_name):
+            for j, c in enumerate(row[:-1]):
+                key = labels.get(c.strip()) if isinstance(c, str) else None
+                if key is not None and isinstance(row[j + 1], (int, float)) and not isinstance(row[j + 1], bool):
+                    entry[key] = float(row[j + 1])
+    if not entry:
+        raise ValueError(f"None of the labels {sorted(labels)} found with a value on sheet '{sheet_name}'")
+    return pd.DataFrame([entry], columns=[k for k in PARAM_KEYS if k in entry], dtype=float)
+
+
+def write_results(records, path=WORKBOOK, sheet_name=RESULTS_SHEET, anchor=RESULTS_ANCHOR, out_path=None):
+    """
+    Write a batch of results records to the results sheet as one table, in
+    a single pass that leaves the rest of the workbook untouched.
+    """
+    return write_cells(path, {sheet_name: results_cells(records, anchor)}, out_path=out_path)
+
+
+def period_params(base_params, profile):
+    """
+    Combine base params with a per-period profile into a params dict whose
+    entries are one value per period.
+    """
+    return {k: [entry.get(k, base_params[k]) for entry in profile] for k in PARAM_KEYS}
+
+
+def build_multi_period_model(m, n_periods):
+    build_model(m, time_set=range(n_periods))
+    add_scenario_params(m)
+
+
+def solve_multi_period(base_params, profile, mode="simultaneous", solver_options=None, tee=False):
+    """
+    Plan operation over all periods of a demand profile.
+
+    Args:
+        base_params: params dict used for any entry missing from the profile
+        profile: list of per-period dicts, e.g. from read_demand_profile
+        mode: "simultaneous" solves one time-indexed flowsheet over all
+            periods, "sequential" re-solves a single-period flowsheet for
+            each period in turn without rebuilding it
+        solver_options: ipopt options
+
+    Returns:
+        list of results records, one per period
+    """
+    if solver_options is None:
+        solver_options = {"tol": 1e-3, "max_iter": 1000}
+
+    if mode == "sequential":
+        engine = ScenarioEngine(solver_options=solver_options)
+        records = []
+        for i, entry in enumerate(profile):
+            params = dict(base_params)
+            params.update(entry)
+            record = engine.solve(params, tee=tee)
+            record["period"] = i
+            records.append(record)
+        return records
+
+    if mode != "simultaneous":
+        raise ValueError(f"Unrecognised multi-period mode '{mode}'")
+
+    m = ConcreteModel()
+    build_multi_period_model(m, len(profile))
+    params = period_params(base_params, profile)
+    update_inputs(m, params)
+    initialise(m)
+
+    solver = SolverFactory("ipopt")
+    solver.options = dict(solver_options)
+    start = time.perf_counter()
+    result = solver.solve(m, tee=tee)
+    solve_time = time.perf_counter() - start
+    optimal = check_optimal_termination(result)
+
+    records = []
+    for i, t in enumerate(m.fs1.time):
+        record = {k: params[k][i] for k in PARAM_KEYS}
+        record["period"] = i
+        record["termination"] = str(result.solver.termination_condition)
+        record["optimal"] = optimal
+        record["solve_time"] = solve_time
+        if optimal:
+            record["objective"] = value(m.fs1.LP_stage.work_mechanical[t])
+            record.update(period_results(m, t))
+        records.append(record)
+    return records
@@ -0,0 +1,204 @@
+'''
+Process-pool runner for series turbine scenario sweeps.
+
+Each worker process builds one ScenarioEngine when it starts and keeps it
+alive, so the flowsheet and Helmholtz property package are constructed once
+per core rather than once per scenario.
+'''
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from pyomo.environ import TerminationCondition
+
+import idaes.logger as idaeslog
+
+from .scenario_engine import ScenarioEngine
+
+
+_log = idaeslog.getLogger(__name__)
+
+# Per-process engine, created by the pool initializer
+_engine = None
+
+
+def _init_worker(solver_options, result_cache):
+    global _engine
+    _engine = ScenarioEngine(solver_options=solver_options, result_cache=result_cache)
+
+
+def _solve_scenario(index, params):
+    # Any failure is turned into a record so it never takes the worker down
+    try:
+        record = _engine.solve(params)
+    except Exception as err:  # pylint: disable=broad-except
+        record = dict(params)
+        record["termination"] = str(TerminationCondition.error)
+        record["optimal"] = False
+        record["message"] = str(err)
+    record["scenario"] = index
+    record["worker"] = os.getpid()
+    return record
+
+
+def _failed_record(index, params, message):
+    record = dict(params)
+    record["termination"] = str(TerminationCondition.error)
+    record["optimal"] = False
+    record["message"] = message
+    record["scenario"] = index
+    record["worker"] = None
+    return record
+
+
+class ParallelScenarioRunner:
+    """
+    Streams params dicts to a pool of worker processes, each holding a
+    persistent series turbine model.
+
+    Args:
+        n_workers: number of worker processes, defaults to os.cpu_count()
+        solver_options: ipopt options passed to each worker's ScenarioEngine
+        max_pending: maximum number of scenarios in flight, defaults to
+            twice the number of workers so long sweeps are not held in memory
+        result_cache: optional ResultCache shared by the workers, each opens
+            its own connection to the cache file
+
+    Use as a context manager so the worker processes are shut down.
+    """
+
+    def __init__(self, n_workers=None, solver_options=None, max_pending=None, result_cache=None):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.solver_options = solver_options
+        self.result_cache = result_cache
+        self.max_pending = max_pending or 2 * self.n_workers
+        self.stats = {}
+        self._executor = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                initializer=_init_worker,
+                initargs=(self.solver_options, self.result_cache),
+            )
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _restart(self):
+        # A worker died outright (not just a failed solve), replace the pool
+        _log.warning("Worker process died, restarting process pool")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self.start()
+
+    def run(self, scenarios, ordered=True):
+        """
+        Generator yielding one results record per params dict in scenarios.
+
+        Args:
+            scenarios: iterable of params dicts, consumed lazily
+            ordered: if True yield in submission order, otherwise as completed
+        """
+        self.start()
+        scenarios = iter(enumerate(scenarios))
+        pending = {}  # future -> (index, params, isolated)
+        # Scenarios that were on a pool when it broke, re-run one at a time
+        suspects = deque()
+        finished = {}  # index -> record, only used when ordered
+        next_index = 0
+        n_done = 0
+        n_failed = 0
+        start = time.perf_counter()
+        exhausted = False
+
+        while True:
+            if suspects:
+                # Alone on the pool, so a suspect that breaks it again is the cause
+                if not pending:
+                    index, params = suspects.popleft()
+                    future = self._executor.submit(_solve_scenario, index, params)
+                    pending[future] = (index, params, True)
+            else:
+                # Keep the pool fed without materialising the whole sweep
+                while not exhausted and len(pending) < self.max_pending:
+                    try:
+                        index, params = next(scenarios)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    future = self._executor.submit(_solve_scenario, index, params)
+                    pending[future] = (index, params, False)
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = False
+            completed = []
+            for future in done:
+                index, params, isolated = pending.pop(future)
+                try:
+                    record = future.result()
+                except BrokenProcessPool as err:
+                    broken = True
+                    if not isolated:
+                        # May only have shared the pool with the scenario that killed it
+                        suspects.append((index, params))
+                        continue
+                    record = _failed_record(index, params, f"worker process died: {err}")
+                completed.append(record)
+
+            if broken:
+                # All outstanding futures on a broken pool fail too, re-run them as suspects
+                suspects.extend((index, params) for index, params, _ in pending.values())
+                pending.clear()
+                self._restart()
+
+            for record in completed:
+                n_done += 1
+                if not record["optimal"]:
+                    n_failed += 1
+                if ordered:
+                    finished[record["scenario"]] = record
+                else:
+                    yield record
+
+            if ordered:
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+
+            self._update_stats(n_done, n_failed, time.perf_counter() - start)
+
+        self._update_stats(n_done, n_failed, time.perf_counter() - start)
+        _log.info(
+            f"Solved {n_done} scenarios ({n_failed} failed) in {self.stats['elapsed']:.1f} s, "
+            f"{self.stats['scenarios_per_second']:.2f} scenarios/s on {self.n_workers} workers"
+        )
+
+    def run_all(self, scenarios, ordered=True):
+        """Solve all scenarios and return the list of results records"""
+        return list(self.run(scenarios, ordered=ordered))
+
+    def _update_stats(self, n_done, n_failed, elapsed):
+        self.stats = {
+            "workers": self.n_workers,
+            "scenarios": n_done,
+            "failed": n_failed,
+            "elapsed": elapsed,
+            "scenarios_per_second": n_done / elapsed if elapsed > 0 else 0.0,
+        }
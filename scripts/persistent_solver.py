@@ -0,0 +1,249 @@
+'''
+Cached-NL ipopt solve path for repeated re-solves of one model.
+
+SolverFactory("ipopt").solve() walks every expression to write a new .nl
+file on each call. CachedNLSolver writes the NL problem once, with the given
+input variables kept as columns even while they are fixed (ipopt removes
+columns with equal bounds by default). Later solves only regenerate the
+initial point and variable bounds sections of the cached text, so new input
+values, bounds and starting points reach ipopt without re-walking the model.
+
+The NL problem is rewritten when anything baked into it changes: the active
+constraints and objectives, which non-input variables are fixed or their
+fixed values, or the values of mutable Params referenced by the active
+constraints and objectives. Scenario inputs that appear in constraints
+should therefore be fixed Vars rather than mutable Params; Params that only
+carry values into fixed Vars do not cause a rewrite.
+
+Each solve reports the time spent writing (or patching) the NL file, in the
+ipopt process and loading the results.
+'''
+
+import os
+import re
+import subprocess
+import tempfile
+import time
+from io import StringIO
+
+from pyomo.common.errors import ApplicationError
+from pyomo.core.expr.visitor import identify_mutable_parameters
+from pyomo.environ import Constraint, Objective, Var, SolverFactory
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+from pyomo.repn.plugins.nl_writer import NLWriter
+
+import idaes.logger as idaeslog
+
+from .solver_stats import parse_ipopt_log
+
+
+_log = idaeslog.getLogger(__name__)
+
+
+def _solve_result(code):
+    # AMPL solve_result_num ranges
+    if code < 100:
+        return SolverStatus.ok, TerminationCondition.optimal
+    if code < 200:
+        return SolverStatus.warning, TerminationCondition.locallyOptimal
+    if code < 300:
+        return SolverStatus.warning, TerminationCondition.infeasible
+    if code < 400:
+        return SolverStatus.warning, TerminationCondition.unbounded
+    if code < 500:
+        return SolverStatus.warning, TerminationCondition.maxIterations
+    return SolverStatus.error, TerminationCondition.error
+
+
+def read_sol(path):
+    """
+    Read an ASL .sol file.
+
+    Returns:
+        (message, primal values, solve_result_num)
+    """
+    with open(path) as f:
+        lines = f.read().splitlines()
+    i = lines.index("Options")
+    message = " ".join(line for line in lines[:i] if line.strip())
+    n_options = int(lines[i + 1])
+    need_vbtol = n_options > 4
+    if need_vbtol:
+        n_options -= 2
+    i += 2 + n_options
+    _, n_duals, _, n_primals = (int(v) for v in lines[i:i + 4])
+    # The vbtol line follows the counts
+    i += 4 + (1 if need_vbtol else 0) + n_duals
+    primals = [float(v) for v in lines[i:i + n_primals]]
+    code = 0
+    for line in lines[i + n_primals:]:
+        if line.startswith("objno"):
+            code = int(line.split()[2])
+            break
+    return message, primals, code
+
+
+class CachedNLSolver:
+    """
+    Solve a model repeatedly with ipopt from a cached NL file.
+
+    Args:
+        model: Pyomo model, solved in place
+        inputs: variables that change value between solves, kept as
+            columns of the NL problem while fixed
+        options: ipopt options
+        executable: path to ipopt, defaults to the one SolverFactory finds
+    """
+
+    def __init__(self, model, inputs=(), options=None, executable=None):
+        self.model = model
+        self.inputs = list(inputs)
+        self._input_ids = {id(v) for v in self.inputs}
+        self.options = dict(options) if options is not None else {}
+        self.executable = executable if executable is not None else SolverFactory("ipopt").executable()
+        if self.executable is None:
+            raise ApplicationError("No ipopt executable found for CachedNLSolver")
+        self.n_writes = 0
+        self._cache = None
+        self._signature = None
+        # Mutable Params of the active components, found once per active set
+        self._params = None
+        self._params_active = None
+
+    def invalidate(self):
+        """Force the NL problem to be rewritten on the next solve"""
+        self._cache = None
+
+    def _model_signature(self):
+        # Everything written into the NL problem as structure or constants
+        m = self.model
+        fixed = tuple(
+            (id(v), v.value)
+            for v in m.component_data_objects(Var, descend_into=True)
+            if v.fixed and id(v) not in self._input_ids
+        )
+        components = list(m.component_data_objects((Constraint, Objective), active=True, descend_into=True))
+        active = tuple(id(c) for c in components)
+        if active != self._params_active:
+            self._params = self._referenced_params(components)
+            self._params_active = active
+        params = tuple(p.value for p in self._params)
+        return fixed, params, active
+
+    @staticmethod
+    def _referenced_params(components):
+        # Mutable Params in the expressions and bounds written to the NL problem
+        found = {}
+        for c in components:
+            exprs = [c.expr] if c.ctype is Objective else [c.body, c.lower, c.upper]
+            for e in exprs:
+                if e is not None:
+                    for p in identify_mutable_parameters(e):
+                        found.setdefault(id(p), p)
+        return list(found.values())
+
+    def _write(self):
+        fixed = [v for v in self.inputs if v.fixed]
+        for v in fixed:
+            v.unfix()
+        try:
+            ostream = StringIO()
+            info = NLWriter().write(self.model, ostream, linear_presolve=False, scale_model=False)
+        finally:
+            for v in fixed:
+                v.fix()
+
+        lines = ostream.getvalue().splitlines()
+        i_x = next((i for i, line in enumerate(lines) if re.match(r"x\d+", line)), None)
+        i_r = next(i for i, line in enumerate(lines) if re.match(r"r(\s|$)", line))
+        i_b = next(i for i, line in enumerate(lines) if re.match(r"b(\s|$)", line))
+        n = len(info.variables)
+        self._cache = {
+            "info": info,
+            "prefix": "\n".join(lines[:i_x if i_x is not None else i_r]),
+            "middle": "\n".join(lines[i_r:i_b]),
+            "suffix": "\n".join(lines[i_b + 1 + n:]),
+            "env": "\n".join(info.external_function_libraries),
+        }
+        self.n_writes += 1
+
+    def _nl_text(self):
+        # Cached problem with the current starting point and bounds
+        variables = self._cache["info"].variables
+        x = [f"{i} {v.value!r}" for i, v in enumerate(variables) if v.value is not None]
+        b = []
+        for v in variables:
+            if v.fixed:
+                b.append(f"4 {v.value!r}")
+                continue
+            lb, ub = v.lb, v.ub
+            if lb is not None and ub is not None:
+                b.append(f"4 {lb!r}" if lb == ub else f"0 {lb!r} {ub!r}")
+            elif ub is not None:
+                b.append(f"1 {ub!r}")
+            elif lb is not None:
+                b.append(f"2 {lb!r}")
+            else:
+                b.append("3")
+        return "\n".join(
+            [self._cache["prefix"], f"x{len(x)}", *x, self._cache["middle"], "b", *b, self._cache["suffix"], ""]
+        )
+
+    def solve(self, tee=False):
+        """
+        Solve the model and load the solution into it.
+
+        Returns:
+            (SolverResults, stats) where stats holds the ipopt log statistics
+            plus write_time, solver_time, load_time and rewritten
+        """
+        start = time.perf_counter()
+        signature = self._model_signature()
+        rewritten = self._cache is None or signature != self._signature
+        if rewritten:
+            self._write()
+            self._signature = signature
+        text = self._nl_text()
+
+        with tempfile.TemporaryDirectory(prefix="cached_nl_") as folder:
+            nl_file = os.path.join(folder, "model.nl")
+            with open(nl_file, "w") as f:
+                f.write(text)
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            env = dict(os.environ, AMPLFUNC=self._cache["env"])
+            args = [self.executable, nl_file, "-AMPL"] + [f"{k}={v}" for k, v in self.options.items()]
+            process = subprocess.run(args, env=env, capture_output=True, text=True)
+            solver_time = time.perf_counter() - start
+            if tee:
+                print(process.stdout)
+
+            start = time.perf_counter()
+            sol_file = os.path.join(folder, "model.sol")
+            results = SolverResults()
+            if os.path.exists(sol_file):
+                message, primals, code = read_sol(sol_file)
+                for v, val in zip(self._cache["info"].variables, primals):
+                    if not v.fixed:
+                        v.set_value(val, skip_validation=True)
+                status, termination = _solve_result(code)
+            else:
+                message = process.stderr or process.stdout
+                status, termination = SolverStatus.error, TerminationCondition.error
+            load_time = time.perf_counter() - start
+
+        results.solver.status = status
+        results.solver.termination_condition = termination
+        results.solver.message = message
+
+        stats = parse_ipopt_log(process.stdout)
+        stats.update({
+            "write_time": write_time,
+            "solver_time": solver_time,
+            "load_time": load_time,
+            "rewritten": rewritten,
+        })
+        if rewritten:
+            _log.debug(f"Rewrote NL problem ({self.n_writes} writes)")
+        return results, stats
@@ -0,0 +1,130 @@
+'''
+Phase-level profiling of the series turbine workflow.
+
+A Profiler records the wall and CPU time of named phases (build, set_inputs,
+initialise, solve, report, ...) and of each unit initialize() call as
+structured records (plain dicts), together with the ipopt statistics of each
+solve. CPU time includes child processes, so it covers the ipopt executable.
+
+Functions that accept a profiler default to NULL_PROFILER, whose phases are a
+shared no-op context manager, so profiling costs nothing when it is off.
+'''
+
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+from .solver_stats import solve_with_stats
+
+
+def _cpu_time():
+    # User and system time of this process and its finished children
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class Profiler:
+    """
+    Collects timing and solver records.
+
+    Args:
+        tags: entries added to every record, e.g. {"scenario": 3}
+    """
+
+    enabled = True
+
+    def __init__(self, **tags):
+        self.tags = tags
+        self.records = []
+        # Number of records already written by to_jsonl
+        self._flushed = 0
+
+    @contextmanager
+    def phase(self, name, **tags):
+        """Time the enclosed block as phase name"""
+        wall = time.perf_counter()
+        cpu = _cpu_time()
+        try:
+            yield
+        finally:
+            self.records.append(dict(
+                self.tags,
+                phase=name,
+                wall_time=time.perf_counter() - wall,
+                cpu_time=_cpu_time() - cpu,
+                **tags,
+            ))
+
+    def record(self, name, **data):
+        self.records.append(dict(self.tags, phase=name, **data))
+
+    def solve(self, solver, model, tee=False, **kwargs):
+        """
+        solve_with_stats within a "solve" phase, recording the ipopt
+        statistics including the linear algebra timing.
+        """
+        options = dict(kwargs.pop("options", {}), print_timing_statistics="yes")
+        with self.phase("solve"):
+            result, stats = solve_with_stats(solver, model, tee=tee, options=options, **kwargs)
+        self.records[-1].update(stats, termination=str(result.solver.termination_condition))
+        return result, stats
+
+    def summary(self):
+        """
+        Aggregate records by phase and unit.
+
+        Returns:
+            dict of (phase, unit) to count, total and mean wall and CPU time
+            and, for solves, the total ipopt iterations
+        """
+        groups = defaultdict(list)
+        for r in self.records:
+            groups[(r["phase"], r.get("unit"))].append(r)
+        out = {}
+        for key, records in groups.items():
+            wall = [r["wall_time"] for r in records if "wall_time" in r]
+            cpu = [r["cpu_time"] for r in records if "cpu_time" in r]
+            entry = {
+                "count": len(records),
+                "wall_time": sum(wall),
+                "mean_wall_time": sum(wall) / len(wall) if wall else None,
+                "cpu_time": sum(cpu),
+            }
+            iterations = [r["iterations"] for r in records if r.get("iterations") is not None]
+            if iterations:
+                entry["iterations"] = sum(iterations)
+            out[key] = entry
+        return out
+
+    def extend(self, records):
+        """Add records collected elsewhere, e.g. by worker processes"""
+        self.records.extend(records)
+
+    def to_jsonl(self, path):
+        """Append the records added since the last call to a JSON lines file"""
+        with open(path, "a") as f:
+            for r in self.records[self._flushed:]:
+                f.write(json.dumps(r) + "\n")
+        self._flushed = len(self.records)
+
+
+class _NullProfiler:
+    # Profiler interface that records nothing
+
+    enabled = False
+    records = ()
+    _phase = nullcontext()
+
+    def phase(self, name, **tags):
+        return self._phase
+
+    def record(self, name, **data):
+        pass
+
+    def solve(self, solver, model, tee=False, **kwargs):
+        return solve_with_stats(solver, model, tee=tee, **kwargs)
+
+
+NULL_PROFILER = _NullProfiler()
@@ -0,0 +1,177 @@
+'''
+Persistent, content-addressed cache of solved scenario results.
+
+A result is stored under the SHA-256 of the normalised params (PARAM_KEYS
+rounded to a fixed number of significant digits), the turbine calculation
+method and a fingerprint of the model: the source of the flowsheet and
+turbine modules, the Willans coefficients and the Pyomo and IDAES versions.
+Editing the model or its coefficients therefore changes every key, and old
+entries simply age out.
+
+Entries live in a SQLite database in WAL mode, so any number of processes
+can read and write the same cache file concurrently. A hit returns the
+stored record without building or touching a Pyomo model. The total size of
+the stored records is bounded by max_bytes, least recently used entries
+being evicted first.
+'''
+
+import functools
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import time
+
+import idaes
+from pyomo.version import version as pyomo_version
+
+from . import series_turbine, turbine_base_model
+from .series_turbine import PARAM_KEYS
+from .turbine_base_model import WILLANS_COEFFICIENTS, TurbineBaseData
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    record TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def model_fingerprint():
+    """Hash of the model source, Willans coefficients and package versions"""
+    digest = hashlib.sha256()
+    for module in (series_turbine, turbine_base_model):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    digest.update(json.dumps(WILLANS_COEFFICIENTS, sort_keys=True).encode())
+    digest.update(f"pyomo {pyomo_version} idaes {idaes.__version__}".encode())
+    return digest.hexdigest()
+
+
+def _normalise(v, digits):
+    # Equal up to the significant digits kept gives the same key
+    if hasattr(v, "__len__") and not isinstance(v, str):
+        return [_normalise(x, digits) for x in v]
+    v = float(v)
+    return float(f"{v:.{digits}g}") if math.isfinite(v) else repr(v)
+
+
+class ResultCache:
+    """
+    Size-bounded on-disk cache of results records keyed by scenario params.
+
+    Args:
+        path: SQLite database file, created if needed
+        max_bytes: bound on the total size of the stored records
+        calculation_method: TurbineBase calculation method of the cached
+            flowsheet, part of every key, defaults to the TurbineBase default
+        digits: significant digits params values are rounded to
+    """
+
+    def __init__(self, path, max_bytes=256 * 2**20, calculation_method=None, digits=6):
+        self.path = path
+        self.max_bytes = max_bytes
+        if calculation_method is None:
+            calculation_method = TurbineBaseData.CONFIG.get("calculation_method").value()
+        self.calculation_method = calculation_method
+        self.digits = digits
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pid = None
+        self._connect()
+
+    def __getstate__(self):
+        # Connections do not survive pickling or fork, each process opens its own
+        state = dict(self.__dict__)
+        state["_conn"] = None
+        state["_pid"] = None
+        return state
+
+    def _connect(self):
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def key(self, params):
+        """Content hash of the normalised params, calculation method and model fingerprint"""
+        content = {
+            "params": {k: _normalise(params[k], self.digits) for k in PARAM_KEYS},
+            "calculation_method": self.calculation_method,
+            "model": model_fingerprint(),
+        }
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    def get(self, params):
+        """Stored record for params, or None"""
+        conn = self._connect()
+        key = self.key(params)
+        row = conn.execute("SELECT record FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, params, record):
+        """Store a JSON-serialisable record for params, evicting the least recently used entries over max_bytes"""
+        conn = self._connect()
+        text = json.dumps(record)
+        size = len(text)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, record, size, accessed) VALUES (?, ?, ?, ?)",
+                (self.key(params), text, size, time.time()),
+            )
+            excess = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0] - self.max_bytes
+            if excess > 0:
+                evict = []
+                for key, entry_size in conn.execute("SELECT key, size FROM results ORDER BY accessed"):
+                    if excess <= 0:
+                        break
+                    evict.append((key,))
+                    excess -= entry_size
+                conn.executemany("DELETE FROM results WHERE key = ?", evict)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_or_solve(self, params, solve):
+        """
+        Cached record for params, or solve(params) stored when it is optimal.
+        Records from the cache have "cache_hit" True.
+        """
+        record = self.get(params)
+        if record is not None:
+            record["cache_hit"] = True
+            return record
+        record = solve(params)
+        if record.get("optimal", True):
+            self.put(params, record)
+        record["cache_hit"] = False
+        return record
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def size(self):
+        """Total size of the stored records in bytes"""
+        return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
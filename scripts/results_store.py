@@ -0,0 +1,201 @@
+'''
+Append-only columnar store for scenario results.
+
+Every scenario appended to a ResultsStore becomes one row per time point
+holding its record (params inputs and scalar results), the stream table of
+the flowsheet (the display variables of every arc: flows, T, P, vapour
+fraction, enthalpy) and the performance contents of every unit. Columns are
+named "stream.<arc>.<quantity>" and "unit.<unit>.<quantity>", and the units
+of measurement are kept in the file metadata.
+
+Rows are buffered and written as one Parquet file per chunk, so memory stays
+flat over any number of scenarios and a store can be appended to across
+runs. Reading goes through a pyarrow dataset over the memory-mapped files,
+so a query only reads the columns and row groups it needs.
+
+    with ResultsStore("sweep") as store:
+        for params in scenarios:
+            store.append(engine.solve(params), engine.model)
+
+    df = read_results("sweep", columns=["HP_inlet_flow", "stream.s01.Mass Flow"],
+                      filter=pyarrow.dataset.field("optimal"))
+'''
+
+import glob
+import json
+import os
+import uuid
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow.fs import LocalFileSystem
+
+from pyomo.environ import Block, units, value
+
+from idaes.core import UnitModelBlockData
+from idaes.core.util.tables import arcs_to_stream_dict, stream_states_dict
+
+
+def _value(component):
+    try:
+        return value(component, exception=False)
+    except (ValueError, ArithmeticError):
+        return None
+
+
+def _units(component):
+    try:
+        u = units.get_units(component)
+    except Exception:  # pylint: disable=broad-except
+        return ""
+    return str(u) if u is not None else ""
+
+
+def result_columns(fs):
+    """
+    Stream table and unit performance quantities of a flowsheet.
+
+    Returns:
+        dict of time point to a list of (column name, component) pairs
+    """
+    streams = arcs_to_stream_dict(fs, descend_into=True)
+    unit_blocks = [
+        b for b in fs.component_data_objects(Block, descend_into=True) if isinstance(b, UnitModelBlockData)
+    ]
+    columns = {}
+    for t in fs.time:
+        cols = []
+        for name, sb in stream_states_dict(streams, time_point=t).items():
+            for label, component in sb.define_display_vars().items():
+                for i, c in component.items():
+                    cols.append((f"stream.{name}.{label}" if i is None else f"stream.{name}.{label} {i}", c))
+        for unit in unit_blocks:
+            performance = unit._get_performance_contents(time_point=t)
+            if not performance:
+                continue
+            name = unit.getname(fully_qualified=True, relative_to=fs)
+            for group in ("vars", "exprs", "params"):
+                for label, c in performance.get(group, {}).items():
+                    cols.append((f"unit.{name}.{label}", c))
+        columns[t] = cols
+    return columns
+
+
+class ResultsStore:
+    """
+    Append-only Parquet dataset of scenario results.
+
+    Args:
+        path: dataset directory, created if needed; chunks already in it are
+            kept and read together with the new ones
+        chunk_size: rows buffered before a Parquet file is written
+        compression: Parquet compression codec
+    """
+
+    def __init__(self, path, chunk_size=10000, compression="zstd"):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.n_rows = 0
+
+        self._rows = []
+        self._units = {}
+        # Column plan of the last flowsheet seen, built once per flowsheet
+        self._fs = None
+        self._columns = None
+        # Unique per store, so stores opened together never write the same file
+        self._prefix = f"part-{uuid.uuid4().hex}"
+        self._n_chunks = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _plan(self, fs):
+        if fs is not self._fs:
+            self._fs = fs
+            self._columns = result_columns(fs)
+            for cols in self._columns.values():
+                for name, c in cols:
+                    self._units.setdefault(name, _units(c))
+        return self._columns
+
+    def append(self, record, m=None, fs=None):
+        """
+        Add one scenario.
+
+        Args:
+            record: dict of scalar inputs and results, e.g. a params dict or
+                a ScenarioEngine record
+            m: solved model, None to store the record alone (failed solves)
+            fs: flowsheet to tabulate, defaults to m.fs1
+        """
+        if m is None:
+            self._add(dict(record))
+            return
+        fs = fs if fs is not None else m.fs1
+        for t, cols in self._plan(fs).items():
+            row = dict(record)
+            row["time"] = t
+            for name, c in cols:
+                row[name] = _value(c)
+            self._add(row)
+
+    def _add(self, row):
+        self._rows.append(row)
+        self.n_rows += 1
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows as a new Parquet file"""
+        if not self._rows:
+            return
+        names = list(dict.fromkeys(k for row in self._rows for k in row))
+        table = pa.table({k: [row.get(k) for row in self._rows] for k in names})
+        table = table.replace_schema_metadata(
+            {"units": json.dumps({k: self._units[k] for k in names if k in self._units})}
+        )
+        file_name = f"{self._prefix}-{self._n_chunks:06d}.parquet"
+        # Hidden until complete, dataset discovery skips dot files
+        tmp = os.path.join(self.path, "." + file_name)
+        pq.write_table(table, tmp, compression=self.compression)
+        os.replace(tmp, os.path.join(self.path, file_name))
+        self._n_chunks += 1
+        self._rows = []
+
+    def close(self):
+        self.flush()
+
+
+def open_results(path):
+    """
+    Dataset over every chunk of a results store, read through memory maps.
+    Columns missing from older chunks read as nulls.
+    """
+    files = sorted(glob.glob(os.path.join(os.path.abspath(path), "part-*.parquet")))
+    if not files:
+        raise FileNotFoundError(f"No results in {path}")
+    schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+    return ds.dataset(files, schema=schema, format="parquet", filesystem=LocalFileSystem(use_mmap=True))
+
+
+def read_results(path, columns=None, filter=None):
+    """
+    Read selected columns of the rows matching filter (a pyarrow.dataset
+    expression) into a DataFrame.
+    """
+    return open_results(path).to_table(columns=columns, filter=filter).to_pandas()
+
+
+def result_units(path):
+    """Units of measurement of the stream and unit columns of a results store"""
+    found = {}
+    for f in sorted(glob.glob(os.path.join(path, "part-*.parquet"))):
+        metadata = pq.read_schema(f).metadata or {}
+        found.update(json.loads(metadata.get(b"units", b"{}")))
+    return found
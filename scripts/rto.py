@@ -0,0 +1,315 @@
+'''
+Real-time optimisation daemon for the series turbine flowsheet.
+
+RTODaemon is a long-running process that builds and initialises the
+flowsheet once (through a ScenarioEngine) and then re-optimises it in place
+for every new set of measurements, starting from the last optimal solution.
+Python startup, the IDAES imports, build_model and initialise are paid once,
+so each cycle costs only the input update and a warm-started solve.
+
+Measurements are dicts of params entries (PARAM_KEYS, e.g. the live header
+demands) that are merged into the current params. They arrive through
+submit() from the same process or as JSON lines over a local TCP socket
+(serve()). Measurements that queue up while a solve is running are merged,
+so every cycle optimises for the latest plant state. The setpoints of each
+cycle (an extract_results record) are passed to the publish callback.
+
+A failed solve does not stop the daemon. The cycle is retried once after a
+full initialise; if that fails as well the last optimal solution is
+restored, the previous setpoints are published again marked stale, and the
+next cycle starts from the last optimal solution.
+
+The latency of every cycle, from the arrival of its first measurement to the
+publication of its setpoints, is recorded with the solve time, and
+latency_stats() reports p50, p99 and the misses of the latency target.
+
+    python -m scripts.rto --params params.json --port 8765
+    echo '{"MP_demand_flow": 230}' | nc localhost 8765
+'''
+
+import argparse
+import json
+import math
+import queue
+import signal
+import socketserver
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from pyomo.environ import Var
+
+import idaes.logger as idaeslog
+
+from .scenario_engine import ScenarioEngine
+from .series_turbine import PARAM_KEYS
+
+
+_log = idaeslog.getLogger(__name__)
+
+
+class LastSolution:
+    """
+    Values of the unfixed variables at the last optimal solve, in the
+    warm_start interface of ScenarioEngine (load, store, record_iterations).
+    Cheaper than a WarmStartCache as the values are kept as one array.
+    """
+
+    def __init__(self):
+        self._vars = None
+        self._values = None
+        self.enabled = True
+
+    def load(self, model, params):
+        """Restore the last optimal solution, returns False if there is none"""
+        if not self.enabled or self._values is None:
+            return False
+        for v, x in zip(self._vars, self._values):
+            if not v.fixed:
+                v.set_value(x, skip_validation=True)
+        return True
+
+    def store(self, model, params):
+        if self._vars is None:
+            self._vars = [v for v in model.component_data_objects(Var, descend_into=True) if not v.fixed]
+        self._values = np.array([v.value for v in self._vars], dtype=float)
+
+    def record_iterations(self, iterations, warm):
+        pass
+
+
+class _MeasurementHandler(socketserver.StreamRequestHandler):
+    # One JSON object of measurements per line, answered with "ok" or an error
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self.server.rto.submit(json.loads(line))
+                reply = "ok"
+            except (ValueError, TypeError) as err:
+                reply = f"error: {err}"
+            self.wfile.write((reply + "\n").encode())
+
+
+class _MeasurementServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class RTODaemon:
+    """
+    Keeps one series turbine model in memory and re-optimises it for each
+    new set of measurements.
+
+    Args:
+        params: initial params dict with every PARAM_KEYS entry
+        publish: function called with the setpoints dict of every cycle,
+            defaults to logging them
+        latency_target: cycle latency (s) above which a cycle counts as a miss
+        solver_options: ipopt options of the ScenarioEngine
+        persistent: solve through a CachedNLSolver, see ScenarioEngine
+        window: number of recent cycles kept for the latency statistics
+        profiler: Profiler passed to the ScenarioEngine
+    """
+
+    def __init__(
+        self,
+        params,
+        publish=None,
+        latency_target=60.0,
+        solver_options=None,
+        persistent=False,
+        window=10000,
+        profiler=None,
+    ):
+        missing = set(PARAM_KEYS) - set(params)
+        if missing:
+            raise ValueError(f"Initial params are missing {sorted(missing)}")
+        self.params = {k: float(params[k]) for k in PARAM_KEYS}
+        self.publish = publish if publish is not None else self._log_setpoints
+        self.latency_target = latency_target
+        self.last_solution = LastSolution()
+
+        kwargs = {} if profiler is None else {"profiler": profiler}
+        self.engine = ScenarioEngine(
+            solver_options=solver_options, warm_start=self.last_solution, persistent=persistent, **kwargs
+        )
+        self.setpoints = None
+
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._server = None
+        self._latency = deque(maxlen=window)
+        self._solve_time = deque(maxlen=window)
+        self.stats = {"cycles": 0, "failed_solves": 0, "recoveries": 0, "stale": 0, "misses": 0}
+
+    @staticmethod
+    def _log_setpoints(setpoints):
+        _log.info(f"Setpoints: {setpoints}")
+
+    def submit(self, measurements):
+        """Queue a dict of measured params entries for the next cycle"""
+        if not isinstance(measurements, dict):
+            raise TypeError(f"Measurements must be a dict, not {type(measurements).__name__}")
+        unknown = set(measurements) - set(PARAM_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown measurements {sorted(unknown)}, expected any of {PARAM_KEYS}")
+        values = {k: float(v) for k, v in measurements.items()}
+        if not all(math.isfinite(v) for v in values.values()):
+            raise ValueError(f"Measurements must be finite: {measurements}")
+        self._queue.put((time.perf_counter(), values))
+
+    def _collect(self, timeout):
+        # Block for the next measurements, then merge any others already queued
+        try:
+            received, merged = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None, None
+        merged = dict(merged)
+        while True:
+            try:
+                merged.update(self._queue.get_nowait()[1])
+            except queue.Empty:
+                return received, merged
+
+    def step(self, measurements, received=None):
+        """
+        Update the params with measurements, re-optimise and publish the
+        setpoints.
+
+        Returns:
+            the setpoints dict, with "optimal", "stale" (the previous
+            setpoints republished after a failure), "attempts",
+            "solve_time" and "latency" (s)
+        """
+        received = time.perf_counter() if received is None else received
+        self.params.update(measurements)
+        params = dict(self.params)
+
+        start = time.perf_counter()
+        record = self.engine.solve(params)
+        attempts = 1
+        if not record["optimal"]:
+            # The failed iterate is a poor start, retry from a full initialise
+            self.stats["failed_solves"] += 1
+            _log.warning(f"RTO solve failed ({record['termination']}), retrying after initialise")
+            self.last_solution.enabled = False
+            try:
+                record = self.engine.solve(params)
+            finally:
+                self.last_solution.enabled = True
+            attempts += 1
+            if record["optimal"]:
+                self.stats["recoveries"] += 1
+            else:
+                self.stats["failed_solves"] += 1
+        solve_time = time.perf_counter() - start
+
+        if record["optimal"]:
+            setpoints = self.engine.results()
+            setpoints["optimal"] = True
+            setpoints["stale"] = False
+            self.setpoints = setpoints
+        else:
+            # Hold the last optimal setpoints, the next cycle starts from their solution
+            self.last_solution.load(self.engine.model, params)
+            self.stats["stale"] += 1
+            setpoints = dict(self.setpoints or {}, optimal=False, stale=self.setpoints is not None)
+            setpoints["termination"] = record["termination"]
+        setpoints["params"] = params
+        setpoints["attempts"] = attempts
+        setpoints["solve_time"] = solve_time
+
+        self.publish(setpoints)
+        latency = time.perf_counter() - received
+        setpoints["latency"] = latency
+
+        self.stats["cycles"] += 1
+        self._latency.append(latency)
+        self._solve_time.append(solve_time)
+        if latency > self.latency_target:
+            self.stats["misses"] += 1
+            _log.warning(f"RTO cycle latency {latency:.3f} s above the {self.latency_target} s target")
+        return setpoints
+
+    def run(self, max_cycles=None, poll=0.5):
+        """
+        Process measurements until stop() is called or max_cycles cycles have
+        run. Exceptions from a cycle are logged and the daemon carries on.
+        """
+        n = 0
+        self._stop.clear()
+        while not self._stop.is_set() and (max_cycles is None or n < max_cycles):
+            received, measurements = self._collect(poll)
+            if measurements is None:
+                continue
+            try:
+                self.step(measurements, received)
+            except Exception as err:  # pylint: disable=broad-except
+                _log.exception(f"RTO cycle failed: {err}")
+                self.stats["failed_solves"] += 1
+            n += 1
+
+    def stop(self):
+        self._stop.set()
+
+    def serve(self, host="127.0.0.1", port=8765):
+        """Accept JSON lines of measurements on a local TCP socket, in a background thread"""
+        self._server = _MeasurementServer((host, port), _MeasurementHandler)
+        self._server.rto = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        _log.info(f"RTO daemon listening on {host}:{self._server.server_address[1]}")
+        return self._server.server_address
+
+    def close(self):
+        self.stop()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def latency_stats(self):
+        """
+        p50, p99 and max (s) of the cycle latency and solve time over the
+        recent cycles, with the cycle, failure and latency target miss counts
+        """
+        report = dict(self.stats, latency_target=self.latency_target)
+        for name, times in (("latency", self._latency), ("solve_time", self._solve_time)):
+            if times:
+                p50, p99 = np.percentile(times, [50, 99])
+                report[name] = {"p50": float(p50), "p99": float(p99), "max": float(max(times))}
+            else:
+                report[name] = None
+        return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Real-time optimisation daemon for the series turbine")
+    parser.add_argument("--params", required=True, help="JSON file of the initial params")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-target", type=float, default=60.0, help="cycle latency target (s)")
+    parser.add_argument("--persistent", action="store_true", help="solve from a cached NL file")
+    args = parser.parse_args()
+
+    with open(args.params) as f:
+        initial = json.load(f)
+    with RTODaemon(initial, latency_target=args.latency_target, persistent=args.persistent) as rto:
+        # Solve the initial case so the first measurements start warm
+        rto.step({})
+        rto.serve(args.host, args.port)
+        signal.signal(signal.SIGTERM, lambda *_: rto.stop())
+        try:
+            rto.run()
+        except KeyboardInterrupt:
+            pass
+        print(json.dumps(rto.latency_stats(), indent=2))
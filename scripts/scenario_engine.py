@@ -0,0 +1,149 @@
+'''
+Build-once, re-solve-many scenario engine for the series turbine flowsheet.
+
+The flowsheet, property package and scenario constraints are constructed a
+single time. Each new scenario only updates the mutable Params, re-fixes the
+specified variables and re-solves the model in place, starting from the
+previous solution. With persistent=True the NL problem is also written only
+once and patched with the new inputs for each solve (CachedNLSolver).
+'''
+
+import time
+
+from pyomo.environ import ConcreteModel, SolverFactory, TerminationCondition, check_optimal_termination
+from pyomo.common.errors import ApplicationError
+
+import idaes.logger as idaeslog
+from idaes.core.util.exceptions import InitializationError
+
+from .profiling import NULL_PROFILER
+from .persistent_solver import CachedNLSolver
+from .series_turbine import build_model, add_scenario_params, update_inputs, initialise, extract_results, scenario_input_vars
+
+
+_log = idaeslog.getLogger(__name__)
+
+
+class ScenarioEngine:
+    """
+    Holds a single series turbine model and re-solves it for each scenario.
+
+    Args:
+        solver_options: ipopt options, defaults to the options used by series_tubine
+        reinitialise: if True run initialise() before every solve rather than
+            starting from the previous solution
+        warm_start: optional WarmStartCache, the nearest stored solution is
+            loaded before each solve
+        persistent: if True solve through a CachedNLSolver rather than
+            writing a new NL file for every scenario
+        profiler: Profiler recording each phase of every scenario
+        results_store: optional ResultsStore, every record is appended to it
+            with the stream table and unit performance of optimal solves
+        result_cache: optional ResultCache, a cached record is returned
+            without solving and optimal records are added to it
+    """
+
+    def __init__(
+        self,
+        solver_options=None,
+        reinitialise=False,
+        warm_start=None,
+        persistent=False,
+        profiler=NULL_PROFILER,
+        results_store=None,
+        result_cache=None,
+    ):
+        self.model = ConcreteModel()
+        build_model(self.model)
+        add_scenario_params(self.model)
+
+        self.solver = SolverFactory("ipopt")
+        self.solver.options = dict(solver_options) if solver_options is not None else {"tol": 1e-3, "max_iter": 1000}
+        self.persistent = None
+        if persistent:
+            self.persistent = CachedNLSolver(self.model, inputs=scenario_input_vars(self.model), options=self.solver.options)
+        self.profiler = profiler
+        self.reinitialise = reinitialise
+        self.warm_start = warm_start
+        self.results_store = results_store
+        self.result_cache = result_cache
+
+        # Model has no good starting point until it has been initialised once
+        self._initialised = False
+        self.n_solved = 0
+
+    def set_params(self, params):
+        update_inputs(self.model, params)
+
+    def solve(self, params, tee=False):
+        """
+        Solve the flowsheet for one params dict and return a results record.
+        Solver failures are recorded rather than raised so a batch can continue.
+        """
+        if self.result_cache is not None:
+            cached = self.result_cache.get(params)
+            if cached is not None:
+                cached["cache_hit"] = True
+                return cached
+
+        m = self.model
+        record = dict(params)
+        start = time.perf_counter()
+
+        profiler = self.profiler
+        try:
+            with profiler.phase("set_inputs", scenario=self.n_solved):
+                self.set_params(params)
+            with profiler.phase("warm_start", scenario=self.n_solved):
+                warm = self.warm_start is not None and self.warm_start.load(m, params)
+            record["warm_start"] = warm
+            if warm:
+                self._initialised = True
+            elif self.reinitialise or not self._initialised:
+                with profiler.phase("initialise", scenario=self.n_solved):
+                    initialise(m, profiler)
+                self._initialised = True
+
+            if self.persistent is not None:
+                with profiler.phase("solve", scenario=self.n_solved):
+                    result, stats = self.persistent.solve(tee=tee)
+                profiler.record("solver_stats", scenario=self.n_solved, **stats)
+                for k in ("write_time", "solver_time", "load_time", "rewritten"):
+                    record[k] = stats[k]
+            else:
+                result, stats = profiler.solve(self.solver, m, tee=tee)
+            record["termination"] = str(result.solver.termination_condition)
+            record["optimal"] = check_optimal_termination(result)
+            record["iterations"] = stats["iterations"]
+
+            if self.warm_start is not None and record["optimal"]:
+                self.warm_start.store(m, params)
+                self.warm_start.record_iterations(stats["iterations"], warm)
+        except (ApplicationError, InitializationError, ValueError, RuntimeError) as err:
+            _log.warning(f"Scenario failed: {err}")
+            record["termination"] = str(TerminationCondition.error)
+            record["optimal"] = False
+            record["message"] = str(err)
+
+        record["solve_time"] = time.perf_counter() - start
+
+        if record["optimal"]:
+            record.update(self.results())
+        else:
+            # Values left behind by a failed solve are a poor starting point
+            self._initialised = False
+
+        if self.results_store is not None:
+            self.results_store.append(record, m if record["optimal"] else None)
+        if self.result_cache is not None and record["optimal"]:
+            self.result_cache.put(params, record)
+
+        self.n_solved += 1
+        return record
+
+    def results(self):
+        return extract_results(self.model)
+
+    def run(self, scenarios, tee=False):
+        """Solve a sequence of params dicts, returning one record per scenario"""
+        return [self.solve(params, tee=tee) for params in scenarios]
@@ -0,0 +1,256 @@
+'''
+Parametric sensitivity of a solved series turbine case.
+
+After an optimal solve, SensitivityCase linearises the KKT conditions of the
+flowsheet around the solution and factorises the KKT matrix once. The
+scenario inputs (scenario_input_vars) are treated as variables held by
+equality constraints, so a change in any params entry becomes a change in
+the right-hand side of those rows, and each what-if is answered by a single
+back-solve giving first-order updates of every variable, the multipliers and
+the objective.
+
+The linearisation only holds while the active set is unchanged. Each step is
+checked for inactive constraints or variable bounds that would be crossed and
+for active constraints or bounds whose multipliers would change sign; if any
+would, the what-if falls back to a real re-solve started from the base
+solution, which is then restored.
+
+Derivatives come from PyNumero (PyomoNLP), which needs the ASL library from
+idaes get-extensions.
+'''
+
+import time
+
+import numpy as np
+from scipy.sparse import bmat, csc_matrix
+from scipy.sparse.linalg import splu
+
+from pyomo.common.errors import ApplicationError
+from pyomo.contrib.pynumero.interfaces.pyomo_nlp import PyomoNLP
+from pyomo.environ import Block, Constraint, Param, SolverFactory, check_optimal_termination, value
+
+import idaes.logger as idaeslog
+
+from .series_turbine import extract_results, scenario_input_vars, update_inputs
+from .solver_stats import solve_with_stats
+
+
+_log = idaeslog.getLogger(__name__)
+
+
+def _slack_tol(bound, tol):
+    return tol * np.maximum(1.0, np.abs(np.where(np.isfinite(bound), bound, 0.0)))
+
+
+class _KKTStep:
+    """
+    Linearised KKT system of an NLP at a local solution for a fixed active
+    set, with the rows whose right-hand sides are perturbed.
+
+    Args:
+        y, lb, ub: primal values and bounds
+        c, clb, cub: constraint values and bounds (equalities have clb == cub)
+        jac: constraint Jacobian (sparse)
+        grad: objective gradient
+        hessian: function of the constraint multipliers returning the
+            Hessian of the Lagrangian f + lambda^T c (sparse)
+        rhs_rows: constraint indices of the perturbed equality rows
+        keep_free: primal indices never treated as held at a bound
+        tol: relative tolerance for active constraints and bounds
+    """
+
+    def __init__(self, y, lb, ub, c, clb, cub, jac, grad, hessian, rhs_rows, keep_free=(), tol=1e-4):
+        self.y, self.lb, self.ub = y, lb, ub
+        self.c, self.clb, self.cub = c, clb, cub
+        self.tol = tol
+        jac = jac.tocsr()
+        self.jac = jac
+
+        eq = clb == cub
+        self.con_at_lb = ~eq & np.isfinite(clb) & (c - clb <= _slack_tol(clb, tol))
+        self.con_at_ub = ~eq & np.isfinite(cub) & (cub - c <= _slack_tol(cub, tol))
+        self.active = np.flatnonzero(eq | self.con_at_lb | self.con_at_ub)
+        at_lb = np.isfinite(lb) & (y - lb <= _slack_tol(lb, tol))
+        at_ub = np.isfinite(ub) & (ub - y <= _slack_tol(ub, tol))
+        at_lb[list(keep_free)] = False
+        at_ub[list(keep_free)] = False
+        self.free = np.flatnonzero(~(at_lb | at_ub))
+        self.held = np.flatnonzero(at_lb | at_ub)
+        self.held_at_lb = at_lb[self.held]
+
+        # Multipliers from stationarity in the free variables
+        jac_a = jac[self.active]
+        jac_af = jac_a[:, self.free]
+        lam_a = np.linalg.lstsq(jac_af.T.toarray(), -grad[self.free], rcond=None)[0]
+        self.lam = np.zeros(len(c))
+        self.lam[self.active] = lam_a
+        hess = hessian(self.lam).tocsr()
+        # Reduced gradient of the variables held at bounds
+        self.z = grad[self.held] + jac_a[:, self.held].T @ lam_a
+        self._hess_hf = hess[self.held][:, self.free]
+        self._jac_ah = jac_a[:, self.held]
+
+        kkt = bmat([[hess[self.free][:, self.free], jac_af.T], [jac_af, None]], format="csc")
+        self._lu = splu(csc_matrix(kkt))
+        self._rhs_pos = np.searchsorted(self.active, rhs_rows)
+        self.grad = grad
+
+    def step(self, delta):
+        """
+        First-order step for a change delta in the right-hand sides of the
+        perturbed rows.
+
+        Returns:
+            (dy, dlam, active set unchanged)
+        """
+        n_free = len(self.free)
+        rhs = np.zeros(n_free + len(self.active))
+        rhs[n_free + self._rhs_pos] = delta
+        sol = self._lu.solve(rhs)
+        dy = np.zeros(len(self.y))
+        dy[self.free] = sol[:n_free]
+        dlam = np.zeros(len(self.c))
+        dlam[self.active] = sol[n_free:]
+        return dy, dlam, self._same_active_set(dy, dlam)
+
+    def _same_active_set(self, dy, dlam):
+        tol = self.tol
+        y = self.y + dy
+        free = self.free
+        if np.any(y[free] < self.lb[free] - _slack_tol(self.lb[free], tol)):
+            return False
+        if np.any(y[free] > self.ub[free] + _slack_tol(self.ub[free], tol)):
+            return False
+
+        c = self.c + self.jac @ dy
+        inactive = np.ones(len(c), dtype=bool)
+        inactive[self.active] = False
+        if np.any(inactive & (c < self.clb - _slack_tol(self.clb, tol))):
+            return False
+        if np.any(inactive & (c > self.cub + _slack_tol(self.cub, tol))):
+            return False
+
+        # Multipliers of active inequalities and bounds must keep their sign
+        lam = self.lam + dlam
+        if np.any(lam[self.con_at_ub] < -_slack_tol(self.lam[self.con_at_ub], tol)):
+            return False
+        if np.any(lam[self.con_at_lb] > _slack_tol(self.lam[self.con_at_lb], tol)):
+            return False
+        z = self.z + self._hess_hf @ dy[free] + self._jac_ah.T @ dlam[self.active]
+        margin = _slack_tol(self.z, tol)
+        if np.any(self.held_at_lb & (z < -margin)) or np.any(~self.held_at_lb & (z > margin)):
+            return False
+        return True
+
+
+class SensitivityCase:
+    """
+    First-order what-if answers around an optimal series turbine solution.
+
+    Args:
+        m: series turbine model solved to optimality for params
+        params: params dict of the solved case
+        solver_options: ipopt options for the fallback re-solves
+        tol: relative tolerance for the active constraints and bounds
+    """
+
+    def __init__(self, m, params, solver_options=None, tol=1e-4):
+        self.model = m
+        self.params = dict(params)
+        self.inputs = scenario_input_vars(m)
+        self.base_inputs = np.array([value(v) for v in self.inputs])
+        self.solver = SolverFactory("ipopt")
+        self.solver.options = dict(solver_options) if solver_options is not None else {"tol": 1e-3, "max_iter": 1000}
+        self.stats = {"sensitivity": 0, "resolve": 0}
+
+        # Hold the inputs by equality rows, so they are columns of the KKT system
+        n = len(self.inputs)
+        m._sensitivity = Block()
+        m._sensitivity.target = Param(range(n), initialize=dict(enumerate(self.base_inputs)), mutable=True)
+        m._sensitivity.hold = Constraint(range(n), rule=lambda b, i: self.inputs[i] == b.target[i])
+        for v in self.inputs:
+            v.unfix()
+        try:
+            nlp = PyomoNLP(m)
+            self.variables = nlp.get_pyomo_variables()
+            self.objective = nlp.evaluate_objective()
+
+            def hessian(lam):
+                nlp.set_duals(lam)
+                return nlp.evaluate_hessian_lag()
+
+            self._kkt = _KKTStep(
+                nlp.get_primals(),
+                nlp.primals_lb(),
+                nlp.primals_ub(),
+                nlp.evaluate_constraints(),
+                nlp.constraints_lb(),
+                nlp.constraints_ub(),
+                nlp.evaluate_jacobian(),
+                nlp.evaluate_grad_objective(),
+                hessian,
+                rhs_rows=nlp.get_constraint_indices([m._sensitivity.hold[i] for i in range(n)]),
+                keep_free=nlp.get_primal_indices(self.inputs),
+                tol=tol,
+            )
+        finally:
+            for v in self.inputs:
+                v.fix()
+            m.del_component(m._sensitivity)
+        self.base_values = np.array(self._kkt.y)
+
+    def _input_values(self, params):
+        # Input values update_inputs would set for params, base inputs restored after
+        update_inputs(self.model, params)
+        values = np.array([value(v) for v in self.inputs])
+        update_inputs(self.model, self.params)
+        return values
+
+    def _restore(self):
+        for v, y in zip(self.variables, self.base_values):
+            v.set_value(y, skip_validation=True)
+        update_inputs(self.model, self.params)
+
+    def what_if(self, changes):
+        """
+        Results for the solved case with some params entries changed.
+
+        Args:
+            changes: dict of params entries to change, e.g.
+                {"MP_demand_flow": params["MP_demand_flow"] + 5}
+
+        Returns:
+            extract_results dict with "method" ("sensitivity" or "resolve"),
+            "time", and "variables" (values aligned with self.variables) or,
+            if the fallback re-solve fails, "optimal" False
+        """
+        start = time.perf_counter()
+        params = dict(self.params, **changes)
+        dy, _, same_active_set = self._kkt.step(self._input_values(params) - self.base_inputs)
+        if same_active_set:
+            y = self.base_values + dy
+            for v, x in zip(self.variables, y):
+                v.set_value(x, skip_validation=True)
+            record = extract_results(self.model)
+            record["objective"] = self.objective + self._kkt.grad @ dy
+            record["variables"] = y
+            record["optimal"] = True
+            record["method"] = "sensitivity"
+            self._restore()
+        else:
+            _log.info(f"Active set changes for {changes}, re-solving")
+            update_inputs(self.model, params)
+            record = {"optimal": False}
+            try:
+                result, _ = solve_with_stats(self.solver, self.model)
+                if check_optimal_termination(result):
+                    record = extract_results(self.model)
+                    record["variables"] = np.array([v.value for v in self.variables])
+                    record["optimal"] = True
+            except (ApplicationError, ValueError, RuntimeError) as err:
+                record["message"] = str(err)
+            record["method"] = "resolve"
+            self._restore()
+        self.stats[record["method"]] += 1
+        record["time"] = time.perf_counter() - start
+        return record
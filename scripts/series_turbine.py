@@ -1,5 +1,7 @@
+import numpy as np
+
 # Import Pyomo libraries
-from pyomo.environ import ConcreteModel, SolverFactory, SolverStatus, TerminationCondition, Block, TransformationFactory, units, Objective, value, Constraint, Var, maximize
+from pyomo.environ import ConcreteModel, SolverFactory, SolverStatus, TerminationCondition, Block, TransformationFactory, units, Objective, value, Constraint, Var, Param, maximize, check_optimal_termination
 from pyomo.network import SequentialDecomposition, Port, Arc
 
 
@@ -29,11 +31,29 @@ from idaes.models.properties.general_helmholtz import (
     )
 from idaes.models.unit_models.pressure_changer import ThermodynamicAssumption, Turbine
 from .turbine_base_model import TurbineBase
+from .profiling import NULL_PROFILER
+from .sequential_init import initialize_sequential
+
+
+# Keys of the params dict, flows in t/h, pressures in bar and temperature in C
+PARAM_KEYS = (
+    "HP_inlet_flow",
+    "LP_passout_limit",
+    "MP_demand_flow",
+    "LP_demand_flow",
+    "HP_pressure",
+    "MP_pressure",
+    "LP_pressure",
+    "HP_temperature",
+)
 
 
-def build_model(m):
-    # Define model components and blocks
-    m.fs1 = FlowsheetBlock(dynamic=False)
+def build_model(m, time_set=None):
+    # Define model components and blocks, time_set gives the periods of a multi-period model
+    if time_set is None:
+        m.fs1 = FlowsheetBlock(dynamic=False)
+    else:
+        m.fs1 = FlowsheetBlock(dynamic=False, time_set=list(time_set))
 
     # Attach property package to flowsheet
     m.fs1.water = HelmholtzParameterBlock(
@@ -90,71 +110,206 @@ def build_model(m):
     TransformationFactory("network.expand_arcs").apply_to(m)
     
     
-def set_inputs(m, params):
-    # Unpack params
-    HP_inlet_flow = params['HP_inlet_flow'] * (1000 / 3600)  # Convert t/h to kg/s
-    LP_passout_limit = params['LP_passout_limit'] * (1000 / 3600)  # Convert t/h to kg/s
-    MP_demand_flow = params['MP_demand_flow'] * (1000 / 3600)  # Convert t/h to kg/s
-    LP_demand_flow = params['LP_demand_flow'] * (1000 / 3600)  # Convert t/h to kg/s
-    HP_pressure = params['HP_pressure'] * units.bar
-    MP_pressure = params['MP_pressure'] * units.bar
-    LP_pressure = params['LP_pressure'] * units.bar
-    HP_temp = (params['HP_temperature'] + 273.15) * units.K  # Convert C to K
-
-    # HP turbine
-    m.fs1.HP_stage.inlet.flow_mass.fix(HP_inlet_flow) # why not [0] on mass
-    m.fs1.HP_stage.inlet.enth_mass[0].fix(value(m.fs1.water.htpx(T=HP_temp, p=HP_pressure)))
-    m.fs1.HP_stage.inlet.pressure[0].fix(HP_pressure) # why the [0]
-    m.fs1.HP_stage.outlet.pressure[0].fix(MP_pressure)
-    m.fs1.HP_stage.efficiency_isentropic.fix(0.75)
-
-    # MP splitter
-    #m.fs1.MP_splitter.split_fraction[0, 'MP_next_stage'].fix(LP_passout_limit/HP_inlet_flow)
-    #m.fs1.MP_header_splitter.split_fraction[0, 'MP_demand'].fix(MP_demand_flow/m.fs1.MP_header_splitter.inlet.flow_mass[0])  
-    
-    
-    m.fs1.cons1 = Constraint(expr=(m.fs1.MP_splitter.MP_next_stage.flow_mass[0] <=  LP_passout_limit))
+def add_scenario_params(m):
+    # Scenario inputs are held as mutable Params (SI units) so the flowsheet
+    # can be re-solved for a new scenario without rebuilding it
+    fs = m.fs1
+    fs.HP_inlet_flow = Param(fs.time, initialize=0, mutable=True, units=units.kg / units.s)
+    # Inputs appearing in constraints are fixed Vars, so a cached NL problem
+    # (CachedNLSolver) can update them as column bounds without a rewrite
+    fs.LP_passout_limit = Var(fs.time, initialize=0, units=units.kg / units.s)
+    fs.LP_passout_limit.fix()
+    fs.MP_demand_flow = Var(fs.time, initialize=0, units=units.kg / units.s)
+    fs.MP_demand_flow.fix()
+    fs.LP_demand_flow = Param(fs.time, initialize=0, mutable=True, units=units.kg / units.s)
+    fs.HP_pressure = Param(fs.time, initialize=1e5, mutable=True, units=units.Pa)
+    fs.MP_pressure = Param(fs.time, initialize=1e5, mutable=True, units=units.Pa)
+    fs.LP_pressure = Param(fs.time, initialize=1e5, mutable=True, units=units.Pa)
+    fs.HP_temperature = Param(fs.time, initialize=298.15, mutable=True, units=units.K)
+
+    @fs.Constraint(fs.time)
+    def cons1(fs, t):
+        return fs.MP_splitter.MP_next_stage.flow_mass[t] <= fs.LP_passout_limit[t]
+
     #m.fs1.cons2 = Constraint(expr=(m.fs1.MP_splitter.MP_next_stage.flow_mass[0] + m.fs1.MP_header_splitter.MP_to_letdown.flow_mass[0] == LP_demand_flow))
-    m.fs1.cons3 = Constraint(expr=(m.fs1.MP_header_splitter.MP_demand.flow_mass[0] == MP_demand_flow))
-    m.fs1.objfn = Objective(expr=(m.fs1.LP_stage.work_mechanical[0]))
 
-    # LP stage
-    m.fs1.LP_stage.outlet.pressure[0].fix(LP_pressure)
-    m.fs1.LP_stage.efficiency_isentropic.fix(0.65)
+    @fs.Constraint(fs.time)
+    def cons3(fs, t):
+        return fs.MP_header_splitter.MP_demand.flow_mass[t] == fs.MP_demand_flow[t]
+
+    fs.objfn = Objective(expr=sum(fs.LP_stage.work_mechanical[t] for t in fs.time))
+
+
+def _period_value(v, i):
+    # Scalars apply to every time point, sequences give one value per time point
+    if hasattr(v, "__len__") and not isinstance(v, str):
+        return v[i]
+    return v
+
+
+def update_inputs(m, params):
+    # Unpack params into the scenario Params, each entry is a scalar or one value per period
+    fs = m.fs1
+    for i, t in enumerate(fs.time):
+        fs.HP_inlet_flow[t] = _period_value(params['HP_inlet_flow'], i) * (1000 / 3600)  # Convert t/h to kg/s
+        fs.LP_passout_limit[t] = _period_value(params['LP_passout_limit'], i) * (1000 / 3600)  # Convert t/h to kg/s
+        fs.MP_demand_flow[t] = _period_value(params['MP_demand_flow'], i) * (1000 / 3600)  # Convert t/h to kg/s
+        fs.LP_demand_flow[t] = _period_value(params['LP_demand_flow'], i) * (1000 / 3600)  # Convert t/h to kg/s
+        fs.HP_pressure[t] = _period_value(params['HP_pressure'], i) * 1e5  # Convert bar to Pa
+        fs.MP_pressure[t] = _period_value(params['MP_pressure'], i) * 1e5  # Convert bar to Pa
+        fs.LP_pressure[t] = _period_value(params['LP_pressure'], i) * 1e5  # Convert bar to Pa
+        fs.HP_temperature[t] = _period_value(params['HP_temperature'], i) + 273.15  # Convert C to K
+
+    # (Re-)fix the specified variables from the Params
+    for t in fs.time:
+        # HP turbine
+        fs.HP_stage.inlet.flow_mass[t].fix(value(fs.HP_inlet_flow[t]))
+        fs.HP_stage.inlet.enth_mass[t].fix(value(fs.water.htpx(T=fs.HP_temperature[t], p=fs.HP_pressure[t])))
+        fs.HP_stage.inlet.pressure[t].fix(value(fs.HP_pressure[t]))
+        fs.HP_stage.outlet.pressure[t].fix(value(fs.MP_pressure[t]))
+        fs.HP_stage.efficiency_isentropic[t].fix(0.75)
+
+        # LP stage
+        fs.LP_stage.outlet.pressure[t].fix(value(fs.LP_pressure[t]))
+        fs.LP_stage.efficiency_isentropic[t].fix(0.65)
+
+
+def scenario_input_vars(m):
+    # Fixed variables whose values update_inputs changes between scenarios
+    fs = m.fs1
+    inputs = []
+    for t in fs.time:
+        inputs += [
+            fs.LP_passout_limit[t],
+            fs.MP_demand_flow[t],
+            fs.HP_stage.inlet.flow_mass[t],
+            fs.HP_stage.inlet.enth_mass[t],
+            fs.HP_stage.inlet.pressure[t],
+            fs.HP_stage.outlet.pressure[t],
+            fs.HP_stage.efficiency_isentropic[t],
+            fs.LP_stage.outlet.pressure[t],
+            fs.LP_stage.efficiency_isentropic[t],
+        ]
+    return inputs
+
+
+def set_inputs(m, params):
+    add_scenario_params(m)
+    update_inputs(m, params)
 
     
-def initialise(m):
-    # Initialize the HP stage
-    m.fs1.HP_stage.initialize()
-    m.fs1.MP_splitter.initialize()
-    m.fs1.MP_header_splitter.initialize()
+def initialise(m, profiler=NULL_PROFILER, tear_cache=None):
+    # Initialize all units in arc order, passing port values downstream
+    return initialize_sequential(m.fs1, tear_cache=tear_cache, profiler=profiler)
+
+
+def initialise_units(m, profiler=NULL_PROFILER):
+    # Previous hand-ordered initialisation (LP stage left at its defaults),
+    # kept to compare final-solve iterations against initialise
+    with profiler.phase("initialize", unit="HP_stage"):
+        m.fs1.HP_stage.initialize(routine="explicit")
+    with profiler.phase("initialize", unit="MP_splitter"):
+        m.fs1.MP_splitter.initialize()
+    with profiler.phase("initialize", unit="MP_header_splitter"):
+        m.fs1.MP_header_splitter.initialize()
 
     # Initialize the LP stage
     #m.fs1.LP_stage.initialize()
 
 
+def _result_components(fs, t):
+    # (results key, component) of the key quantities at time point t
+    return (
+        ("HP_work", fs.HP_stage.work_mechanical[t]),
+        ("LP_work", fs.LP_stage.work_mechanical[t]),
+        ("HP_work_electrical", fs.HP_stage.work_electrical[t]),
+        ("LP_work_electrical", fs.LP_stage.work_electrical[t]),
+        ("MP_passout_flow", fs.MP_splitter.MP_passout.flow_mass[t]),
+        ("LP_stage_flow", fs.MP_splitter.MP_next_stage.flow_mass[t]),
+        ("MP_demand_supply", fs.MP_header_splitter.MP_demand.flow_mass[t]),
+        ("MP_letdown_flow", fs.MP_header_splitter.MP_to_letdown.flow_mass[t]),
+        ("HP_outlet_temperature", fs.HP_stage.control_volume.properties_out[t].temperature),
+        ("LP_outlet_temperature", fs.LP_stage.control_volume.properties_out[t].temperature),
+    )
+
+
+def period_results(m, t):
+    # Key results for a single time point (SI units)
+    return {k: value(c) for k, c in _result_components(m.fs1, t)}
+
+
+def extract_results(m, as_array=False):
+    """
+    Read the key results of a solved series flowsheet straight from the
+    model, in SI units, without printing or formatting anything.
+
+    Args:
+        as_array: return a NumPy record array with one record per time
+            point instead of a dict for the first time point
+
+    Returns:
+        dict of the objective and the period_results keys, or a record
+        array with fields time, objective and the period_results keys
+    """
+    fs = m.fs1
+    objective = value(fs.objfn) if hasattr(fs, "objfn") else None
+    if not as_array:
+        record = {"objective": objective}
+        record.update(period_results(m, fs.time.first()))
+        return record
+    rows = [
+        (t, objective, *(value(c) for _, c in _result_components(fs, t)))
+        for t in fs.time
+    ]
+    names = ["time", "objective"] + [k for k, _ in _result_components(fs, fs.time.first())]
+    return np.rec.fromrecords(rows, names=names)
+
+
 def report(m):
     m.fs1.HP_stage.report()
     m.fs1.MP_splitter.report()
     m.fs1.MP_header_splitter.report()
     m.fs1.LP_stage.report()
 
-def series_tubine(m, params):
+def series_tubine(
+    m, params, warm_start=None, profiler=NULL_PROFILER, tear_cache=None, results_store=None, verbose=True
+):
+    # Returns extract_results(m); verbose prints the DOF, iterations and unit reports
     solver = SolverFactory("ipopt")
     solver.options = {"tol": 1e-3, "max_iter": 1000}
 
 
-    build_model(m)  # build flowsheet
-    set_inputs(m, params)
-    initialise(m)  # initialize model
+    with profiler.phase("build"):
+        build_model(m)  # build flowsheet
+    with profiler.phase("set_inputs"):
+        set_inputs(m, params)
+
+    # Start from the nearest stored solution if there is one, otherwise initialise
+    with profiler.phase("warm_start"):
+        warm = warm_start is not None and warm_start.load(m, params)
+    if not warm:
+        with profiler.phase("initialise"):
+            initialise(m, profiler, tear_cache)  # initialize model
 
-    print("DOF before solve: ", degrees_of_freedom(m))
+    if verbose:
+        print("DOF before solve: ", degrees_of_freedom(m))
     
-    result = solver.solve(m, tee=False)
-    report(m)
+    result, stats = profiler.solve(solver, m, tee=False)
+    if verbose:
+        print("Final solve iterations: ", stats["iterations"])
+        with profiler.phase("report"):
+            report(m)
+    if results_store is not None:
+        results_store.append(dict(params, termination=str(result.solver.termination_condition)), m)
+
+    if warm_start is not None and check_optimal_termination(result):
+        warm_start.store(m, params)
+        warm_start.record_iterations(stats["iterations"], warm)
    
     assert result.solver.termination_condition == TerminationCondition.optimal
     #m.fs1.visualize('flowsheet1', loop_forever=True)
+    with profiler.phase("results"):
+        return extract_results(m)
 
 
 
@@ -0,0 +1,563 @@
+'''
+Kinleith site steam system flowsheet (workbook "Flowsheet" sheet).
+
+Boilers raise steam into the HP (45 bar) and IP (24 bar) headers. Steam
+leaves the headers to the mill demands, through letdowns (with
+desuperheating water) to the next header down and through the pass-out
+turbines, which are built with build_turbine_network. The LP (4.5 bar)
+header also supplies live steam to the deaerators, which mix condensate
+return and demin makeup to saturated liquid. BFW pumps feed the boilers,
+whose blowdown is flashed to the LP header where there is a flash tank.
+
+Each header is a mixer (momentum mixing none, pressure from
+header_pressure) followed by a splitter. Every splitter outlet flow is
+linked to header_flow, which set_site_inputs fixes except for one balancing
+outlet per header (BALANCE), so the simulation is square. The
+DEFAULT_DECISIONS are unfixed for optimisation.
+
+Flows are in t/h, pressures in bar and temperatures in C in the site
+specification; the model is in SI units.
+'''
+
+from pyomo.environ import (
+    ConcreteModel,
+    Objective,
+    Param,
+    Set,
+    SolverFactory,
+    TransformationFactory,
+    Var,
+    check_optimal_termination,
+    units,
+    value,
+)
+from pyomo.network import Arc
+
+import idaes.logger as idaeslog
+from idaes.core import FlowsheetBlock
+from idaes.core.util.exceptions import ConfigurationError
+from idaes.core.util.model_statistics import degrees_of_freedom
+from idaes.models.properties.general_helmholtz import (
+    HelmholtzParameterBlock,
+    PhaseType,
+    StateVars,
+    AmountBasis,
+    )
+from idaes.models.unit_models import Heater, Mixer, MomentumMixingType, PressureChanger
+from idaes.models.unit_models import Separator as Splitter
+from idaes.models.unit_models.separator import SplittingType, EnergySplittingType
+from idaes.models.unit_models.pressure_changer import ThermodynamicAssumption
+
+from .decomposition import solve_block_triangular
+from .profiling import NULL_PROFILER
+from .turbine_network import build_turbine_network
+
+
+_log = idaeslog.getLogger(__name__)
+
+_TPH = 1000 / 3600  # t/h to kg/s
+
+# Headers from highest to lowest pressure (bar)
+HEADERS = ("HP", "IP", "MP", "LP")
+HEADER_PRESSURE = {"HP": 45, "IP": 24, "MP": 12.5, "LP": 4.5}
+
+# Steam (t/h) and temperature (C) of the base case, blowdown as a fraction of BFW
+BOILERS = {
+    "4RB": {"header": "HP", "deaerator": "2PG", "steam": 114.62, "max_steam": 130, "temperature": 400, "blowdown": 0.02, "flash": True},
+    "5RB": {"header": "HP", "deaerator": "5RB", "steam": 115.12, "max_steam": 180, "temperature": 400, "blowdown": 0.015, "flash": True},
+    "8PB": {"header": "HP", "deaerator": "8PB", "steam": 45.83, "max_steam": 120, "temperature": 400, "blowdown": 0.02, "flash": True},
+    "7PB": {"header": "IP", "deaerator": "2PG", "steam": 0, "max_steam": 60, "temperature": 250, "blowdown": 0.02, "flash": False},
+    "2PG": {"header": "HP", "deaerator": "2PG", "steam": 0, "max_steam": 80, "temperature": 400, "blowdown": 0.02, "flash": False},
+}
+# Boilers firing in the workbook base case
+IN_SERVICE = ("4RB", "5RB", "8PB")
+
+# Condensate return to each deaerator (t/h)
+DEAERATORS = {"8PB": 30.79, "5RB": 58.27, "2PG": 58.30}
+
+# Mill demands (t/h) without the deaerators, boilers and vent, which are modelled
+DEMANDS = {
+    "HP": {"8PB SB": 5, "4RB SB": 8.95, "5RB SB": 12.81},
+    "IP": {"PM6": 0},
+    "MP": {"2CD": 25.75, "BP": 10.41, "PD2": 33.85, "S&R": 21.28},
+    "LP": {"2CD": 30.29, "BP": 6, "IDP": 2.46, "C&K": 6.89, "4evaps": 33.27, "5evaps": 35.49, "Stripper": 2.25},
+}
+
+# Header to header letdown stations with desuperheating
+LETDOWNS = (("HP", "IP"), ("HP", "MP"), ("IP", "MP"), ("MP", "LP"))
+
+TURBINES = {"cogen": ("HP", "MP", "LP")}
+TURBINE_EFFICIENCY = {"cogen": (0.75, 0.65)}
+
+# Splitter outlet of each header that closes its mass balance
+BALANCE = {"HP": "turbine_cogen", "IP": "letdown_MP", "MP": "letdown_LP", "LP": "vent"}
+
+# Fixed flows (t/h) of the remaining outlets and turbine extraction fractions.
+# Letdowns are kept at a small warming flow, a zero flow leaves the letdown
+# outlet enthalpy undetermined.
+SITE_INPUTS = {
+    "header_flow": {("HP", "letdown_IP"): 2, ("HP", "letdown_MP"): 2},
+    "extraction_fraction": {("cogen", 0): 0.4},
+    "desuperheat_ratio": 0,
+    "bfw_pressure": 85,
+    "condensate_temperature": 104,
+    "makeup_temperature": 35,
+    "desuperheat_water_enthalpy": 637e3,
+    "pump_efficiency": 0.7,
+}
+
+# Variables freed for optimisation
+DEFAULT_DECISIONS = ("boiler_steam", "header_flow", "extraction_fraction")
+
+
+def _header_lists(boilers, network, deaerators):
+    # Mixer inlets and splitter outlets of each header
+    inlets = {h: [] for h in HEADERS}
+    outlets = {h: ["demand"] for h in HEADERS}
+    for b in boilers:
+        inlets[BOILERS[b]["header"]].append(f"boiler_{b}")
+    for h, l in LETDOWNS:
+        inlets[l].append(f"letdown_{h}")
+        outlets[h].append(f"letdown_{l}")
+    for (m, k), (_, outlet) in network.stage_headers.items():
+        inlets[outlet].append(f"{m}_{k}")
+    for m, path in TURBINES.items():
+        outlets[path[0]].append(f"turbine_{m}")
+    inlets["LP"] += [f"flash_{b}" for b in boilers if BOILERS[b]["flash"]]
+    outlets["LP"] += [f"deaerator_{d}" for d in deaerators] + ["vent"]
+    for h in HEADERS:
+        if not inlets[h]:
+            raise ConfigurationError(f"Header {h} has no supply")
+        if BALANCE[h] not in outlets[h]:
+            raise ConfigurationError(f"Balancing outlet {BALANCE[h]} of header {h} does not exist")
+    return inlets, outlets
+
+
+def build_site_model(m, boilers=IN_SERVICE, time_set=None):
+    """
+    Build the site flowsheet on m.fs.
+
+    Args:
+        boilers: boilers in service, keys of BOILERS
+        time_set: time points of a multi-period model
+    """
+    if time_set is None:
+        m.fs = FlowsheetBlock(dynamic=False)
+    else:
+        m.fs = FlowsheetBlock(dynamic=False, time_set=list(time_set))
+    fs = m.fs
+    fs.water = HelmholtzParameterBlock(
+                    pure_component="h2o",
+                    phase_presentation=PhaseType.LG,
+                    state_vars=StateVars.PH,
+                    amount_basis=AmountBasis.MASS,
+                    )
+    for b in boilers:
+        if b not in BOILERS:
+            raise ConfigurationError(f"Unknown boiler {b}")
+    deaerators = [d for d in DEAERATORS if any(BOILERS[b]["deaerator"] == d for b in boilers)]
+    flashes = [b for b in boilers if BOILERS[b]["flash"]]
+
+    fs.boiler_set = Set(initialize=list(boilers), ordered=True)
+    fs.flash_set = Set(initialize=flashes, ordered=True)
+    fs.deaerator_set = Set(initialize=deaerators, ordered=True)
+    fs.letdown_set = Set(initialize=LETDOWNS, dimen=2, ordered=True)
+
+    # Turbines, header sets and header_pressure
+    build_turbine_network(fs, HEADERS, TURBINES, property_package=fs.water, link_inlets=False, expand_arcs=False)
+    inlets, outlets = _header_lists(boilers, fs, deaerators)
+
+    # Headers
+    for h in HEADERS:
+        fs.add_component(f"{h}_supply", Mixer(
+            property_package=fs.water,
+            inlet_list=inlets[h],
+            momentum_mixing_type=MomentumMixingType.none,
+        ))
+        fs.add_component(f"{h}_header", Splitter(
+            property_package=fs.water,
+            outlet_list=outlets[h],
+            split_basis=SplittingType.totalFlow,
+            energy_split_basis=EnergySplittingType.equal_molar_enthalpy,
+        ))
+
+    # Boilers: drum blowdown split, superheated steam and saturated blowdown
+    fs.drum = Splitter(
+        fs.boiler_set,
+        property_package=fs.water,
+        outlet_list=["evaporated", "blowdown"],
+        split_basis=SplittingType.totalFlow,
+        energy_split_basis=EnergySplittingType.equal_molar_enthalpy,
+    )
+    fs.boiler = Heater(fs.boiler_set, property_package=fs.water, has_pressure_change=True)
+    fs.blowdown_heater = Heater(fs.boiler_set, property_package=fs.water, has_pressure_change=True)
+    fs.blowdown_valve = Heater(fs.flash_set, property_package=fs.water, has_pressure_change=True)
+    fs.blowdown_flash = Splitter(
+        fs.flash_set,
+        property_package=fs.water,
+        outlet_list=["vapour", "liquid"],
+        split_basis=SplittingType.phaseFlow,
+        energy_split_basis=EnergySplittingType.enthalpy_split,
+    )
+
+    # Letdowns and desuperheaters
+    fs.letdown = Heater(fs.letdown_set, property_package=fs.water, has_pressure_change=True)
+    fs.desuperheater = Mixer(
+        fs.letdown_set,
+        property_package=fs.water,
+        inlet_list=["steam", "water"],
+        momentum_mixing_type=MomentumMixingType.none,
+    )
+
+    # Deaerators and BFW pumps
+    fs.deaerator = Mixer(
+        fs.deaerator_set,
+        property_package=fs.water,
+        inlet_list=["condensate", "makeup", "steam"],
+        momentum_mixing_type=MomentumMixingType.none,
+    )
+    fs.bfw_pump = PressureChanger(
+        fs.deaerator_set,
+        property_package=fs.water,
+        compressor=True,
+        thermodynamic_assumption=ThermodynamicAssumption.pump,
+    )
+    fed = {d: [b for b in boilers if BOILERS[b]["deaerator"] == d] for d in deaerators}
+    for d in deaerators:
+        if len(fed[d]) > 1:
+            fs.add_component(f"bfw_{d}", Splitter(
+                property_package=fs.water,
+                outlet_list=[f"boiler_{b}" for b in fed[d]],
+                split_basis=SplittingType.totalFlow,
+                energy_split_basis=EnergySplittingType.equal_molar_enthalpy,
+            ))
+
+    # Streams
+    streams = {}
+    for h in HEADERS:
+        streams[f"{h}_header"] = (getattr(fs, f"{h}_supply").outlet, getattr(fs, f"{h}_header").inlet)
+    for b in boilers:
+        h = BOILERS[b]["header"]
+        d = BOILERS[b]["deaerator"]
+        source = getattr(fs, f"bfw_{d}").component(f"boiler_{b}") if len(fed[d]) > 1 else fs.bfw_pump[d].outlet
+        streams[f"bfw_{b}"] = (source, fs.drum[b].inlet)
+        streams[f"evaporated_{b}"] = (fs.drum[b].evaporated, fs.boiler[b].inlet)
+        streams[f"steam_{b}"] = (fs.boiler[b].outlet, getattr(fs, f"{h}_supply").component(f"boiler_{b}"))
+        streams[f"blowdown_{b}"] = (fs.drum[b].blowdown, fs.blowdown_heater[b].inlet)
+    for b in flashes:
+        streams[f"blowdown_valve_{b}"] = (fs.blowdown_heater[b].outlet, fs.blowdown_valve[b].inlet)
+        streams[f"flash_{b}"] = (fs.blowdown_valve[b].outlet, fs.blowdown_flash[b].inlet)
+        streams[f"flash_vapour_{b}"] = (fs.blowdown_flash[b].vapour, fs.LP_supply.component(f"flash_{b}"))
+    for h, l in LETDOWNS:
+        streams[f"letdown_{h}_{l}"] = (getattr(fs, f"{h}_header").component(f"letdown_{l}"), fs.letdown[h, l].inlet)
+        streams[f"desuperheater_{h}_{l}"] = (fs.letdown[h, l].outlet, fs.desuperheater[h, l].steam)
+        streams[f"desuperheated_{h}_{l}"] = (fs.desuperheater[h, l].outlet, getattr(fs, f"{l}_supply").component(f"letdown_{h}"))
+    for d in deaerators:
+        streams[f"deaerator_steam_{d}"] = (fs.LP_header.component(f"deaerator_{d}"), fs.deaerator[d].steam)
+        streams[f"deaerator_{d}"] = (fs.deaerator[d].outlet, fs.bfw_pump[d].inlet)
+        if len(fed[d]) > 1:
+            streams[f"bfw_pump_{d}"] = (fs.bfw_pump[d].outlet, getattr(fs, f"bfw_{d}").inlet)
+    for m_, path in TURBINES.items():
+        streams[f"turbine_{m_}"] = (getattr(fs, f"{path[0]}_header").component(f"turbine_{m_}"), fs.stage[m_, 0].inlet)
+    for (m_, k), (_, outlet) in fs.stage_headers.items():
+        source = fs.extraction[m_, k].extraction if (m_, k) in fs.extraction_set else fs.stage[m_, k].outlet
+        streams[f"{m_}_{k}"] = (source, getattr(fs, f"{outlet}_supply").component(f"{m_}_{k}"))
+    fs.stream = Arc(list(streams), rule=lambda fs, n: {"source": streams[n][0], "destination": streams[n][1]})
+
+    # Site specification
+    fs.header_outlet_set = Set(initialize=[(h, o) for h in HEADERS for o in outlets[h]], dimen=2, ordered=True)
+    fs.header_flow = Var(fs.time, fs.header_outlet_set, initialize=1, bounds=(0, None), units=units.kg / units.s)
+    fs.boiler_steam = Var(fs.time, fs.boiler_set, initialize=10, bounds=(0, None), units=units.kg / units.s)
+    fs.steam_temperature = Var(fs.time, fs.boiler_set, initialize=673.15, units=units.K)
+    fs.deaerator_pressure = Var(fs.time, fs.deaerator_set, initialize=4.5e5, units=units.Pa)
+    fs.bfw_pressure = Var(fs.time, initialize=85e5, units=units.Pa)
+    fs.desuperheat_ratio = Var(fs.time, fs.letdown_set, initialize=0, bounds=(0, None), units=units.dimensionless)
+
+    @fs.Constraint(fs.time, fs.header_outlet_set)
+    def header_outlet_flow(fs, t, h, o):
+        return getattr(fs, f"{h}_header").component(f"{o}_state")[t].flow_mass == fs.header_flow[t, h, o]
+
+    @fs.Constraint(fs.time, fs.header_set)
+    def header_supply_pressure(fs, t, h):
+        return getattr(fs, f"{h}_supply").mixed_state[t].pressure == fs.header_pressure[t, h]
+
+    @fs.Constraint(fs.time, fs.boiler_set)
+    def boiler_steam_flow(fs, t, b):
+        return fs.boiler[b].control_volume.properties_out[t].flow_mass == fs.boiler_steam[t, b]
+
+    @fs.Constraint(fs.time, fs.boiler_set)
+    def boiler_steam_temperature(fs, t, b):
+        return fs.boiler[b].control_volume.properties_out[t].temperature == fs.steam_temperature[t, b]
+
+    @fs.Constraint(fs.time, fs.boiler_set)
+    def boiler_pressure(fs, t, b):
+        return fs.boiler[b].control_volume.properties_out[t].pressure == fs.header_pressure[t, BOILERS[b]["header"]]
+
+    # Blowdown leaves the drum as saturated liquid
+    @fs.Constraint(fs.time, fs.boiler_set)
+    def blowdown_pressure(fs, t, b):
+        return fs.blowdown_heater[b].control_volume.properties_out[t].pressure == fs.header_pressure[t, BOILERS[b]["header"]]
+
+    @fs.Constraint(fs.time, fs.boiler_set)
+    def blowdown_saturated(fs, t, b):
+        state = fs.blowdown_heater[b].control_volume.properties_out[t]
+        return state.enth_mass == state.enth_mass_sat_phase["Liq"]
+
+    @fs.Constraint(fs.time, fs.flash_set)
+    def flash_pressure(fs, t, b):
+        return fs.blowdown_valve[b].control_volume.properties_out[t].pressure == fs.header_pressure[t, "LP"]
+
+    @fs.Constraint(fs.time, fs.letdown_set)
+    def letdown_pressure(fs, t, h, l):
+        return fs.letdown[h, l].control_volume.properties_out[t].pressure == fs.header_pressure[t, l]
+
+    @fs.Constraint(fs.time, fs.letdown_set)
+    def desuperheater_pressure(fs, t, h, l):
+        return fs.desuperheater[h, l].mixed_state[t].pressure == fs.header_pressure[t, l]
+
+    @fs.Constraint(fs.time, fs.letdown_set)
+    def desuperheat_water(fs, t, h, l):
+        return (
+            fs.desuperheater[h, l].water_state[t].flow_mass
+            == fs.desuperheat_ratio[t, h, l] * fs.desuperheater[h, l].steam_state[t].flow_mass
+        )
+
+    # Deaerators deliver saturated liquid at their operating pressure
+    @fs.Constraint(fs.time, fs.deaerator_set)
+    def deaerator_pressure_link(fs, t, d):
+        return fs.deaerator[d].mixed_state[t].pressure == fs.deaerator_pressure[t, d]
+
+    @fs.Constraint(fs.time, fs.deaerator_set)
+    def deaerator_saturated(fs, t, d):
+        state = fs.deaerator[d].mixed_state[t]
+        return state.enth_mass == state.enth_mass_sat_phase["Liq"]
+
+    @fs.Constraint(fs.time, fs.deaerator_set)
+    def bfw_pump_pressure(fs, t, d):
+        return fs.bfw_pump[d].control_volume.properties_out[t].pressure == fs.bfw_pressure[t]
+
+    # Operating cost ($/h): boiler fuel and makeup water less power sales.
+    # Prices are placeholders to be set from the site's contracts.
+    fs.fuel_price = Param(fs.boiler_set, initialize=40, mutable=True, doc="$/MWh fuel")
+    fs.boiler_efficiency = Param(fs.boiler_set, initialize=0.85, mutable=True)
+    fs.power_price = Param(initialize=120, mutable=True, doc="$/MWh")
+    fs.makeup_price = Param(initialize=1, mutable=True, doc="$/t")
+
+    @fs.Expression(fs.time)
+    def generation(fs, t):
+        # MW, turbine work less BFW pump work
+        return -1e-6 * (
+            sum(fs.stage[s].work_mechanical[t] for s in fs.stage_set)
+            + sum(fs.bfw_pump[d].work_mechanical[t] for d in fs.deaerator_set)
+        )
+
+    @fs.Expression(fs.time)
+    def operating_cost(fs, t):
+        return (
+            sum(fs.fuel_price[b] * 1e-6 * fs.boiler[b].heat_duty[t] / fs.boiler_efficiency[b] for b in fs.boiler_set)
+            + fs.makeup_price * sum(fs.deaerator[d].makeup_state[t].flow_mass for d in fs.deaerator_set) / _TPH
+            - fs.power_price * fs.generation[t]
+        )
+
+    fs.objective = Objective(expr=sum(fs.operating_cost[t] for t in fs.time))
+    fs.objective.deactivate()
+
+    TransformationFactory("network.expand_arcs").apply_to(m)
+    return m
+
+
+def set_site_inputs(m, inputs=None, demands=None, boiler_steam=None):
+    """
+    Fix the site specification so the flowsheet is square.
+
+    Args:
+        inputs: overrides of SITE_INPUTS
+        demands: overrides of the header totals of DEMANDS (t/h)
+        boiler_steam: overrides of the boiler steam flows (t/h)
+    """
+    fs = m.fs
+    spec = dict(SITE_INPUTS, **(inputs or {}))
+    demand = {h: sum(DEMANDS[h].values()) for h in HEADERS}
+    demand.update(demands or {})
+    steam = {b: BOILERS[b]["steam"] for b in fs.boiler_set}
+    steam.update(boiler_steam or {})
+
+    for t in fs.time:
+        for h in HEADERS:
+            fs.header_pressure[t, h].fix(HEADER_PRESSURE[h] * 1e5)
+        for h, o in fs.header_outlet_set:
+            if o == "demand":
+                fs.header_flow[t, h, o].fix(demand[h] * _TPH)
+            elif (h, o) in spec["header_flow"]:
+                fs.header_flow[t, h, o].fix(spec["header_flow"][h, o] * _TPH)
+            else:
+                fs.header_flow[t, h, o].unfix()
+        for b in fs.boiler_set:
+            fs.boiler_steam[t, b].fix(steam[b] * _TPH)
+            fs.steam_temperature[t, b].fix(BOILERS[b]["temperature"] + 273.15)
+            fs.drum[b].split_fraction[t, "blowdown"].fix(BOILERS[b]["blowdown"])
+        for b in fs.flash_set:
+            fs.blowdown_valve[b].heat_duty[t].fix(0)
+            fs.blowdown_flash[b].split_fraction[t, "vapour", "Vap"].fix(1)
+            fs.blowdown_flash[b].split_fraction[t, "vapour", "Liq"].fix(0)
+        for h, l in fs.letdown_set:
+            fs.letdown[h, l].heat_duty[t].fix(0)
+            fs.desuperheat_ratio[t, h, l].fix(spec["desuperheat_ratio"])
+            water = fs.desuperheater[h, l].water
+            water.enth_mass[t].fix(spec["desuperheat_water_enthalpy"])
+            water.pressure[t].fix(HEADER_PRESSURE[l] * 1e5)
+        fs.bfw_pressure[t].fix(spec["bfw_pressure"] * 1e5)
+        for d in fs.deaerator_set:
+            fs.deaerator_pressure[t, d].fix(HEADER_PRESSURE["LP"] * 1e5)
+            fs.bfw_pump[d].efficiency_pump[t].fix(spec["pump_efficiency"])
+            condensate, makeup = fs.deaerator[d].condensate, fs.deaerator[d].makeup
+            condensate.flow_mass[t].fix(DEAERATORS[d] * _TPH)
+            for port, T in ((condensate, spec["condensate_temperature"]), (makeup, spec["makeup_temperature"])):
+                port.pressure[t].fix(HEADER_PRESSURE["LP"] * 1e5)
+                port.enth_mass[t].fix(value(fs.water.htpx(T=(T + 273.15) * units.K, p=HEADER_PRESSURE["LP"] * units.bar)))
+        for (m_, k), fraction in spec["extraction_fraction"].items():
+            fs.extraction[m_, k].split_fraction[t, "extraction"].fix(fraction)
+        for m_, efficiencies in TURBINE_EFFICIENCY.items():
+            for k, efficiency in enumerate(efficiencies):
+                fs.stage[m_, k].efficiency_isentropic[t].fix(efficiency)
+
+
+def _guess_port(port, t, pressure, enth, flow=None):
+    # Starting values for the unfixed port variables
+    for name, v in (("pressure", pressure), ("enth_mass", enth), ("flow_mass", flow)):
+        var = getattr(port, name)[t]
+        if v is not None and not var.fixed:
+            var.set_value(v)
+
+
+def guess_site_state(m):
+    """
+    Starting point for the decomposition: header steam conditions on the
+    steam side and saturated liquid conditions on the water side, with the
+    boiler flows at their specified values.
+    """
+    fs = m.fs
+    water = fs.water
+    for t in fs.time:
+        h_steam = {}
+        for h in HEADERS:
+            P = value(fs.header_pressure[t, h])
+            # Roughly 30 K of superheat
+            h_steam[h] = value(water.htpx(p=P * units.Pa, x=1)) + 60e3
+            supply, header = getattr(fs, f"{h}_supply"), getattr(fs, f"{h}_header")
+            _guess_port(supply.outlet, t, P, h_steam[h])
+            _guess_port(header.inlet, t, P, h_steam[h])
+        P_da = value(fs.deaerator_pressure[t, fs.deaerator_set.first()]) if len(fs.deaerator_set) else 4.5e5
+        h_bfw = value(water.htpx(p=P_da * units.Pa, x=0))
+        for b in fs.boiler_set:
+            h = BOILERS[b]["header"]
+            flow = value(fs.boiler_steam[t, b])
+            P = value(fs.header_pressure[t, h])
+            _guess_port(fs.drum[b].inlet, t, value(fs.bfw_pressure[t]), h_bfw, flow)
+            _guess_port(fs.boiler[b].inlet, t, value(fs.bfw_pressure[t]), h_bfw, flow)
+            _guess_port(fs.boiler[b].outlet, t, P, h_steam[h] + 200e3, flow)
+            _guess_port(fs.blowdown_heater[b].outlet, t, P, value(water.htpx(p=P * units.Pa, x=0)), 0.02 * flow)
+        for b in fs.flash_set:
+            _guess_port(fs.blowdown_valve[b].outlet, t, value(fs.header_pressure[t, "LP"]), None)
+        for h, l in fs.letdown_set:
+            _guess_port(fs.letdown[h, l].outlet, t, value(fs.header_pressure[t, l]), h_steam[h])
+            _guess_port(fs.desuperheater[h, l].outlet, t, value(fs.header_pressure[t, l]), h_steam[h])
+        for d in fs.deaerator_set:
+            _guess_port(fs.deaerator[d].outlet, t, P_da, h_bfw)
+            _guess_port(fs.bfw_pump[d].outlet, t, value(fs.bfw_pressure[t]), h_bfw)
+        for (m_, k), (inlet, outlet) in fs.stage_headers.items():
+            _guess_port(fs.stage[m_, k].inlet, t, value(fs.header_pressure[t, inlet]), h_steam[inlet])
+            _guess_port(fs.stage[m_, k].outlet, t, value(fs.header_pressure[t, outlet]), h_steam[outlet])
+
+
+def set_decisions(m, decisions=DEFAULT_DECISIONS, fixed=False):
+    """
+    Unfix (or re-fix) the optimisation decisions: boiler steam flows within
+    their limits, the non-demand header outlet flows and the turbine
+    extraction fractions.
+    """
+    fs = m.fs
+    variables = []
+    for t in fs.time:
+        if "boiler_steam" in decisions:
+            for b in fs.boiler_set:
+                fs.boiler_steam[t, b].setub(BOILERS[b]["max_steam"] * _TPH)
+                variables.append(fs.boiler_steam[t, b])
+        if "header_flow" in decisions:
+            variables += [
+                fs.header_flow[t, h, o] for h, o in fs.header_outlet_set
+                if o.startswith(("letdown_", "turbine_")) and o != BALANCE[h]
+            ]
+        if "extraction_fraction" in decisions:
+            variables += [fs.extraction[s].split_fraction[t, "extraction"] for s in fs.extraction_set]
+    for v in variables:
+        if fixed:
+            v.fix()
+        else:
+            v.unfix()
+
+
+def solve_site(m, optimize=True, solver_options=None, profiler=NULL_PROFILER):
+    """
+    Converge the square site simulation block by block, then (optionally)
+    optimise the operating cost from that point with one full solve.
+
+    Returns:
+        (result of the final solve, decomposition statistics)
+    """
+    solver = SolverFactory("ipopt")
+    solver.options = dict(solver_options) if solver_options is not None else {"tol": 1e-6, "max_iter": 500}
+
+    with profiler.phase("guess"):
+        guess_site_state(m)
+    with profiler.phase("decomposition"):
+        stats = solve_block_triangular(m.fs, solver=solver, profiler=profiler)
+    profiler.record("decomposition_stats", **stats)
+
+    if optimize:
+        set_decisions(m)
+        m.fs.objective.activate()
+    _log.info(f"DOF before solve: {degrees_of_freedom(m)}")
+    result, _ = profiler.solve(solver, m, tee=False)
+    if optimize:
+        m.fs.objective.deactivate()
+        set_decisions(m, fixed=True)
+    if not check_optimal_termination(result):
+        _log.warning(f"Site solve terminated with {result.solver.termination_condition}")
+    return result, stats
+
+
+def site_results(m, t=None):
+    # Key results (t/h and MW) for one time point
+    fs = m.fs
+    t = fs.time.first() if t is None else t
+    results = {
+        "generation": value(fs.generation[t]),
+        "operating_cost": value(fs.operating_cost[t]),
+        "vent": value(fs.header_flow[t, "LP", "vent"]) / _TPH,
+    }
+    for b in fs.boiler_set:
+        results[f"{b}_steam"] = value(fs.boiler_steam[t, b]) / _TPH
+        results[f"{b}_duty"] = value(fs.boiler[b].heat_duty[t]) * 1e-6
+    for h, o in fs.header_outlet_set:
+        if o.startswith(("letdown_", "turbine_")):
+            results[f"{h}_{o}"] = value(fs.header_flow[t, h, o]) / _TPH
+    for d in fs.deaerator_set:
+        results[f"{d}_DA_steam"] = value(fs.deaerator[d].steam_state[t].flow_mass) / _TPH
+        results[f"{d}_makeup"] = value(fs.deaerator[d].makeup_state[t].flow_mass) / _TPH
+    return results
+
+
+if __name__ == "__main__":
+    from .profiling import Profiler
+
+    m = ConcreteModel()
+    build_site_model(m)
+    set_site_inputs(m)
+    profiler = Profiler()
+    result, stats = solve_site(m, profiler=profiler)
+    print(stats)
+    for key, entry in profiler.summary().items():
+        print(key, entry)
+    for key, v in site_results(m).items():
+        print(f"{key}: {v:.2f}")
@@ -0,0 +1,51 @@
+'''
+Solve statistics parsed from the ipopt log.
+'''
+
+import os
+import re
+import tempfile
+
+
+# Summary lines ipopt prints at the end of every solve
+_IPOPT_PATTERNS = {
+    "iterations": (r"Number of Iterations\.*:\s*(\d+)", int),
+    "objective": (r"Objective\.*:\s*\S+\s+(\S+)", float),
+    "constraint_violation": (r"Constraint violation\.*:\s*\S+\s+(\S+)", float),
+    "ipopt_time": (r"Total (?:CPU )?sec(?:ond)?s in IPOPT(?: \(w/o function evaluations\))?\s*=\s*(\S+)", float),
+    "function_evaluation_time": (r"Total (?:CPU )?sec(?:ond)?s in NLP function evaluations\s*=\s*(\S+)", float),
+    "constraint_evaluations": (r"Number of equality constraint evaluations\s*=\s*(\d+)", int),
+    "jacobian_evaluations": (r"Number of equality constraint Jacobian evaluations\s*=\s*(\d+)", int),
+    "hessian_evaluations": (r"Number of Lagrangian Hessian evaluations\s*=\s*(\d+)", int),
+    # Linear algebra CPU time, only printed with print_timing_statistics=yes
+    "factorization_time": (r"LinearSystemFactorization\.*:\s*(\S+)", float),
+    "backsolve_time": (r"LinearSystemBackSolve\.*:\s*(\S+)", float),
+}
+
+
+def parse_ipopt_log(text):
+    """Return a dict of the solve statistics found in an ipopt log"""
+    stats = {}
+    for key, (pattern, convert) in _IPOPT_PATTERNS.items():
+        match = re.search(pattern, text)
+        stats[key] = convert(match.group(1)) if match else None
+    # Iteration lines are marked with an "r" while in the restoration phase
+    restoration = re.findall(r"^\s*\d+(r?)\s+[-+]?\d", text, re.MULTILINE)
+    stats["restoration_phases"] = sum(1 for prev, cur in zip([""] + restoration, restoration) if cur and not prev)
+    return stats
+
+
+def solve_with_stats(solver, model, tee=False, **kwargs):
+    """
+    Solve a model with an ipopt SolverFactory object and return the results
+    together with the statistics parsed from the ipopt log.
+    """
+    fd, logfile = tempfile.mkstemp(suffix=".log", prefix="ipopt_")
+    os.close(fd)
+    try:
+        result = solver.solve(model, tee=tee, logfile=logfile, **kwargs)
+        with open(logfile) as f:
+            stats = parse_ipopt_log(f.read())
+    finally:
+        os.remove(logfile)
+    return result, stats
@@ -0,0 +1,343 @@
+'''
+Tabulated, vectorised steam properties for pre-processing and screening.
+
+Tables are built once from the Helmholtz EoS (HelmholtzParameterBlock, h2o,
+mass basis) and saved as .npy files that are memory-mapped when loaded, so
+h(T, P), s(P, h), T(P, h), h(P, s), Tsat(P) and x(P, h) can be evaluated
+with NumPy for millions of points without touching Pyomo.
+
+Units follow the mass-basis Helmholtz state variables: P in Pa, T in K,
+h in J/kg and s in J/kg/K.
+
+The pressure axis is uniform in ln(P). So that no table cell straddles the
+saturation discontinuity, the second axis is measured from the saturation
+line: superheat, h - h_vap_sat(P) or s - s_vap_sat(P) for vapour, and the fraction of the way
+from saturation down to the triple point for liquid. Two-phase states are
+evaluated exactly from the saturation tables.
+Interpolation is bicubic (Keys cubic convolution over the surrounding 4x4
+points).
+
+The error bound stored with the tables (error_bound attribute) is the
+largest absolute difference from the Helmholtz EoS over all cell centres,
+where the interpolation error of a cubic is largest. It holds for
+pressures below the critical point within the tabulated range.
+'''
+
+import json
+import os
+
+import numpy as np
+
+
+# Points evaluated per block, bounds the memory used by the 4x4 gathers
+_CHUNK = 1 << 18
+
+_T_TRIPLE = 273.16  # K
+
+_TABLES_1D = ("T_sat", "h_liq_sat", "h_vap_sat", "s_liq_sat", "s_vap_sat", "h_liq_min", "s_liq_min")
+
+# Two dimensional tables and the name of their second axis
+_TABLES_2D = {
+    "h_vap_tp": "superheat",
+    "h_liq_tp": "liquid",
+    "T_vap_ph": "dh_vap",
+    "s_vap_ph": "dh_vap",
+    "T_liq_ph": "liquid",
+    "s_liq_ph": "liquid",
+    "h_vap_ps": "ds_vap",
+    "h_liq_ps": "liquid",
+}
+
+
+def _cubic_weights(f):
+    # Keys cubic convolution weights (a = -0.5) of the 4 points around fraction f
+    f2 = f * f
+    f3 = f2 * f
+    return np.stack(
+        [
+            -0.5 * f3 + f2 - 0.5 * f,
+            1.5 * f3 - 2.5 * f2 + 1,
+            -1.5 * f3 + 2 * f2 + 0.5 * f,
+            0.5 * f3 - 0.5 * f2,
+        ],
+        axis=-1,
+    )
+
+
+def _locate(u, n):
+    # Cell index of grid coordinate u and the fraction within it, edge cells extrapolate
+    i = np.clip(np.floor(u).astype(np.int64), 1, n - 3)
+    return i, u - i
+
+
+def _interp1(table, u):
+    i, f = _locate(u, table.shape[0])
+    idx = i[:, None] + np.arange(-1, 3)
+    return (_cubic_weights(f) * table[idx]).sum(axis=-1)
+
+
+def _interp2(table, u, v):
+    out = np.empty(u.shape)
+    offsets = np.arange(-1, 3)
+    for s in range(0, u.size, _CHUNK):
+        i, fi = _locate(u[s:s + _CHUNK], table.shape[0])
+        j, fj = _locate(v[s:s + _CHUNK], table.shape[1])
+        ii = (i[:, None] + offsets)[:, :, None]
+        jj = (j[:, None] + offsets)[:, None, :]
+        out[s:s + _CHUNK] = np.einsum("na,nab,nb->n", _cubic_weights(fi), table[ii, jj], _cubic_weights(fj))
+    return out
+
+
+class _HelmholtzProperties:
+    # Point evaluations of the Helmholtz EoS used to build the tables
+
+    def __init__(self):
+        from pyomo.environ import ConcreteModel, value
+        from idaes.models.properties.general_helmholtz import (
+            HelmholtzParameterBlock,
+            HelmholtzThermoExpressions,
+            AmountBasis,
+        )
+
+        self._value = value
+        self._m = ConcreteModel()
+        self._m.water = HelmholtzParameterBlock(pure_component="h2o", amount_basis=AmountBasis.MASS)
+        self._te = HelmholtzThermoExpressions(self._m, self._m.water)
+
+    def T_sat(self, P):
+        return self._value(self._te.T_sat(P))
+
+    def h_liq_sat(self, P):
+        return self._value(self._te.h_liq_sat(p=P))
+
+    def h_vap_sat(self, P):
+        return self._value(self._te.h_vap_sat(p=P))
+
+    def s_liq_sat(self, P):
+        return self._value(self._te.s_liq_sat(p=P))
+
+    def s_vap_sat(self, P):
+        return self._value(self._te.s_vap_sat(p=P))
+
+    def h_liq_min(self, P):
+        return self._value(self._te.h(T=_T_TRIPLE, p=P, x=0))
+
+    def s_liq_min(self, P):
+        return self._value(self._te.s(T=_T_TRIPLE, p=P, x=0))
+
+    def h_tp(self, T, P, x):
+        return self._value(self._te.h(T=T, p=P, x=x))
+
+    def T_ph(self, P, h):
+        return self._value(self._te.T(h=h, p=P))
+
+    def s_ph(self, P, h):
+        return self._value(self._te.s(h=h, p=P))
+
+    def h_ps(self, P, s):
+        return self._value(self._te.h(s=s, p=P))
+
+
+class SteamTables:
+    """
+    Vectorised steam property tables, see the module docstring.
+
+    Build once with SteamTables.build(), save() to a folder and load() with
+    memory mapping. All property methods accept scalars or arrays and
+    broadcast their arguments.
+    """
+
+    def __init__(self, tables, grid, error_bound=None):
+        self.tables = tables
+        self.grid = grid
+        self.error_bound = error_bound or {}
+
+    # -------------------------------------------------------------------------
+    # Grid coordinates
+    def _u(self, P):
+        return (np.log(P) - self.grid["ln_p_min"]) / self.grid["d_ln_p"]
+
+    def _v(self, axis, d):
+        return d / self.grid["d_" + axis]
+
+    def _w(self, fraction):
+        # Liquid axis coordinate from the fraction of the way to the triple point
+        return fraction * (self.grid["n"] - 1)
+
+    @staticmethod
+    def _flatten(*args):
+        arrays = np.broadcast_arrays(*[np.asarray(a, dtype=float) for a in args])
+        return arrays[0].shape, [a.ravel() for a in arrays]
+
+    def _saturation(self, u):
+        return {k: _interp1(self.tables[k], u) for k in _TABLES_1D}
+
+    # -------------------------------------------------------------------------
+    # Properties
+    def Tsat(self, P):
+        """Saturation temperature [K] at pressure P [Pa]"""
+        shape, (P,) = self._flatten(P)
+        return _interp1(self.tables["T_sat"], self._u(P)).reshape(shape)
+
+    def h(self, T, P):
+        """Specific enthalpy [J/kg] at temperature T [K] and pressure P [Pa]"""
+        shape, (T, P) = self._flatten(T, P)
+        u = self._u(P)
+        dT = T - _interp1(self.tables["T_sat"], u)
+        out = np.empty(T.shape)
+        vap = dT >= 0
+        liq = ~vap
+        out[vap] = _interp2(self.tables["h_vap_tp"], u[vap], self._v("superheat", dT[vap]))
+        T_sat = T[liq] - dT[liq]
+        out[liq] = _interp2(self.tables["h_liq_tp"], u[liq], self._w(-dT[liq] / (T_sat - _T_TRIPLE)))
+        return out.reshape(shape)
+
+    def _two_region(self, P, y, name, vap_table, liq_table, two_phase):
+        # Property at P and y, where y is the enthalpy or entropy called name
+        shape, (P, y) = self._flatten(P, y)
+        u = self._u(P)
+        sat = self._saturation(u)
+        y_liq, y_vap = sat[name + "_liq_sat"], sat[name + "_vap_sat"]
+        out = np.empty(y.shape)
+        vap = y >= y_vap
+        liq = y <= y_liq
+        mix = ~(vap | liq)
+        out[vap] = _interp2(self.tables[vap_table], u[vap], self._v("d" + name + "_vap", y[vap] - y_vap[vap]))
+        fraction = (y_liq[liq] - y[liq]) / (y_liq[liq] - sat[name + "_liq_min"][liq])
+        out[liq] = _interp2(self.tables[liq_table], u[liq], self._w(fraction))
+        x = (y[mix] - y_liq[mix]) / (y_vap[mix] - y_liq[mix])
+        out[mix] = two_phase({k: v[mix] for k, v in sat.items()}, x)
+        return out.reshape(shape)
+
+    def T(self, P, h):
+        """Temperature [K] at pressure P [Pa] and specific enthalpy h [J/kg]"""
+        return self._two_region(P, h, "h", "T_vap_ph", "T_liq_ph", lambda sat, x: sat["T_sat"])
+
+    def s(self, P, h):
+        """Specific entropy [J/kg/K] at pressure P [Pa] and specific enthalpy h [J/kg]"""
+        return self._two_region(
+            P, h, "h", "s_vap_ph", "s_liq_ph",
+            lambda sat, x: sat["s_liq_sat"] + x * (sat["s_vap_sat"] - sat["s_liq_sat"]),
+        )
+
+    def h_ps(self, P, s):
+        """Specific enthalpy [J/kg] at pressure P [Pa] and specific entropy s [J/kg/K]"""
+        return self._two_region(
+            P, s, "s", "h_vap_ps", "h_liq_ps",
+            lambda sat, x: sat["h_liq_sat"] + x * (sat["h_vap_sat"] - sat["h_liq_sat"]),
+        )
+
+    def x(self, P, h):
+        """Vapour fraction [-] at pressure P [Pa] and specific enthalpy h [J/kg]"""
+        shape, (P, h) = self._flatten(P, h)
+        u = self._u(P)
+        hl = _interp1(self.tables["h_liq_sat"], u)
+        hv = _interp1(self.tables["h_vap_sat"], u)
+        return np.clip((h - hl) / (hv - hl), 0, 1).reshape(shape)
+
+    # -------------------------------------------------------------------------
+    # Building, saving and loading
+    @classmethod
+    def build(
+        cls,
+        p_range=(5e3, 150e5),
+        n_p=161,
+        superheat=400.0,
+        dh_vap=1.4e6,
+        ds_vap=2.5e3,
+        n=101,
+        properties=None,
+    ):
+        """
+        Build tables from the Helmholtz EoS.
+
+        Args:
+            p_range: (min, max) pressure [Pa], max must be below the critical point
+            n_p: number of pressure points, uniform in ln(P)
+            superheat: largest superheat [K] in the vapour P-T table
+            dh_vap: largest enthalpy above saturated vapour [J/kg] in the
+                vapour P-h tables
+            ds_vap: largest entropy above saturated vapour [J/kg/K] in the
+                vapour P-s table
+            n: number of points on the second axis of each table
+            properties: point property evaluator, defaults to the Helmholtz EoS
+        """
+        props = properties if properties is not None else _HelmholtzProperties()
+
+        ln_p = np.linspace(np.log(p_range[0]), np.log(p_range[1]), n_p)
+        grid = {
+            "ln_p_min": float(ln_p[0]),
+            "d_ln_p": float(ln_p[1] - ln_p[0]),
+            "n_p": n_p,
+            "n": n,
+            "d_superheat": superheat / (n - 1),
+            "d_dh_vap": dh_vap / (n - 1),
+            "d_ds_vap": ds_vap / (n - 1),
+        }
+        tables = cls._evaluate(props, grid, np.exp(ln_p), np.arange(n, dtype=float))
+
+        # Error bound from the cell centres of the grid
+        result = cls(tables, grid)
+        centres = cls._evaluate(props, grid, np.exp(ln_p[1:-2] + grid["d_ln_p"] / 2), np.arange(1, n - 2) + 0.5)
+        result.error_bound = result._compare(centres, np.exp(ln_p[1:-2] + grid["d_ln_p"] / 2), np.arange(1, n - 2) + 0.5)
+        return result
+
+    @staticmethod
+    def _evaluate(props, grid, P, k):
+        # Property values at pressures P and second-axis grid coordinates k
+        sat = {name: np.array([getattr(props, name)(p) for p in P]) for name in _TABLES_1D}
+        tables = dict(sat)
+        h_tp = {"h_vap_tp": [], "h_liq_tp": []}
+        ph = {name: [] for name in ("T_vap_ph", "s_vap_ph", "T_liq_ph", "s_liq_ph", "h_vap_ps", "h_liq_ps")}
+        for i, p in enumerate(P):
+            T_vap = sat["T_sat"][i] + k * grid["d_superheat"]
+            T_liq = sat["T_sat"][i] - k / (grid["n"] - 1) * (sat["T_sat"][i] - _T_TRIPLE)
+            h_tp["h_vap_tp"].append([props.h_tp(T, p, 1) for T in T_vap])
+            h_tp["h_liq_tp"].append([props.h_tp(T, p, 0) for T in T_liq])
+
+            h_vap = sat["h_vap_sat"][i] + k * grid["d_dh_vap"]
+            h_liq = sat["h_liq_sat"][i] - k / (grid["n"] - 1) * (sat["h_liq_sat"][i] - sat["h_liq_min"][i])
+            ph["T_vap_ph"].append([props.T_ph(p, h) for h in h_vap])
+            ph["s_vap_ph"].append([props.s_ph(p, h) for h in h_vap])
+            ph["T_liq_ph"].append([props.T_ph(p, h) for h in h_liq])
+            ph["s_liq_ph"].append([props.s_ph(p, h) for h in h_liq])
+
+            s_vap = sat["s_vap_sat"][i] + k * grid["d_ds_vap"]
+            s_liq = sat["s_liq_sat"][i] - k / (grid["n"] - 1) * (sat["s_liq_sat"][i] - sat["s_liq_min"][i])
+            ph["h_vap_ps"].append([props.h_ps(p, s) for s in s_vap])
+            ph["h_liq_ps"].append([props.h_ps(p, s) for s in s_liq])
+
+        tables.update({name: np.array(v) for name, v in h_tp.items()})
+        tables.update({name: np.array(v) for name, v in ph.items()})
+        return tables
+
+    def _compare(self, reference, P, k):
+        # Largest absolute error of each table against reference values
+        u = self._u(P)
+        error = {}
+        for name in _TABLES_1D:
+            error[name] = float(np.max(np.abs(_interp1(self.tables[name], u) - reference[name])))
+        uu, kk = np.meshgrid(u, k, indexing="ij")
+        for name in _TABLES_2D:
+            approx = _interp2(self.tables[name], uu.ravel(), kk.ravel()).reshape(uu.shape)
+            error[name] = float(np.max(np.abs(approx - reference[name])))
+        return error
+
+    def save(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        for name, table in self.tables.items():
+            np.save(os.path.join(folder, name + ".npy"), np.asarray(table))
+        with open(os.path.join(folder, "steam_tables.json"), "w") as f:
+            json.dump({"grid": self.grid, "error_bound": self.error_bound}, f, indent=2)
+
+    @classmethod
+    def load(cls, folder, mmap=True):
+        """Load saved tables, memory-mapped unless mmap is False"""
+        with open(os.path.join(folder, "steam_tables.json")) as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        tables = {
+            name: np.load(os.path.join(folder, name + ".npy"), mmap_mode=mode)
+            for name in list(_TABLES_1D) + list(_TABLES_2D)
+        }
+        return cls(tables, meta["grid"], meta["error_bound"])
@@ -0,0 +1,369 @@
+'''
+Two-stage stochastic operation of the series turbine flowsheet, solved by
+progressive hedging.
+
+First-stage decisions (by default the HP inlet flow and the LP passout
+limit) are shared by every demand scenario, the splitter flows are second
+stage and adapt to each scenario's MP demand. The series model has no LP
+header balance (cons2 is disabled in add_scenario_params), so LP demand
+uncertainty is not modelled: scenarios that differ only in keys of
+UNMODELLED_KEYS are rejected, and varying such keys alongside others only
+logs a warning. Each scenario is a
+series turbine model in which the first-stage inputs are unfixed and the
+objective carries the progressive hedging terms
+
+    cost_s + sum_k w_sk x_sk + rho_k / 2 (x_sk - xbar_k)^2
+
+ProgressiveHedging iterates the scenario solves, the probability-weighted
+average xbar and the multiplier update w_sk += rho_k (x_sk - xbar_k) until
+the scenarios agree on the first-stage decisions. Every scenario subproblem
+of an iteration is independent, so they are solved by a process pool in
+which each worker holds a single model and re-solves it for any scenario,
+warm started from that scenario's previous solution. Memory therefore grows
+with the number of workers, not the number of scenarios, and the warm-start
+vectors passed with each task are a few hundred floats.
+
+First-stage values, w, xbar and rho are in params units (t/h) and the cost
+in the units of the series objective (W).
+'''
+
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pyomo.common.errors import ApplicationError
+from pyomo.environ import (
+    ConcreteModel,
+    Expression,
+    Objective,
+    Param,
+    SolverFactory,
+    Var,
+    check_optimal_termination,
+    value,
+)
+
+import idaes.logger as idaeslog
+from idaes.core.util.exceptions import InitializationError
+
+from .profiling import NULL_PROFILER
+from .series_turbine import add_scenario_params, build_model, initialise, period_results, update_inputs
+from .solver_stats import solve_with_stats
+
+
+_log = idaeslog.getLogger(__name__)
+
+# params key -> (first-stage variable at time t, params units to SI)
+FIRST_STAGE_VARS = {
+    "HP_inlet_flow": (lambda fs, t: fs.HP_stage.inlet.flow_mass[t], 1000 / 3600),
+    "LP_passout_limit": (lambda fs, t: fs.LP_passout_limit[t], 1000 / 3600),
+}
+FIRST_STAGE = ("HP_inlet_flow", "LP_passout_limit")
+
+# params keys that reach no constraint of the series model, so scenarios
+# varying them give identical subproblems
+UNMODELLED_KEYS = ("LP_demand_flow",)
+
+
+class ScenarioSubproblem:
+    """
+    Series turbine model with unfixed first-stage inputs and the progressive
+    hedging terms on its objective, re-solved in place for any scenario.
+
+    Args:
+        first_stage: params keys of the first-stage decisions
+        bounds: dict of first-stage key to (lower, upper) in params units,
+            either may be None
+        steam_cost: cost of HP inlet steam in objective units (W) per t/h
+        solver_options: ipopt options
+    """
+
+    def __init__(self, first_stage=FIRST_STAGE, bounds=None, steam_cost=0.0, solver_options=None):
+        for k in first_stage:
+            if k not in FIRST_STAGE_VARS:
+                raise ValueError(f"'{k}' cannot be a first-stage decision, expected any of {tuple(FIRST_STAGE_VARS)}")
+        m = ConcreteModel()
+        build_model(m)
+        add_scenario_params(m)
+        fs = m.fs1
+        t = fs.time.first()
+        self.model = m
+        self.first_stage = {k: FIRST_STAGE_VARS[k][0](fs, t) for k in first_stage}
+        self._scale = {k: FIRST_STAGE_VARS[k][1] for k in first_stage}
+        for k, (lb, ub) in (bounds or {}).items():
+            self.first_stage[k].setlb(None if lb is None else lb * self._scale[k])
+            self.first_stage[k].setub(None if ub is None else ub * self._scale[k])
+
+        m.ph_w = Param(list(first_stage), initialize=0, mutable=True)
+        m.ph_xbar = Param(list(first_stage), initialize=0, mutable=True)
+        m.ph_rho = Param(list(first_stage), initialize=0, mutable=True)
+        m.steam_cost = Param(initialize=steam_cost, mutable=True)
+
+        def decision(k):
+            # First-stage variable in params units
+            return self.first_stage[k] / self._scale[k]
+
+        fs.objfn.deactivate()
+        m.scenario_cost = Expression(
+            expr=fs.objfn.expr + m.steam_cost * sum(fs.HP_stage.inlet.flow_mass[t] for t in fs.time) * 3.6
+        )
+        m.ph_objective = Objective(
+            expr=m.scenario_cost
+            + sum(
+                m.ph_w[k] * decision(k) + m.ph_rho[k] / 2 * (decision(k) - m.ph_xbar[k]) ** 2
+                for k in first_stage
+            )
+        )
+
+        self.solver = SolverFactory("ipopt")
+        self.solver.options = dict(solver_options) if solver_options is not None else {"tol": 1e-3, "max_iter": 1000}
+        # Built identically in every worker, so warm-start vectors line up
+        self._vars = list(m.component_data_objects(Var, sort=True))
+
+    def _load(self, warm):
+        for v, x in zip(self._vars, warm):
+            if x is not None and not v.fixed:
+                v.set_value(x, skip_validation=True)
+
+    def solve(self, params, w=None, xbar=None, rho=None, warm=None, fix_first_stage=False):
+        """
+        Solve one scenario.
+
+        Args:
+            params: full params dict of the scenario, its first-stage
+                entries are the starting point of the first-stage decisions
+            w, xbar, rho: dicts of first-stage key to progressive hedging
+                multiplier, average and penalty, None for no penalty
+            warm: warm-start vector returned by an earlier solve of the
+                same scenario, None to initialise from params
+            fix_first_stage: fix the first-stage decisions at xbar and
+                solve the second stage only
+
+        Returns:
+            dict with the first-stage values x, cost, optimal, iterations,
+            the key second-stage results and the warm-start vector
+        """
+        m = self.model
+        update_inputs(m, params)
+        for k, var in self.first_stage.items():
+            m.ph_w[k] = (w or {}).get(k, 0)
+            m.ph_xbar[k] = (xbar or {}).get(k, 0)
+            m.ph_rho[k] = (rho or {}).get(k, 0)
+            var.unfix()
+
+        record = {"optimal": False, "iterations": None}
+        try:
+            if warm is not None:
+                self._load(warm)
+            else:
+                # First-stage values from params give the initial point
+                for var in self.first_stage.values():
+                    var.fix()
+                initialise(m)
+                for var in self.first_stage.values():
+                    var.unfix()
+            if fix_first_stage:
+                for k, var in self.first_stage.items():
+                    var.fix(xbar[k] * self._scale[k])
+            result, stats = solve_with_stats(self.solver, m)
+            record["optimal"] = check_optimal_termination(result)
+            record["iterations"] = stats["iterations"]
+        except (ApplicationError, InitializationError, ValueError, RuntimeError) as err:
+            record["message"] = str(err)
+
+        record["x"] = {k: value(var) / self._scale[k] for k, var in self.first_stage.items()}
+        if record["optimal"]:
+            record["cost"] = value(m.scenario_cost)
+            record.update(period_results(m, m.fs1.time.first()))
+            record["warm"] = [v.value for v in self._vars]
+        else:
+            record["cost"] = None
+            record["warm"] = None
+        return record
+
+
+# Per-process subproblem, created by the pool initializer
+_subproblem = None
+
+
+def _init_worker(first_stage, bounds, steam_cost, solver_options):
+    global _subproblem
+    _subproblem = ScenarioSubproblem(first_stage, bounds, steam_cost, solver_options)
+
+
+def _solve(subproblem, task):
+    # Any failure is turned into a record so it never takes the worker down
+    try:
+        return subproblem.solve(**task)
+    except Exception as err:  # pylint: disable=broad-except
+        return {"optimal": False, "iterations": None, "x": None, "cost": None, "warm": None, "message": str(err)}
+
+
+def _solve_task(task):
+    return _solve(_subproblem, task)
+
+
+class ProgressiveHedging:
+    """
+    Progressive hedging over a set of demand scenarios.
+
+    Args:
+        base_params: params dict supplying every entry a scenario leaves out,
+            its first-stage entries are the initial first-stage decisions
+        scenarios: list of dicts of the params entries that vary, e.g.
+            {"MP_demand_flow": 230}, varying UNMODELLED_KEYS has no effect
+        probabilities: scenario probabilities, uniform if None
+        first_stage: params keys of the first-stage decisions
+        bounds: dict of first-stage key to (lower, upper) in params units,
+            defaults to (0, base_params value) for each decision
+        steam_cost: cost of HP inlet steam in objective units (W) per t/h
+        rho: penalty in objective units per (t/h)^2, a number or a dict by
+            first-stage key
+        n_workers: worker processes, 1 solves in this process
+        solver_options: ipopt options
+        profiler: Profiler recording each iteration
+    """
+
+    def __init__(
+        self,
+        base_params,
+        scenarios,
+        probabilities=None,
+        first_stage=FIRST_STAGE,
+        bounds=None,
+        steam_cost=0.0,
+        rho=1e4,
+        n_workers=None,
+        solver_options=None,
+        profiler=NULL_PROFILER,
+    ):
+        self.first_stage = tuple(first_stage)
+        self.params = [dict(base_params, **s) for s in scenarios]
+        varying = {k for p in self.params for k in p if p[k] != self.params[0][k]}
+        unmodelled = sorted(varying & set(UNMODELLED_KEYS))
+        if unmodelled:
+            if varying <= set(UNMODELLED_KEYS):
+                raise ValueError(
+                    f"Scenarios differ only in {unmodelled}, which no constraint of the series model uses"
+                )
+            _log.warning(f"Scenarios vary {unmodelled}, which no constraint of the series model uses")
+        n = len(self.params)
+        if probabilities is None:
+            probabilities = [1 / n] * n
+        if len(probabilities) != n or not math.isclose(sum(probabilities), 1.0):
+            raise ValueError("Scenario probabilities must match the scenarios and sum to one")
+        self.probabilities = list(probabilities)
+        if bounds is None:
+            bounds = {k: (0, base_params[k]) for k in self.first_stage}
+        self.bounds = bounds
+        self.steam_cost = steam_cost
+        self.rho = rho if isinstance(rho, dict) else {k: rho for k in self.first_stage}
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.solver_options = solver_options
+        self.profiler = profiler
+        self.history = []
+
+    def _solve_all(self, executor, local, tasks):
+        if local is not None:
+            return [_solve(local, task) for task in tasks]
+        chunksize = max(1, len(tasks) // (4 * self.n_workers))
+        return list(executor.map(_solve_task, tasks, chunksize=chunksize))
+
+    def _average(self, x):
+        return {k: sum(p * xs[k] for p, xs in zip(self.probabilities, x)) for k in self.first_stage}
+
+    def solve(self, max_iter=50, tol=0.1):
+        """
+        Run progressive hedging and evaluate the hedged decision.
+
+        Args:
+            max_iter: iteration limit
+            tol: convergence tolerance on the probability-weighted mean
+                absolute deviation of the scenario first-stage values from
+                xbar, summed over the decisions (t/h)
+
+        Returns:
+            dict with the first-stage decisions, the expected cost, whether
+            it converged, the iteration count and one results record per
+            scenario from the second-stage solves at the hedged decisions
+        """
+        n = len(self.params)
+        self.history = []
+        local = executor = None
+        if self.n_workers == 1:
+            local = ScenarioSubproblem(self.first_stage, self.bounds, self.steam_cost, self.solver_options)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                initializer=_init_worker,
+                initargs=(self.first_stage, self.bounds, self.steam_cost, self.solver_options),
+            )
+        try:
+            warm = [None] * n
+            x = [{k: p[k] for k in self.first_stage} for p in self.params]
+            w = [{k: 0.0 for k in self.first_stage} for _ in range(n)]
+            xbar, rho = None, None
+            converged = False
+            for iteration in range(max_iter):
+                start = time.perf_counter()
+                with self.profiler.phase("ph_iteration", iteration=iteration):
+                    tasks = [
+                        {"params": p, "w": w[s], "xbar": xbar, "rho": rho, "warm": warm[s]}
+                        for s, p in enumerate(self.params)
+                    ]
+                    records = self._solve_all(executor, local, tasks)
+                failed = 0
+                for s, record in enumerate(records):
+                    if record["optimal"]:
+                        x[s] = record["x"]
+                        warm[s] = record["warm"]
+                    else:
+                        # Keep the scenario's last first-stage values, restart it cold
+                        failed += 1
+                        warm[s] = None
+                xbar = self._average(x)
+                rho = self.rho
+                for s in range(n):
+                    for k in self.first_stage:
+                        w[s][k] += rho[k] * (x[s][k] - xbar[k])
+                gap = sum(p * sum(abs(xs[k] - xbar[k]) for k in self.first_stage) for p, xs in zip(self.probabilities, x))
+                self.history.append({
+                    "iteration": iteration,
+                    "gap": gap,
+                    "failed": failed,
+                    "xbar": dict(xbar),
+                    "time": time.perf_counter() - start,
+                    "subproblem_iterations": sum(r["iterations"] or 0 for r in records),
+                })
+                _log.info(f"PH iteration {iteration}: gap {gap:.4g} t/h, {failed} failed, xbar {xbar}")
+                if gap < tol and failed == 0:
+                    converged = True
+                    break
+
+            # Second stage at the hedged decisions
+            with self.profiler.phase("ph_evaluate"):
+                tasks = [
+                    {"params": p, "xbar": xbar, "warm": warm[s], "fix_first_stage": True}
+                    for s, p in enumerate(self.params)
+                ]
+                records = self._solve_all(executor, local, tasks)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        scenarios = []
+        for s, record in enumerate(records):
+            record = {k: v for k, v in record.items() if k not in ("warm", "x")}
+            record["scenario"] = s
+            record["probability"] = self.probabilities[s]
+            scenarios.append(record)
+        feasible = all(r["optimal"] for r in scenarios)
+        return {
+            "first_stage": xbar,
+            "expected_cost": sum(r["probability"] * r["cost"] for r in scenarios) if feasible else None,
+            "converged": converged,
+            "iterations": len(self.history),
+            "scenarios": scenarios,
+        }
+
@@ -0,0 +1,211 @@
+'''
+Training pipeline for the surrogate calculation method of TurbineBase.
+
+The rigorous model (Helmholtz state blocks with any of the other calculation
+methods) is built once and solved over a Latin hypercube of operating points.
+A Keras network is then fitted to the samples and wrapped as an IDAES
+KerasSurrogate, which TurbineBase embeds through OMLT.
+
+The accuracy envelope (input bounds and the validation errors of work and
+outlet enthalpy) is saved with the surrogate in accuracy.json. The surrogate
+should not be used outside those input bounds.
+'''
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from pyomo.environ import ConcreteModel, SolverFactory, check_optimal_termination, units, value
+from pyomo.common.dependencies import attempt_import
+
+from idaes.core import FlowsheetBlock
+from idaes.core.util.model_statistics import degrees_of_freedom
+from idaes.core.surrogate.keras_surrogate import KerasSurrogate
+from idaes.core.surrogate.sampling.scaling import OffsetScaler
+from idaes.models.properties.general_helmholtz import (
+    HelmholtzParameterBlock,
+    PhaseType,
+    StateVars,
+    AmountBasis,
+    )
+import idaes.logger as idaeslog
+
+from .benchmarks import METHOD_FIXED_VARS
+from .turbine_base_model import TurbineBase, SURROGATE_INPUTS, SURROGATE_OUTPUTS
+
+
+keras, keras_available = attempt_import("tensorflow.keras")
+
+_log = idaeslog.getLogger(__name__)
+
+
+def _latin_hypercube(n_samples, n_dims, rng):
+    # One stratified sample per interval in each dimension, randomly paired
+    u = (rng.random((n_samples, n_dims)) + np.arange(n_samples)[:, None]) / n_samples
+    for j in range(n_dims):
+        u[:, j] = rng.permutation(u[:, j])
+    return u
+
+
+def sample_turbine(bounds, n_samples, calculation_method="isentropic", fixed_vars=None, seed=0, solver_options=None):
+    """
+    Sample the rigorous TurbineBase model.
+
+    Args:
+        bounds: dict of (low, high) for "flow" (t/h), "temperature_in" (C),
+            "pressure_in" (bar) and "pressure_out" (bar)
+        n_samples: number of Latin hypercube points
+        calculation_method: rigorous calculation method to sample
+        fixed_vars: dict of turbine variable name to the value it is fixed
+            at, e.g. {"efficiency_isentropic": 0.75}, defaults to
+            METHOD_FIXED_VARS[calculation_method]
+        seed: random seed
+
+    Returns:
+        DataFrame with columns SURROGATE_INPUTS, SURROGATE_OUTPUTS and
+        enth_out, in the units of the property package state variables.
+        Points that fail to solve are dropped.
+    """
+    m = ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False)
+    m.fs.water = HelmholtzParameterBlock(
+                    pure_component="h2o",
+                    phase_presentation=PhaseType.LG,
+                    state_vars=StateVars.PH,
+                    amount_basis=AmountBasis.MASS,
+                    )
+    m.fs.turbine = TurbineBase(property_package=m.fs.water, calculation_method=calculation_method)
+    turbine = m.fs.turbine
+    turbine.efficiency_motor.fix(1.0)
+    for name, v in (METHOD_FIXED_VARS.get(calculation_method, {}) if fixed_vars is None else fixed_vars).items():
+        getattr(turbine, name).fix(v)
+
+    solver = SolverFactory("ipopt")
+    solver.options = dict(solver_options) if solver_options is not None else {"tol": 1e-6, "max_iter": 1000}
+
+    keys = ("flow", "temperature_in", "pressure_in", "pressure_out")
+    low = np.array([bounds[k][0] for k in keys])
+    high = np.array([bounds[k][1] for k in keys])
+    points = low + _latin_hypercube(n_samples, len(keys), np.random.default_rng(seed)) * (high - low)
+
+    rows = []
+    initialised = False
+    dof = None
+    for flow, T_in, P_in, P_out in points:
+        if P_out >= P_in:
+            continue
+        h_in = value(m.fs.water.htpx(T=(T_in + 273.15) * units.K, p=P_in * units.bar))
+        turbine.inlet.flow_mass.fix(flow / 3.6)
+        turbine.inlet.enth_mass.fix(h_in)
+        turbine.inlet.pressure.fix(P_in * 1e5)
+        turbine.outlet.pressure.fix(P_out * 1e5)
+        if dof is None:
+            # Any free variable would be set arbitrarily by the solve
+            dof = degrees_of_freedom(m)
+            if dof != 0:
+                raise ValueError(
+                    f"The sampled {calculation_method} turbine has {dof} degrees of freedom, "
+                    "fixed_vars must specify the calculation method"
+                )
+        try:
+            if not initialised:
+                turbine.initialize()
+                initialised = True
+            result = solver.solve(m)
+        except Exception as err:  # pylint: disable=broad-except
+            _log.warning(f"Sample failed at {flow, T_in, P_in, P_out}: {err}")
+            initialised = False
+            continue
+        if not check_optimal_termination(result):
+            initialised = False
+            continue
+        rows.append({
+            "flow": flow / 3.6,
+            "enth_in": h_in,
+            "pressure_in": P_in * 1e5,
+            "pressure_out": P_out * 1e5,
+            "work": value(turbine.work_mechanical[0]),
+            "enth_out": value(turbine.outlet.enth_mass[0]),
+        })
+
+    _log.info(f"Sampled {len(rows)} of {len(points)} points")
+    return pd.DataFrame(rows)
+
+
+def train_surrogate(data, hidden_layers=(20, 20), activation="tanh", epochs=500, validation_fraction=0.2, seed=0):
+    """
+    Fit a Keras network to sampled data and wrap it as a KerasSurrogate.
+
+    Smooth activations (tanh, sigmoid, softplus) are required for the
+    smooth OMLT formulations used inside ipopt solves.
+
+    Returns:
+        (KerasSurrogate, accuracy envelope dict)
+    """
+    if not keras_available:
+        raise ImportError("tensorflow is required to train turbine surrogates")
+
+    rng = np.random.default_rng(seed)
+    index = rng.permutation(len(data))
+    n_val = max(1, int(len(data) * validation_fraction))
+    val, train = data.iloc[index[:n_val]], data.iloc[index[n_val:]]
+
+    x = train[list(SURROGATE_INPUTS)]
+    y = train[list(SURROGATE_OUTPUTS)]
+    input_scaler = OffsetScaler.create_normalizing_scaler(x)
+    output_scaler = OffsetScaler.create_normalizing_scaler(y)
+
+    keras.utils.set_random_seed(seed)
+    nn = keras.Sequential()
+    nn.add(keras.Input(shape=(len(SURROGATE_INPUTS),)))
+    for n in hidden_layers:
+        nn.add(keras.layers.Dense(n, activation=activation))
+    nn.add(keras.layers.Dense(len(SURROGATE_OUTPUTS)))
+    nn.compile(optimizer="adam", loss="mse")
+    nn.fit(input_scaler.scale(x).to_numpy(), output_scaler.scale(y).to_numpy(), epochs=epochs, verbose=0)
+
+    input_bounds = {k: (float(data[k].min()), float(data[k].max())) for k in SURROGATE_INPUTS}
+    surrogate = KerasSurrogate(
+        nn,
+        input_labels=list(SURROGATE_INPUTS),
+        output_labels=list(SURROGATE_OUTPUTS),
+        input_bounds=input_bounds,
+        input_scaler=input_scaler,
+        output_scaler=output_scaler,
+    )
+    return surrogate, accuracy_envelope(surrogate, val)
+
+
+def accuracy_envelope(surrogate, data):
+    """
+    Errors of the surrogate on held-out samples. The outlet enthalpy error
+    follows from the work error through the exact energy balance.
+    """
+    predicted = surrogate.evaluate_surrogate(data[list(SURROGATE_INPUTS)])["work"].to_numpy()
+    work_error = predicted - data["work"].to_numpy()
+    enth_error = work_error / data["flow"].to_numpy()
+    return {
+        "n_validation": int(len(data)),
+        "input_bounds": surrogate.input_bounds(),
+        "work_max_abs_error": float(np.max(np.abs(work_error))),
+        "work_mean_abs_error": float(np.mean(np.abs(work_error))),
+        "work_max_rel_error": float(np.max(np.abs(work_error / data["work"].to_numpy()))),
+        "enth_out_max_abs_error": float(np.max(np.abs(enth_error))),
+        "enth_out_mean_abs_error": float(np.mean(np.abs(enth_error))),
+    }
+
+
+def save_surrogate(surrogate, envelope, folder):
+    os.makedirs(folder, exist_ok=True)
+    surrogate.save_to_folder(folder)
+    with open(os.path.join(folder, "accuracy.json"), "w") as f:
+        json.dump(envelope, f, indent=2)
+
+
+def load_surrogate(folder):
+    """Load a saved surrogate and its accuracy envelope"""
+    surrogate = KerasSurrogate.load_from_folder(folder)
+    with open(os.path.join(folder, "accuracy.json")) as f:
+        envelope = json.load(f)
+    return surrogate, envelope
@@ -27,6 +27,7 @@ Standard IDAES pressure changer model.
 
 # Import Python libraries
 from enum import Enum
+import math
 
 # Import Pyomo libraries
 from pyomo.environ import (
@@ -41,6 +42,8 @@ from pyomo.environ import (
     Param,
 )
 from pyomo.common.config import ConfigBlock, ConfigValue, In, Bool
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.util.calc_var_value import calculate_variable_from_constraint
 
 # Import IDAES cores
 from idaes.core import (
@@ -53,7 +56,7 @@ from idaes.core import (
     UnitModelBlockData,
     useDefault,
 )
-from idaes.core.util.exceptions import PropertyNotSupportedError, InitializationError
+from idaes.core.util.exceptions import PropertyNotSupportedError, InitializationError, ConfigurationError
 from idaes.core.util.config import is_physical_parameter_block
 import idaes.logger as idaeslog
 from idaes.core.util import scaling as iscale
@@ -61,12 +64,43 @@ from idaes.core.solvers import get_solver
 from idaes.core.initialization import SingleControlVolumeUnitInitializer
 from idaes.core.util import to_json, from_json, StoreSpec
 from idaes.core.util.math import smooth_max, safe_sqrt, sqrt, smooth_min
+from idaes.core.surrogate.surrogate_block import SurrogateBlock
 from pyomo.environ import units as pyunits
 
 
 __author__ = "Emmanuel Ogbe, Andrew Lee"
 _log = idaeslog.getLogger(__name__)
 
+# Published Willans line correlations. Willans a is dimensionless, b is in kW and
+# c sets the Willans efficiency as 1 / (c + 1). CT and BPST coefficients multiply
+# (1, inlet pressure, outlet pressure) in bar, Tsat coefficients multiply
+# (1, inlet minus outlet saturation temperature) in K.
+WILLANS_COEFFICIENTS = {
+    "CT_willans": {
+        "a": (1.314991261, -0.001634725, -0.367975103),
+        "b": (-437.7746025, 29.00736723, 10.35902331),
+        "c": (0.07886297, 0.000528327, -0.703153891),
+    },
+    "BPST_willans": {
+        "a": (1.18795366, -0.00029564, 0.004647288),
+        "b": (449.9767142, 5.670176939, -11.5045814),
+        "c": (0.205149333, -0.000695171, 0.002844611),
+    },
+    "Tsat_willans": {
+        "a": (1.155, 0.000538),
+        "b": (0, 4.23),
+        "efficiency": 0.83333,
+    },
+}
+
+# Default smoothing parameter of the smooth_min in the Willans work calculation,
+# smaller is closer to the exact min, larger is smoother
+WILLANS_SMOOTHING_EPS = 0.01
+
+# Input and output labels of surrogates used by the surrogate calculation method
+SURROGATE_INPUTS = ("flow", "enth_in", "pressure_in", "pressure_out")
+SURROGATE_OUTPUTS = ("work",)
+
 
 @declare_process_block_class("TurbineBase")
 class TurbineBaseData(UnitModelBlockData):
@@ -181,9 +215,55 @@ calculations, **default** - 'isentropic'.
 **Tsat_willans** - willans line with part load correction using saturation temperature. Requires only max molar flow
 **BPST_willans** - back pressure willans line with part load correction using pressure difference, requires max molar flow.
 **CT_willans** - condensing turbine willans line with part load correction using pressure difference, requires max molar flow.
+**surrogate** - mechanical work from a trained surrogate (see config surrogate), no isentropic state block is built.
 }""",
         ),
     )
+    CONFIG.declare(
+        "surrogate",
+        ConfigValue(
+            default=None,
+            description="Surrogate model used by the surrogate calculation method",
+            doc="""IDAES surrogate object (e.g. KerasSurrogate embedded through OMLT)
+mapping the inlet flow, inlet enthalpy, inlet pressure and outlet pressure, in the
+basis of the inlet state variables, to mechanical work. Labels must match
+SURROGATE_INPUTS and SURROGATE_OUTPUTS, **default** - None.""",
+        ),
+    )
+    CONFIG.declare(
+        "surrogate_options",
+        ConfigValue(
+            default=None,
+            domain=dict,
+            description="Keyword arguments passed to SurrogateBlock.build_model",
+            doc="""e.g. {"formulation": KerasSurrogate.Formulation.REDUCED_SPACE},
+**default** - None.""",
+        ),
+    )
+    CONFIG.declare(
+        "willans_coefficients",
+        ConfigValue(
+            default=None,
+            domain=dict,
+            description="Willans correlation coefficients of the CT, BPST or Tsat method",
+            doc="""Coefficients in the format of WILLANS_COEFFICIENTS[calculation_method],
+e.g. fitted to plant data with willans_fit.fit_willans, **default** - None,
+the published correlations.""",
+        ),
+    )
+    CONFIG.declare(
+        "lean",
+        ConfigValue(
+            default=False,
+            domain=Bool,
+            description="Build only the variables and constraints the calculation method needs",
+            doc="""If True, quantities that are calculated rather than specified (Willans
+a, b, efficiency, slope and intercept, isentropic work, pressure ratio and
+electrical work) are named Expressions instead of Vars with defining
+Constraints. With a Helmholtz property package the isentropic state block is
+replaced by a single h(s, P) Expression, **default** - False.""",
+        ),
+    )
 
     def build(self):
         """
@@ -248,34 +328,27 @@ calculations, **default** - 'isentropic'.
         # Add Momentum balance variable 'deltaP'
         self.deltaP = Reference(self.control_volume.deltaP[:])
 
-        # Performance Variables
-        self.ratioP = Var(self.flowsheet().time, initialize=1.0, doc="Pressure Ratio")
+        lean = self.config.lean
+        method = self.config.calculation_method
 
-        # Pressure Ratio
-        @self.Constraint(self.flowsheet().time, doc="Pressure ratio constraint")
-        def ratioP_calculation(self, t):
-            return (
-                self.ratioP[t] * self.control_volume.properties_in[t].pressure
-                == self.control_volume.properties_out[t].pressure
-            )
+        # Performance Variables
+        if lean:
+            @self.Expression(self.flowsheet().time, doc="Pressure Ratio")
+            def ratioP(self, t):
+                return self.control_volume.properties_out[t].pressure / self.control_volume.properties_in[t].pressure
+        else:
+            self.ratioP = Var(self.flowsheet().time, initialize=1.0, doc="Pressure Ratio")
+
+            # Pressure Ratio
+            @self.Constraint(self.flowsheet().time, doc="Pressure ratio constraint")
+            def ratioP_calculation(self, t):
+                return (
+                    self.ratioP[t] * self.control_volume.properties_in[t].pressure
+                    == self.control_volume.properties_out[t].pressure
+                )
 
         units_meta = self.control_volume.config.property_package.get_metadata()
 
-        # Get indexing sets from control volume
-        # Add isentropic variables
-        self.efficiency_isentropic = Var(
-            self.flowsheet().time,
-            initialize=0.5,
-            doc="Efficiency with respect to an isentropic process [-]",
-        )
-
-        self.work_isentropic = Var(
-            self.flowsheet().time,
-            initialize=-100e3,
-            doc="Work input to unit if isentropic process",
-            units=units_meta.get_derived_units("power"),
-        )
-
         # Add motor/electrical work and efficiency variable
         self.efficiency_motor = Var(
             self.flowsheet().time,
@@ -283,29 +356,54 @@ calculations, **default** - 'isentropic'.
             doc="Motor efficiency converting shaft work to electrical work [-]",
             )
         
-        self.work_electrical = Var(
-            self.flowsheet().time,
-            initialize=1.0,
-            doc="Electrical work of a turbine [-]",
-            units=units_meta.get_derived_units("power")
-            )
+        if not lean:
+            self.work_electrical = Var(
+                self.flowsheet().time,
+                initialize=1.0,
+                doc="Electrical work of a turbine [-]",
+                units=units_meta.get_derived_units("power")
+                )
 
-        # Add willans line parameters
-        if 'willans' in self.config.calculation_method:
-            self.willans_slope = Var(
+        if self.config.calculation_method == "surrogate":
+            # Surrogate replaces the isentropic state block and work calculations
+            self.add_surrogate_work_definition()
+            self.add_electrical_work_definition()
+            return
+
+        # Get indexing sets from control volume
+        # Add isentropic variables, in lean mode only those that are specified
+        if not lean or method == "isentropic":
+            self.efficiency_isentropic = Var(
                 self.flowsheet().time,
-                initialize=100,
-                doc="Slope of willans line",
-                units=units_meta.get_derived_units("energy") / units_meta.get_derived_units("amount"),
+                initialize=0.5,
+                doc="Efficiency with respect to an isentropic process [-]",
             )
 
-            self.willans_intercept = Var(
+        if not lean:
+            self.work_isentropic = Var(
                 self.flowsheet().time,
-                initialize=-100,
-                doc="Intercept of willans line",
+                initialize=-100e3,
+                doc="Work input to unit if isentropic process",
                 units=units_meta.get_derived_units("power"),
             )
 
+        # Add willans line parameters
+        if 'willans' in method:
+            if not lean or method == "simple_willans":
+                self.willans_slope = Var(
+                    self.flowsheet().time,
+                    initialize=100,
+                    doc="Slope of willans line",
+                    units=units_meta.get_derived_units("energy") / units_meta.get_derived_units("amount"),
+                )
+
+                self.willans_intercept = Var(
+                    self.flowsheet().time,
+                    initialize=-100,
+                    doc="Intercept of willans line",
+                    units=units_meta.get_derived_units("power"),
+                )
+
             self.willans_max_mol = Var(
                 self.flowsheet().time,
                 initialize=1.0,
@@ -313,7 +411,7 @@ calculations, **default** - 'isentropic'.
                 units=units_meta.get_derived_units("amount") / units_meta.get_derived_units("time"),
             )
 
-            if self.config.calculation_method in ["part_load_willans", "Tsat_willans", "BPST_willans", "CT_willans"]:
+            if method == "part_load_willans" or (not lean and method in ["Tsat_willans", "BPST_willans", "CT_willans"]):
                 self.willans_a = Var(
                     self.flowsheet().time,
                     initialize=1.0,
@@ -333,6 +431,44 @@ calculations, **default** - 'isentropic'.
                     doc="Willans efficiency",
                 )
 
+        if lean and hasattr(self.config.property_package, "htpx"):
+            # Isentropic outlet enthalpy directly from the Helmholtz h(s, P)
+            # function rather than through a second state block
+            from idaes.models.properties.general_helmholtz import HelmholtzThermoExpressions, AmountBasis
+
+            te = HelmholtzThermoExpressions(self, self.config.property_package, amount_basis=AmountBasis.MOLE)
+
+            @self.Expression(self.flowsheet().time, doc="Isentropic outlet molar enthalpy")
+            def enth_mol_isentropic(self, t):
+                return te.h(
+                    s=self.control_volume.properties_in[t].entr_mol,
+                    p=self.control_volume.properties_out[t].pressure,
+                )
+        else:
+            self.add_isentropic_state_block()
+
+        self.add_isentropic_work_definition()
+        if 'willans' in method: 
+            # Write isentropic efficiency eqn
+            self.calculate_isentropic_efficiency() 
+
+            if method in ["part_load_willans", "Tsat_willans", "BPST_willans", "CT_willans"]:
+                if method == "Tsat_willans": # use published values and dTsat to calculate willans a,b,c
+                    self.calculate_Tsat_willans_parameters()
+
+                elif method == "BPST_willans":
+                    self.calculate_BPST_willans_parameters()
+                
+                elif method == "CT_willans":
+                    self.calculate_CT_willans_parameters()
+
+                # calculate slope and intercept
+                self.calculate_willans_coefficients()
+
+        self.add_mechanical_work_definition()
+        self.add_electrical_work_definition()
+       
+    def add_isentropic_state_block(self):
         # Build isentropic state block
         tmp_dict = dict(**self.config.property_package_args)
         tmp_dict["has_phase_equilibrium"] = self.config.has_phase_equilibrium
@@ -366,112 +502,144 @@ calculations, **default** - 'isentropic'.
                 self.properties_isentropic[t].entr_mol
                 == self.control_volume.properties_in[t].entr_mol
             )
-    
-        self.add_isentropic_work_definition()
-        if 'willans' in self.config.calculation_method: 
-            # Write isentropic efficiency eqn
-            self.calculate_isentropic_efficiency() 
-
-            if self.config.calculation_method in ["part_load_willans", "Tsat_willans", "BPST_willans", "CT_willans"]:
-                if self.config.calculation_method == "Tsat_willans": # use published values and dTsat to calculate willans a,b,c
-                    self.calculate_Tsat_willans_parameters()
 
-                elif self.config.calculation_method == "BPST_willans":
-                    self.calculate_BPST_willans_parameters()
-                
-                elif self.config.calculation_method == "CT_willans":
-                    self.calculate_CT_willans_parameters()
+    def enth_isentropic(self, t):
+        """Isentropic outlet molar enthalpy at time t"""
+        if hasattr(self, "enth_mol_isentropic"):
+            return self.enth_mol_isentropic[t]
+        return self.properties_isentropic[t].enth_mol
+
+    def _add_calculated(self, name, constraint_name, doc, rule):
+        # A calculated quantity is a named Expression in lean mode, otherwise a
+        # Var defined by a Constraint
+        if self.config.lean:
+            self.add_component(name, Expression(self.flowsheet().time, rule=lambda b, t: rule(t), doc=doc))
+        else:
+            var = getattr(self, name)
+            self.add_component(
+                constraint_name,
+                Constraint(self.flowsheet().time, rule=lambda b, t: var[t] == rule(t), doc=doc),
+            )
 
-                # calculate slope and intercept
-                self.calculate_willans_coefficients()
+    def _willans_coefficients(self):
+        # Configured coefficients, otherwise the published correlations
+        method = self.config.calculation_method
+        coeffs = self.config.willans_coefficients
+        if coeffs is None:
+            return WILLANS_COEFFICIENTS[method]
+        missing = set(WILLANS_COEFFICIENTS[method]) - set(coeffs)
+        if missing:
+            raise ConfigurationError(
+                f"{self.name} willans_coefficients for {method} are missing {sorted(missing)}"
+            )
+        return coeffs
 
-        self.add_mechanical_work_definition()
-        self.add_electrical_work_definition()
-       
     def calculate_CT_willans_parameters(self):
+        coeffs = self._willans_coefficients()
+
         # a parameter
-        @self.Constraint(
-                self.flowsheet().time, doc="Willans CT a calculation"
+        self._add_calculated(
+            "willans_a", "willans_CT_a_calculation", "Willans CT a calculation",
+            lambda t: self._pressure_correlation(coeffs["a"], t),
         )
-        def willans_CT_a_calculation(self, t):
-            return self.willans_a[t] == 1.314991261 - 0.001634725 * (self.control_volume.properties_in[t].pressure / 1e5) / pyunits.Pa - 0.367975103 * (self.control_volume.properties_out[t].pressure / 1e5) / pyunits.Pa
-        
+
         # b parameter
-        @self.Constraint(
-                self.flowsheet().time, doc="Willans CT b calculation"
+        self._add_calculated(
+            "willans_b", "willans_CT_b_calculation", "Willans CT b calculation",
+            lambda t: self._pressure_correlation(coeffs["b"], t) * 1000 * pyunits.W,
         )
-        def willans_CT_b_calculation(self, t):
-            return self.willans_b[t] == (-437.7746025 + 29.00736723 * (self.control_volume.properties_in[t].pressure / 1e5) / pyunits.Pa + 10.35902331 * (self.control_volume.properties_out[t].pressure / 1e5) / pyunits.Pa) * 1000 * pyunits.W
-        
+
         # c parameter
-        @self.Constraint(
-                self.flowsheet().time, doc="Willans CT efficiency calculation"
+        self._add_calculated(
+            "willans_efficiency", "willans_CT_efficiency_calculation", "Willans CT efficiency calculation",
+            lambda t: 1 / (self._pressure_correlation(coeffs["c"], t) + 1),
         )
-        def willans_CT_efficiency_calculation(self, t):
-            return self.willans_efficiency[t] == 1 / ((0.07886297 + 0.000528327 * (self.control_volume.properties_in[t].pressure / 1e5) / pyunits.Pa - 0.703153891 * (self.control_volume.properties_out[t].pressure / 1e5) / pyunits.Pa) + 1)      
 
     def calculate_BPST_willans_parameters(self):
+        coeffs = self._willans_coefficients()
+
         # a parameter
-        @self.Constraint(
-                self.flowsheet().time, doc="Willans BPST a calculation"
+        self._add_calculated(
+            "willans_a", "willans_BPST_a_calculation", "Willans BPST a calculation",
+            lambda t: self._pressure_correlation(coeffs["a"], t),
         )
-        def willans_BPST_a_calculation(self, t):
-            return self.willans_a[t] == 1.18795366 - 0.00029564 * (self.control_volume.properties_in[t].pressure / 1e5) / pyunits.Pa + 0.004647288 * (self.control_volume.properties_out[t].pressure / 1e5) / pyunits.Pa
-        
 
         # b parameter
-        @self.Constraint(
-                self.flowsheet().time, doc="Willans BPST b calculation"
+        self._add_calculated(
+            "willans_b", "willans_BPST_b_calculation", "Willans BPST b calculation",
+            lambda t: self._pressure_correlation(coeffs["b"], t) * 1000 * pyunits.W,
         )
-        def willans_BPST_b_calculation(self, t):
-            return self.willans_b[t] == (449.9767142 + 5.670176939 * (self.control_volume.properties_in[t].pressure / 1e5) / pyunits.Pa - 11.5045814 * (self.control_volume.properties_out[t].pressure / 1e5) / pyunits.Pa) * 1000 * pyunits.W
-        
 
         # c parameter
-        @self.Constraint(
-                self.flowsheet().time, doc="Willans BPST c calculation"
+        self._add_calculated(
+            "willans_efficiency", "willans_BPST_efficiency_calculation", "Willans BPST c calculation",
+            lambda t: 1 / (self._pressure_correlation(coeffs["c"], t) + 1),
         )
-        def willans_BPST_efficiency_calculation(self, t):
-            return self.willans_efficiency[t] == 1 / ((0.205149333 - 0.000695171 * (self.control_volume.properties_in[t].pressure / 1e5) / pyunits.Pa + 0.002844611 * (self.control_volume.properties_out[t].pressure / 1e5) / pyunits.Pa) + 1)       
 
     def calculate_Tsat_willans_parameters(self):
+        coeffs = self._willans_coefficients()
+
         # a parameter
-        @self.Constraint(
-                self.flowsheet().time, doc="Willans Tsat a calculation"
+        self._add_calculated(
+            "willans_a", "willans_Tsat_a_calculation", "Willans Tsat a calculation",
+            lambda t: self._Tsat_correlation(coeffs["a"], t),
         )
-        def willans_Tsat_a_calculation(self, t):
-            return self.willans_a[t] == (1.155 + 0.000538 * (self.control_volume.properties_in[t].temperature_sat - self.control_volume.properties_out[t].temperature_sat) / pyunits.K)
 
         # b parameter
-        @self.Constraint(
-                self.flowsheet().time, doc="Willans Tsat b calculation"
+        self._add_calculated(
+            "willans_b", "willans_Tsat_b_calculation", "Willans Tsat b calculation",
+            lambda t: self._Tsat_correlation(coeffs["b"], t) * 1000 * pyunits.W,
         )
-        def willans_Tsat_b_calculation(self, t):
-            return self.willans_b[t] == (0 + 4.23 * (self.control_volume.properties_in[t].temperature_sat - self.control_volume.properties_out[t].temperature_sat) / pyunits.K)*1000 * pyunits.W
-        
+
         # c parameter
-        @self.Constraint(
-                self.flowsheet().time, doc="Willans Tsat efficiency calculation"
+        self._add_calculated(
+            "willans_efficiency", "willans_Tsat_c_calculation", "Willans Tsat efficiency calculation",
+            lambda t: coeffs["efficiency"],
         )
-        def willans_Tsat_c_calculation(self, t):
-            return self.willans_efficiency[t] == 0.83333
+
+    def _pressure_correlation(self, coeffs, t):
+        # Linear in inlet and outlet pressure in bar
+        return (
+            coeffs[0]
+            + coeffs[1] * (self.control_volume.properties_in[t].pressure / 1e5) / pyunits.Pa
+            + coeffs[2] * (self.control_volume.properties_out[t].pressure / 1e5) / pyunits.Pa
+        )
+
+    def _Tsat_correlation(self, coeffs, t):
+        # Linear in the saturation temperature difference across the turbine in K
+        return coeffs[0] + coeffs[1] * (
+            self.control_volume.properties_in[t].temperature_sat - self.control_volume.properties_out[t].temperature_sat
+        ) / pyunits.K
 
     def calculate_willans_coefficients(self):
         # Calculate willans coefficients
-            @self.Constraint(
-                self.flowsheet().time, doc="Willans slope calculation"
-            )
-            def willans_slope_calculation(self, t):
-                return self.willans_slope[t] == 1 / (self.willans_efficiency[t] * self.willans_a[t]) * ((self.control_volume.properties_in[t].enth_mol - self.properties_isentropic[t].enth_mol) - self.willans_b[t] / self.willans_max_mol[t])
-            
-            
-            @self.Constraint(
-                self.flowsheet().time, doc="Willans intercept calculation"
-            )
-            def willans_intercept_calculation(self, t):
-                return self.willans_intercept[t] == ((1 - self.willans_efficiency[t]) / (self.willans_efficiency[t] * self.willans_a[t])) * ((self.control_volume.properties_in[t].enth_mol - self.properties_isentropic[t].enth_mol) * self.willans_max_mol[t] - self.willans_b[t])
-    
+        def enthalpy_drop(t):
+            return self.control_volume.properties_in[t].enth_mol - self.enth_isentropic(t)
+
+        self._add_calculated(
+            "willans_slope", "willans_slope_calculation", "Willans slope calculation",
+            lambda t: 1 / (self.willans_efficiency[t] * self.willans_a[t]) * (enthalpy_drop(t) - self.willans_b[t] / self.willans_max_mol[t]),
+        )
+
+        self._add_calculated(
+            "willans_intercept", "willans_intercept_calculation", "Willans intercept calculation",
+            lambda t: ((1 - self.willans_efficiency[t]) / (self.willans_efficiency[t] * self.willans_a[t])) * (enthalpy_drop(t) * self.willans_max_mol[t] - self.willans_b[t]),
+        )
+
     def add_mechanical_work_definition(self):
+        if 'willans' in self.config.calculation_method:
+            # Work at the top of the willans line, shared by the terms of actual_work
+            @self.Expression(self.flowsheet().time, doc="Full load work of willans line")
+            def willans_full_load(self, t):
+                return self.willans_slope[t] * self.willans_max_mol[t] - self.willans_intercept[t]
+
+            # Mutable so a continuation solve can tighten it between warm-started solves
+            self.smoothing_eps = Param(
+                initialize=WILLANS_SMOOTHING_EPS,
+                mutable=True,
+                doc="Smoothing parameter of the Willans work smooth_min",
+            )
+
         # Mechanical work
         @self.Constraint(
             self.flowsheet().time, doc="Actual mechanical work calculation"
@@ -482,33 +650,63 @@ calculations, **default** - 'isentropic'.
                     self.work_isentropic[t] * self.efficiency_isentropic[t]
                 )
             else: # willans line formulation 
-                eps = 0.01  # smoothing parameter; smaller = closer to exact max, larger = smoother
-                
                 return self.work_mechanical[t] == smooth_min(
-                    -(self.willans_slope[t] * self.control_volume.properties_in[t].flow_mol - self.willans_intercept[t]) / (self.willans_slope[t] * self.willans_max_mol[t] - self.willans_intercept[t]),
+                    -(self.willans_slope[t] * self.control_volume.properties_in[t].flow_mol - self.willans_intercept[t]) / self.willans_full_load[t],
                     0.0,
-                    eps
-                    ) * (self.willans_slope[t] * self.willans_max_mol[t] - self.willans_intercept[t])
+                    self.smoothing_eps
+                    ) * self.willans_full_load[t]
 
                     
+    def add_surrogate_work_definition(self):
+        if self.config.surrogate is None:
+            raise ConfigurationError(
+                f"{self.name} calculation_method 'surrogate' requires a surrogate object"
+            )
+        surrogate = self.config.surrogate
+        if tuple(surrogate.input_labels()) != SURROGATE_INPUTS or tuple(surrogate.output_labels()) != SURROGATE_OUTPUTS:
+            raise ConfigurationError(
+                f"{self.name} surrogate labels must be inputs {SURROGATE_INPUTS} and outputs {SURROGATE_OUTPUTS}"
+            )
+
+        # Surrogate inputs are the inlet state variables (pressure-enthalpy
+        # packages only) and the outlet pressure
+        self.surrogate = SurrogateBlock(self.flowsheet().time)
+        for t in self.flowsheet().time:
+            state_vars = self.control_volume.properties_in[t].define_state_vars()
+            try:
+                flow = next(v for k, v in state_vars.items() if k.startswith("flow"))
+                enth = next(v for k, v in state_vars.items() if k.startswith("enth"))
+            except StopIteration:
+                raise ConfigurationError(
+                    f"{self.name} surrogate calculation method requires flow and enthalpy state variables"
+                )
+            self.surrogate[t].build_model(
+                surrogate,
+                input_vars=[
+                    flow,
+                    enth,
+                    self.control_volume.properties_in[t].pressure,
+                    self.control_volume.properties_out[t].pressure,
+                ],
+                output_vars=[self.control_volume.work[t]],
+                use_surrogate_bounds=False,
+                **dict(self.config.surrogate_options or {}),
+            )
+
     def add_electrical_work_definition(self):
         # Electrical work
-        @self.Constraint(
-            self.flowsheet().time, doc="Calculate electrical work of turbine"
+        self._add_calculated(
+            "work_electrical", "electrical_energy_balance", "Calculate electrical work of turbine",
+            lambda t: self.work_mechanical[t] * self.efficiency_motor[t],
         )
-        
-        def electrical_energy_balance(self, t):
-            return self.work_electrical[t] == self.work_mechanical[t] * self.efficiency_motor[t]
-        
     
     def add_isentropic_work_definition(self):
 
         # Isentropic work
-        @self.Constraint(
-            self.flowsheet().time, doc="Calculate work of isentropic process"
+        self._add_calculated(
+            "work_isentropic", "isentropic_energy_balance", "Calculate work of isentropic process",
+            lambda t: (self.enth_isentropic(t) - self.control_volume.properties_in[t].enth_mol) * self.control_volume.properties_in[t].flow_mol,
         )
-        def isentropic_energy_balance(self, t):
-            return self.work_isentropic[t] == ( self.properties_isentropic[t].enth_mol - self.control_volume.properties_in[t].enth_mol ) * self.control_volume.properties_in[t].flow_mol
         
         ''' 
         def isentropic_energy_balance(self, t):
@@ -516,11 +714,10 @@ calculations, **default** - 'isentropic'.
         '''
 
     def calculate_isentropic_efficiency(self):
-        @self.Constraint(
-                self.flowsheet().time, doc="Isentropic effiicency calculation"
+        self._add_calculated(
+            "efficiency_isentropic", "isentropic_efficiency", "Isentropic effiicency calculation",
+            lambda t: self.work_mechanical[t] / (self.work_isentropic[t] - 1e-6 * pyunits.W),
         )
-        def isentropic_efficiency(self, t):
-            return self.efficiency_isentropic[t] ==  self.work_mechanical[t] / (self.work_isentropic[t] - 1e-6 * pyunits.W)
 
     def initialize_build(
         blk,
@@ -529,15 +726,19 @@ calculations, **default** - 'isentropic'.
         outlvl=idaeslog.NOTSET,
         solver=None,
         optarg=None,
+        explicit_tol=1e-6,
     ):
         """
         General wrapper for pressure changer initialization routines
 
         Keyword Arguments:
             routine : str stating which initialization routine to execute
-                        * None - use routine matching thermodynamic_assumption
-                        * 'isentropic' - use isentropic initialization routine
-                        * 'isothermal' - use isothermal initialization routine
+                        * None - initialize the state blocks and solve the unit
+                        * 'explicit' - calculate the isentropic outlet state,
+                          work and outlet state directly from the fixed inlet
+                          state and outlet pressure, and only solve the unit
+                          if the residuals are above explicit_tol (Helmholtz
+                          property packages only)
             state_args : a dict of arguments to be passed to the property
                          package(s) to provide an initial state for
                          initialization (see documentation of the specific
@@ -547,6 +748,9 @@ calculations, **default** - 'isentropic'.
                      default solver options)
             solver : str indicating which solver to use during
                      initialization (default = None, use default solver)
+            explicit_tol : largest constraint residual, relative to the
+                     largest variable in the constraint, accepted by the
+                     explicit routine without a solve
 
         Returns:
             None
@@ -582,7 +786,7 @@ calculations, **default** - 'isentropic'.
                     state_args_out[k] = value(cv.properties_out[t0].pressure)
                 elif blk.deltaP[t0].fixed:
                     state_args_out[k] = value(state_args[k] + blk.deltaP[t0])
-                elif blk.ratioP[t0].fixed:
+                elif hasattr(blk, "ratioP_calculation") and blk.ratioP[t0].fixed:
                     state_args_out[k] = value(state_args[k] * blk.ratioP[t0])
                 else:
                     # Not obvious what to do, use inlet state
@@ -607,15 +811,33 @@ calculations, **default** - 'isentropic'.
         )
 
         init_log.info_high("Initialization Step 1 Complete.")
+
+        # Set when the explicit step has calculated every variable, including the isentropic state
+        explicit_done = False
+        if routine == "explicit":
+            if not hasattr(blk.config.property_package, "htpx"):
+                init_log.warning("Explicit initialization requires a Helmholtz property package, solving instead.")
+            elif blk._initialize_explicit():
+                explicit_done = True
+                residual = blk._max_residual()
+                if residual <= explicit_tol:
+                    blk.control_volume.release_state(flags, outlvl)
+                    init_log.info(f"Initialization Complete: explicit, largest residual {residual:.2e}")
+                    return
+                init_log.info_high(f"Explicit initialization residual {residual:.2e}, solving unit.")
+            else:
+                init_log.warning("Explicit initialization needs a fixed outlet pressure, pressure change or ratio, solving instead.")
+
         # ---------------------------------------------------------------------
         # Initialize Isentropic block
 
-        blk.properties_isentropic.initialize(
-            outlvl=outlvl,
-            optarg=optarg,
-            solver=solver,
-            state_args=state_args_out,
-        )
+        if hasattr(blk, "properties_isentropic") and not explicit_done:
+            blk.properties_isentropic.initialize(
+                outlvl=outlvl,
+                optarg=optarg,
+                solver=solver,
+                state_args=state_args_out,
+            )
 
         init_log.info_high("Initialization Step 2 Complete.")
 
@@ -640,24 +862,217 @@ calculations, **default** - 'isentropic'.
 
         init_log.info(f"Initialization Complete: {idaeslog.condition(res)}")
 
+    def _outlet_pressure(blk, t):
+        # Outlet pressure implied by the fixed variables, None if it is not fixed
+        cv = blk.control_volume
+        P_in = value(cv.properties_in[t].pressure)
+        if cv.properties_out[t].pressure.fixed:
+            return value(cv.properties_out[t].pressure)
+        if blk.deltaP[t].fixed:
+            return P_in + value(blk.deltaP[t])
+        if hasattr(blk, "ratioP_calculation") and blk.ratioP[t].fixed:
+            return P_in * value(blk.ratioP[t])
+        return None
+
+    def _willans_constraints(blk):
+        # (variable, constraint name) pairs of the Willans line in calculation order
+        method = blk.config.calculation_method
+        label = method[: -len("_willans")]
+        efficiency = "c" if method == "Tsat_willans" else "efficiency"
+        pairs = []
+        if method in ("Tsat_willans", "BPST_willans", "CT_willans"):
+            pairs += [
+                ("willans_a", f"willans_{label}_a_calculation"),
+                ("willans_b", f"willans_{label}_b_calculation"),
+                ("willans_efficiency", f"willans_{label}_{efficiency}_calculation"),
+            ]
+        if method != "simple_willans":
+            pairs += [
+                ("willans_slope", "willans_slope_calculation"),
+                ("willans_intercept", "willans_intercept_calculation"),
+            ]
+        return pairs
+
+    def _initialize_explicit(blk):
+        """
+        Set all unit variables from the fixed inlet state and outlet pressure
+        without a solve. Returns False if the outlet pressure is not fixed.
+        """
+        from idaes.models.properties.general_helmholtz import HelmholtzThermoExpressions, AmountBasis
+
+        cv = blk.control_volume
+        method = blk.config.calculation_method
+        for t in blk.flowsheet().time:
+            P_out = blk._outlet_pressure(t)
+            if P_out is None:
+                return False
+            prop_in = cv.properties_in[t]
+            state_in = prop_in.define_state_vars()
+            flow_name = next(k for k in state_in if k.startswith("flow"))
+            enth_name = next(k for k in state_in if k.startswith("enth"))
+            flow = value(state_in[flow_name])
+            h_in = value(state_in[enth_name])
+
+            if method == "surrogate":
+                import pandas as pd
+
+                inputs = pd.DataFrame([[flow, h_in, value(prop_in.pressure), P_out]], columns=list(SURROGATE_INPUTS))
+                work = float(blk.config.surrogate.evaluate_surrogate(inputs)["work"].iloc[0])
+                cv.work[t].set_value(work)
+            else:
+                if hasattr(blk, "properties_isentropic"):
+                    # Isentropic outlet state at the inlet entropy and outlet pressure
+                    basis = AmountBasis.MASS if enth_name.endswith("mass") else AmountBasis.MOLE
+                    params = blk.config.property_package
+                    te = HelmholtzThermoExpressions(params, params, amount_basis=basis)
+                    entr = getattr(prop_in, enth_name.replace("enth", "entr"))
+                    h_is = value(te.h(s=entr, p=P_out * pyunits.Pa))
+                    state_is = blk.properties_isentropic[t].define_state_vars()
+                    state_is[flow_name].set_value(flow)
+                    state_is[enth_name].set_value(h_is)
+                    state_is["pressure"].set_value(P_out)
+
+                pairs = [("work_isentropic", "isentropic_energy_balance")]
+                if "willans" in method:
+                    pairs += blk._willans_constraints()
+                    pairs += [("work_mechanical", "actual_work"), ("efficiency_isentropic", "isentropic_efficiency")]
+                elif blk.work_mechanical[t].fixed:
+                    pairs += [("efficiency_isentropic", "actual_work")]
+                else:
+                    pairs += [("work_mechanical", "actual_work")]
+                for var, con in pairs:
+                    # Lean builds hold calculated quantities as Expressions without a constraint
+                    if hasattr(blk, con) and not getattr(blk, var)[t].fixed:
+                        calculate_variable_from_constraint(getattr(blk, var)[t], getattr(blk, con)[t])
+                work = value(blk.work_mechanical[t])
+
+            if hasattr(blk, "electrical_energy_balance") and not blk.work_electrical[t].fixed:
+                calculate_variable_from_constraint(blk.work_electrical[t], blk.electrical_energy_balance[t])
+
+            # Outlet state from the energy balance
+            state_out = cv.properties_out[t].define_state_vars()
+            for name, v in ((flow_name, flow), (enth_name, h_in + work / flow), ("pressure", P_out)):
+                if not state_out[name].fixed:
+                    state_out[name].set_value(v)
+            if not blk.deltaP[t].fixed:
+                blk.deltaP[t].set_value(P_out - value(prop_in.pressure))
+            if hasattr(blk, "ratioP_calculation") and not blk.ratioP[t].fixed:
+                blk.ratioP[t].set_value(P_out / value(prop_in.pressure))
+        return True
+
+    def _max_residual(blk):
+        # Largest active constraint residual relative to the largest variable in it
+        worst = 0.0
+        for c in blk.component_data_objects(Constraint, active=True, descend_into=True):
+            body = value(c.body, exception=False)
+            if body is None:
+                return float("inf")
+            residual = max(
+                value(c.lower) - body if c.has_lb() else 0.0,
+                body - value(c.upper) if c.has_ub() else 0.0,
+                0.0,
+            )
+            scale = max([1.0] + [abs(v.value) for v in identify_variables(c.body) if v.value is not None])
+            worst = max(worst, residual / scale)
+        return worst
+
     def _get_performance_contents(self, time_point=0):
         var_dict = {}
+        expr_dict = {}
+
+        def add(label, component):
+            # Lean builds report calculated quantities as Expressions
+            (var_dict if component.ctype is Var else expr_dict)[label] = component[time_point]
+
         if hasattr(self, "deltaP"):
-            var_dict["Mechanical Work"] = self.work_mechanical[time_point]
+            add("Mechanical Work", self.work_mechanical)
         if hasattr(self, "deltaP"):
-            var_dict["Electrical Work"] = self.work_electrical[time_point]
+            add("Electrical Work", self.work_electrical)
         if hasattr(self, "deltaP"):
-            var_dict["Pressure Change"] = self.deltaP[time_point]
+            add("Pressure Change", self.deltaP)
         if hasattr(self, "ratioP"):
-            var_dict["Pressure Ratio"] = self.ratioP[time_point]
+            add("Pressure Ratio", self.ratioP)
         if hasattr(self, "efficiency_isentropic"):
-            var_dict["Isentropic Efficiency"] = self.efficiency_isentropic[time_point]
+            add("Isentropic Efficiency", self.efficiency_isentropic)
+
+        return {"vars": var_dict, "exprs": expr_dict}
+
+    def _range_scaling_factor(self, component, magnitude):
+        # Scaling factor set on component, otherwise the power of ten of magnitude
+        sf = iscale.get_scaling_factor(component)
+        if sf is not None:
+            return sf
+        magnitude = abs(value(magnitude, exception=False) or 0.0)
+        return 10 ** -round(math.log10(magnitude)) if magnitude > 0 else 1.0
+
+    def _set_var_scaling(self, name, sf):
+        # Calculated quantities are Expressions in lean mode and are not scaled
+        component = getattr(self, name, None)
+        if component is None or component.ctype is not Var:
+            return
+        for t, v in component.items():
+            iscale.set_scaling_factor(v, sf(t), overwrite=False)
+
+    def _set_constraint_scaling(self, name, sf):
+        if hasattr(self, name):
+            for t, c in getattr(self, name).items():
+                iscale.constraint_scaling_transform(c, sf(t), overwrite=False)
+
+    def calculate_willans_scaling_factors(self):
+        """
+        Scale the Willans line variables and constraints from the operating
+        range: the work scale is that of control_volume.work (or of its
+        value), the flow scale that of the inlet flow (or of willans_max_mol),
+        so the slope (work per flow) and intercept and b (work) are O(1)
+        after scaling, as are the dimensionless a and efficiencies.
+        """
+        cv = self.control_volume
+
+        def work_sf(t):
+            return self._range_scaling_factor(cv.work[t], cv.work[t])
+
+        def flow_sf(t):
+            return self._range_scaling_factor(cv.properties_in[t].flow_mol, self.willans_max_mol[t])
+
+        def slope_sf(t):
+            return work_sf(t) / flow_sf(t)
+
+        def one(t):
+            return 1.0
 
-        return {"vars": var_dict}
+        self._set_var_scaling("willans_max_mol", flow_sf)
+        self._set_var_scaling("willans_slope", slope_sf)
+        self._set_var_scaling("willans_intercept", work_sf)
+        self._set_var_scaling("willans_b", work_sf)
+        self._set_var_scaling("willans_a", one)
+        self._set_var_scaling("willans_efficiency", one)
+
+        for var, con in self._willans_constraints():
+            sf = {
+                "willans_slope": slope_sf,
+                "willans_intercept": work_sf,
+                "willans_b": work_sf,
+            }.get(var, one)
+            self._set_constraint_scaling(con, sf)
 
     def calculate_scaling_factors(self):
         super().calculate_scaling_factors()
 
+        if "willans" in self.config.calculation_method:
+            self.calculate_willans_scaling_factors()
+
+        # Efficiencies are O(1) in every calculation method
+        self._set_var_scaling("efficiency_isentropic", lambda t: 1.0)
+        self._set_var_scaling("efficiency_motor", lambda t: 1.0)
+        self._set_constraint_scaling("isentropic_efficiency", lambda t: 1.0)
+
+        # Electrical work on the scale of the mechanical work
+        def work_sf(t):
+            return self._range_scaling_factor(self.control_volume.work[t], self.control_volume.work[t])
+
+        self._set_var_scaling("work_electrical", work_sf)
+        self._set_constraint_scaling("electrical_energy_balance", work_sf)
+
         if hasattr(self, "work_fluid"):
             for t, v in self.work_fluid.items():
                 iscale.set_scaling_factor(
@@ -676,7 +1091,7 @@ calculations, **default** - 'isentropic'.
                     ),
                 )
 
-        if hasattr(self, "work_isentropic"):
+        if hasattr(self, "work_isentropic") and self.work_isentropic.ctype is Var:
             for t, v in self.work_isentropic.items():
                 iscale.set_scaling_factor(
                     v,
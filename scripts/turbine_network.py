@@ -0,0 +1,189 @@
+'''
+Builder for networks of multi-extraction / pass-out turbines between steam
+headers.
+
+A site is described by its headers, ordered from highest to lowest
+pressure, and its machines, each given as the sequence of headers its steam
+passes through:
+
+    headers = ("HP", "MP", "IP", "LP")
+    machines = {
+        "TG1": ("HP", "MP", "LP"),
+        "TG2": {"path": ("HP", "MP", "IP", "LP"), "calculation_method": "CT_willans"},
+    }
+
+Every section between two consecutive headers of a path is one TurbineBase
+stage, indexed by (machine, section). Each stage except the last of its
+machine is followed by a splitter with outlets "extraction" (to the header)
+and "next_stage" (to the next stage); the last stage exhausts into the final
+header. Stages, splitters and arcs are single indexed components built from
+index sets, so the construction cost grows linearly with the stage count.
+
+Stage inlet and outlet pressures are tied to header_pressure, so a scenario
+fixes the header pressures, the inlet flow and enthalpy of each machine and
+the stage efficiencies (or Willans parameters). initialize_turbine_network
+then initialises each machine from its inlet downwards.
+'''
+
+from pyomo.environ import Set, TransformationFactory, Var, units, value
+from pyomo.network import Arc
+from idaes.core.util.initialization import propagate_state
+
+from idaes.core.util.exceptions import ConfigurationError
+from idaes.models.unit_models import Separator as Splitter
+from idaes.models.unit_models.separator import SplittingType
+
+from .turbine_base_model import TurbineBase
+from .profiling import NULL_PROFILER
+
+
+def _machine_spec(name, spec):
+    # Machines are a header path or a dict with "path" and TurbineBase config
+    if isinstance(spec, dict):
+        spec = dict(spec)
+        path = tuple(spec.pop("path"))
+    else:
+        path, spec = tuple(spec), {}
+    if len(path) < 2:
+        raise ConfigurationError(f"Machine {name} needs at least an inlet and an exhaust header")
+    return path, spec
+
+
+def build_turbine_network(
+    blk, headers, machines, property_package=None, link_inlets=True, expand_arcs=True, **turbine_config
+):
+    """
+    Add a turbine network to a flowsheet block.
+
+    Args:
+        blk: flowsheet block, its time set indexes the header pressures
+        headers: header names ordered from highest to lowest pressure
+        machines: dict of machine name to a header path, or to a dict with
+            "path" and TurbineBase config arguments for that machine's stages
+        property_package: defaults to the flowsheet's default property package
+        link_inlets: tie the machine inlet pressures to header_pressure,
+            False when the inlets are connected to header units by arcs
+        expand_arcs: expand the arcs into equality constraints
+        turbine_config: TurbineBase config arguments for all stages
+
+    Adds:
+        stage_set, extraction_set, inlet_stage_set: (machine, section)
+            index sets
+        stage: indexed TurbineBase
+        extraction: indexed Splitter after every stage but the last of a machine
+        stage_to_extraction, extraction_to_stage: indexed Arcs
+        header_pressure: Var indexed by time and header
+        stage_inlet_pressure (if link_inlets), stage_outlet_pressure:
+            pressure links
+        header_supply: mass flow into each header (extractions and exhausts)
+        stage_headers: dict of stage index to (inlet, outlet) header
+    """
+    if property_package is None:
+        property_package = blk.config.default_property_package
+    rank = {h: i for i, h in enumerate(headers)}
+    if len(rank) != len(headers):
+        raise ConfigurationError("Header names must be unique")
+
+    # Resolve the specification into index lists and lookups once
+    stages, extractions = [], []
+    inlet_header, outlet_header = {}, {}
+    stage_config = {}
+    for name, spec in machines.items():
+        path, config = _machine_spec(name, spec)
+        for h in path:
+            if h not in rank:
+                raise ConfigurationError(f"Machine {name} uses unknown header {h}")
+        if any(rank[a] >= rank[b] for a, b in zip(path, path[1:])):
+            raise ConfigurationError(f"Headers of machine {name} must be in order of falling pressure")
+        # Per-index config replaces the default config, so merge them here
+        stage_config[name] = dict(turbine_config, property_package=property_package, **config)
+        for k in range(len(path) - 1):
+            stages.append((name, k))
+            inlet_header[name, k] = path[k]
+            outlet_header[name, k] = path[k + 1]
+            if k < len(path) - 2:
+                extractions.append((name, k))
+    last = set(stages) - set(extractions)
+
+    supply = {h: ([], []) for h in headers}
+    for s in extractions:
+        supply[outlet_header[s]][0].append(s)
+    for s in last:
+        supply[outlet_header[s]][1].append(s)
+
+    blk.header_set = Set(initialize=list(headers), ordered=True)
+    blk.stage_set = Set(initialize=stages, dimen=2, ordered=True)
+    blk.extraction_set = Set(initialize=extractions, dimen=2, ordered=True)
+    blk.inlet_stage_set = Set(initialize=[s for s in stages if s[1] == 0], dimen=2, ordered=True)
+
+    blk.stage = TurbineBase(blk.stage_set, initialize=stage_config, idx_map=lambda idx: idx[0])
+    blk.extraction = Splitter(
+        blk.extraction_set,
+        property_package=property_package,
+        outlet_list=["extraction", "next_stage"],
+        split_basis=SplittingType.totalFlow,
+    )
+
+    blk.stage_to_extraction = Arc(
+        blk.extraction_set,
+        rule=lambda b, m, k: {"source": b.stage[m, k].outlet, "destination": b.extraction[m, k].inlet},
+    )
+    blk.extraction_to_stage = Arc(
+        blk.extraction_set,
+        rule=lambda b, m, k: {"source": b.extraction[m, k].next_stage, "destination": b.stage[m, k + 1].inlet},
+    )
+
+    blk.header_pressure = Var(blk.time, blk.header_set, initialize=1e5, units=units.Pa)
+
+    @blk.Constraint(blk.time, blk.stage_set)
+    def stage_outlet_pressure(b, t, m, k):
+        return b.stage[m, k].control_volume.properties_out[t].pressure == b.header_pressure[t, outlet_header[m, k]]
+
+    # Later stages take their inlet pressure from the extraction splitter
+    if link_inlets:
+        @blk.Constraint(blk.time, blk.inlet_stage_set)
+        def stage_inlet_pressure(b, t, m, k):
+            return b.stage[m, k].control_volume.properties_in[t].pressure == b.header_pressure[t, inlet_header[m, k]]
+
+    @blk.Expression(blk.time, blk.header_set)
+    def header_supply(b, t, h):
+        extracted, exhausted = supply[h]
+        return (
+            sum(b.extraction[s].extraction_state[t].flow_mass for s in extracted)
+            + sum(b.stage[s].control_volume.properties_out[t].flow_mass for s in exhausted)
+        )
+
+    # (inlet header, outlet header) of each stage
+    blk.stage_headers = {s: (inlet_header[s], outlet_header[s]) for s in stages}
+
+    if expand_arcs:
+        TransformationFactory("network.expand_arcs").apply_to(blk)
+    return blk
+
+
+def initialize_turbine_network(blk, routine="explicit", profiler=NULL_PROFILER):
+    """
+    Initialise the stages and splitters of each machine in flow order.
+
+    Stage pressures are set from header_pressure, with the outlet pressure
+    fixed while each stage is initialised so the unit is square.
+    """
+    for m, k in blk.stage_set:
+        stage = blk.stage[m, k]
+        inlet, outlet = blk.stage_headers[m, k]
+        if k > 0:
+            propagate_state(blk.extraction_to_stage[m, k - 1])
+        cv = stage.control_volume
+        for t in blk.time:
+            if k == 0:
+                cv.properties_in[t].pressure.set_value(value(blk.header_pressure[t, inlet]))
+            cv.properties_out[t].pressure.fix(value(blk.header_pressure[t, outlet]))
+        with profiler.phase("initialize", unit=stage.name):
+            stage.initialize(routine=routine)
+        for t in blk.time:
+            cv.properties_out[t].pressure.unfix()
+
+        if (m, k) in blk.extraction_set:
+            propagate_state(blk.stage_to_extraction[m, k])
+            with profiler.phase("initialize", unit=blk.extraction[m, k].name):
+                blk.extraction[m, k].initialize()
@@ -0,0 +1,117 @@
+'''
+Warm-start store for the series turbine flowsheet.
+
+Solved variable values are recorded per scenario with to_json and the
+nearest stored solution (in normalised params space) is loaded back with
+from_json before the next solve. Multi-period params (one value per period,
+see multi_period.period_params) are flattened, and only match stored
+solutions with the same number of periods. Only unfixed variables are stored and
+restored, so the fixed inputs of the new scenario are left untouched.
+'''
+
+from collections import OrderedDict
+
+import numpy as np
+
+from idaes.core.util import to_json, from_json, StoreSpec
+
+from .series_turbine import PARAM_KEYS
+
+
+class WarmStartCache:
+    """
+    Bounded LRU store of solved model states keyed by scenario params.
+
+    Args:
+        max_size: maximum number of stored solutions, the least recently
+            used solution is evicted first
+        max_distance: largest normalised distance that counts as a hit,
+            None to always use the nearest stored solution
+        scales: dict of params key to normalising range, keys not given are
+            normalised by the range of the stored scenarios
+    """
+
+    def __init__(self, max_size=100, max_distance=None, scales=None):
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self.scales = dict(scales) if scales is not None else {}
+        self._store = OrderedDict()  # params vector -> model state dict
+        self.hits = 0
+        self.misses = 0
+        self._cold_iterations = []
+        self._warm_iterations = []
+
+    def __len__(self):
+        return len(self._store)
+
+    @staticmethod
+    def _vector(params):
+        # Scalar and per-period entries flattened in PARAM_KEYS order
+        return tuple(float(v) for k in PARAM_KEYS for v in np.ravel(params[k]))
+
+    def _scale(self, points, columns):
+        # Per-key normalising range, from the given scales or the stored points
+        span = np.ptp(points, axis=0)
+        for i, k in enumerate(columns):
+            if k in self.scales:
+                span[i] = self.scales[k]
+        span[span <= 0] = 1.0
+        return span
+
+    def nearest(self, params):
+        """Return (key, distance) of the nearest stored solution or (None, None)"""
+        x = np.array(self._vector(params))
+        keys = [key for key in self._store if len(key) == len(x)]
+        if not keys:
+            return None, None
+        columns = [k for k in PARAM_KEYS for _ in range(np.size(params[k]))]
+        points = np.array(keys)
+        span = self._scale(np.vstack([points, x]), columns)
+        distance = np.sqrt((((points - x) / span) ** 2).sum(axis=1))
+        i = int(np.argmin(distance))
+        return keys[i], float(distance[i])
+
+    def load(self, model, params):
+        """
+        Load the nearest stored solution into model. Returns True on a hit.
+        """
+        key, distance = self.nearest(params)
+        if key is None or (self.max_distance is not None and distance > self.max_distance):
+            self.misses += 1
+            return False
+
+        self._store.move_to_end(key)
+        from_json(model, sd=self._store[key], wts=StoreSpec.value(only_not_fixed=True))
+        self.hits += 1
+        return True
+
+    def store(self, model, params):
+        """Record the current (solved) variable values of model for params"""
+        key = self._vector(params)
+        self._store[key] = to_json(model, return_dict=True, wts=StoreSpec.value(only_not_fixed=True))
+        self._store.move_to_end(key)
+        while len(self._store) > self.max_size:
+            self._store.popitem(last=False)
+
+    def record_iterations(self, iterations, warm):
+        if iterations is None:
+            return
+        if warm:
+            self._warm_iterations.append(iterations)
+        else:
+            self._cold_iterations.append(iterations)
+
+    def report(self):
+        """Hit/miss counts and ipopt iterations of warm versus cold starts"""
+        n = self.hits + self.misses
+        cold = float(np.mean(self._cold_iterations)) if self._cold_iterations else None
+        warm = float(np.mean(self._warm_iterations)) if self._warm_iterations else None
+        return {
+            "size": len(self._store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / n if n else 0.0,
+            "mean_cold_iterations": cold,
+            "mean_warm_iterations": warm,
+            "iterations_saved_per_solve": cold - warm if cold is not None and warm is not None else None,
+        }
@@ -0,0 +1,222 @@
+'''
+Vectorised Willans line evaluation for historical DCS data.
+
+The Willans line correlations of TurbineBase (WILLANS_COEFFICIENTS) are
+evaluated with NumPy over arrays of operating points, so years of logged
+turbine data can be screened without building a Pyomo model per point.
+
+Everything is on a mass basis: flow in kg/s, enthalpy in J/kg, pressure in
+Pa and work in W. The Willans slope is returned in J/kg, TurbineBase holds it
+in J/mol (slope * molar mass), the other results do not depend on the basis.
+
+Isentropic enthalpy and saturation temperatures come from SteamTables, or
+can be passed in directly when already known.
+'''
+
+import numpy as np
+
+from .turbine_base_model import WILLANS_COEFFICIENTS, WILLANS_SMOOTHING_EPS
+
+
+_PRESSURE_METHODS = ("CT_willans", "BPST_willans")
+
+
+def _smooth_min(a, b, eps):
+    return 0.5 * (a + b - np.sqrt((a - b) ** 2 + eps ** 2))
+
+
+def willans_parameters(calculation_method, P_in, P_out, Tsat_in=None, Tsat_out=None, coefficients=None):
+    """
+    Willans a [-], b [W] and efficiency [-] from the published correlations.
+
+    Args:
+        calculation_method: "CT_willans", "BPST_willans" or "Tsat_willans"
+        P_in, P_out: inlet and outlet pressure [Pa]
+        Tsat_in, Tsat_out: inlet and outlet saturation temperature [K],
+            required by Tsat_willans
+        coefficients: correlation coefficients, defaults to
+            WILLANS_COEFFICIENTS[calculation_method]
+    """
+    coeffs = coefficients if coefficients is not None else WILLANS_COEFFICIENTS[calculation_method]
+    if calculation_method in _PRESSURE_METHODS:
+        x = (1.0, np.asarray(P_in, dtype=float) / 1e5, np.asarray(P_out, dtype=float) / 1e5)
+        a, b, c = (sum(k * v for k, v in zip(coeffs[name], x)) for name in ("a", "b", "c"))
+        efficiency = 1 / (c + 1)
+    elif calculation_method == "Tsat_willans":
+        if Tsat_in is None or Tsat_out is None:
+            raise ValueError("Tsat_willans requires inlet and outlet saturation temperatures")
+        x = (1.0, np.asarray(Tsat_in, dtype=float) - np.asarray(Tsat_out, dtype=float))
+        a, b = (sum(k * v for k, v in zip(coeffs[name], x)) for name in ("a", "b"))
+        efficiency = np.full(np.shape(a), coeffs["efficiency"])
+    else:
+        raise ValueError(f"Unrecognised Willans calculation method '{calculation_method}'")
+    return a, b * 1000, efficiency
+
+
+def willans_work(
+    flow,
+    h_in,
+    P_in,
+    P_out,
+    max_flow,
+    calculation_method="CT_willans",
+    tables=None,
+    h_isentropic=None,
+    Tsat_in=None,
+    Tsat_out=None,
+    coefficients=None,
+    eps=WILLANS_SMOOTHING_EPS,
+):
+    """
+    Evaluate the Willans line of TurbineBase over arrays of operating points.
+
+    Args:
+        flow: inlet mass flow [kg/s]
+        h_in: inlet specific enthalpy [J/kg]
+        P_in, P_out: inlet and outlet pressure [Pa]
+        max_flow: mass flow at the top of the Willans line [kg/s]
+        calculation_method: "CT_willans", "BPST_willans" or "Tsat_willans"
+        tables: SteamTables used for any of h_isentropic, Tsat_in and
+            Tsat_out that are not given
+        h_isentropic: isentropic outlet enthalpy [J/kg]
+        Tsat_in, Tsat_out: saturation temperatures [K], Tsat_willans only
+        coefficients: correlation coefficients, see willans_parameters
+        eps: smoothing parameter of the work calculation
+
+    Returns:
+        dict of arrays: a, b, efficiency, h_isentropic, slope (J/kg),
+        intercept (W), work_mechanical (W, negative for work out)
+    """
+    flow, h_in, P_in, P_out, max_flow = np.broadcast_arrays(
+        *[np.asarray(v, dtype=float) for v in (flow, h_in, P_in, P_out, max_flow)]
+    )
+    if h_isentropic is None or (calculation_method == "Tsat_willans" and (Tsat_in is None or Tsat_out is None)):
+        if tables is None:
+            raise ValueError("SteamTables are required when isentropic enthalpy or Tsat are not given")
+    if h_isentropic is None:
+        h_isentropic = tables.h_ps(P_out, tables.s(P_in, h_in))
+    if calculation_method == "Tsat_willans":
+        Tsat_in = tables.Tsat(P_in) if Tsat_in is None else Tsat_in
+        Tsat_out = tables.Tsat(P_out) if Tsat_out is None else Tsat_out
+
+    a, b, efficiency = willans_parameters(calculation_method, P_in, P_out, Tsat_in, Tsat_out, coefficients)
+    dh = h_in - np.asarray(h_isentropic, dtype=float)
+    slope = 1 / (efficiency * a) * (dh - b / max_flow)
+    intercept = (1 - efficiency) / (efficiency * a) * (dh * max_flow - b)
+    full_load = slope * max_flow - intercept
+    work = _smooth_min(-(slope * flow - intercept) / full_load, 0.0, eps) * full_load
+
+    return {
+        "a": a,
+        "b": b,
+        "efficiency": efficiency,
+        "h_isentropic": h_isentropic,
+        "slope": slope,
+        "intercept": intercept,
+        "work_mechanical": work,
+    }
+
+
+def check_against_model(samples, max_flow, calculation_method="CT_willans", tables=None, solver_options=None):
+    """
+    Compare willans_work with the Pyomo TurbineBase model on sampled points.
+
+    The model is built once (Helmholtz, mass basis) and solved at each point.
+    The evaluator is given the model's isentropic enthalpy and saturation
+    temperatures, so the differences measure the Willans algebra alone. When
+    tables are given the isentropic enthalpy error of the tables is reported
+    as well.
+
+    Args:
+        samples: dict or DataFrame of arrays "flow" (kg/s), "enth_in" (J/kg),
+            "pressure_in" and "pressure_out" (Pa)
+        max_flow: mass flow at the top of the Willans line [kg/s]
+
+    Returns:
+        dict of the largest relative difference of each result and the
+        number of points compared
+    """
+    from pyomo.environ import ConcreteModel, SolverFactory, check_optimal_termination, value
+    from idaes.core import FlowsheetBlock
+    from idaes.models.properties.general_helmholtz import (
+        HelmholtzParameterBlock,
+        PhaseType,
+        StateVars,
+        AmountBasis,
+        )
+    from .turbine_base_model import TurbineBase
+
+    m = ConcreteModel()
+    m.fs = FlowsheetBlock(dynamic=False)
+    m.fs.water = HelmholtzParameterBlock(
+                    pure_component="h2o",
+                    phase_presentation=PhaseType.LG,
+                    state_vars=StateVars.PH,
+                    amount_basis=AmountBasis.MASS,
+                    )
+    m.fs.turbine = TurbineBase(property_package=m.fs.water, calculation_method=calculation_method)
+    turbine = m.fs.turbine
+    mw = value(m.fs.water.mw)
+    turbine.efficiency_motor.fix(1.0)
+    turbine.willans_max_mol.fix(max_flow / mw)
+
+    solver = SolverFactory("ipopt")
+    solver.options = dict(solver_options) if solver_options is not None else {"tol": 1e-8, "max_iter": 1000}
+
+    keys = ("a", "b", "efficiency", "slope", "intercept", "work_mechanical")
+    rows = {k: [] for k in keys + ("flow", "enth_in", "pressure_in", "pressure_out", "h_isentropic", "Tsat_in", "Tsat_out")}
+    initialised = False
+    for flow, h_in, P_in, P_out in zip(*(np.asarray(samples[k], dtype=float) for k in ("flow", "enth_in", "pressure_in", "pressure_out"))):
+        turbine.inlet.flow_mass.fix(flow)
+        turbine.inlet.enth_mass.fix(h_in)
+        turbine.inlet.pressure.fix(P_in)
+        turbine.outlet.pressure.fix(P_out)
+        if not initialised:
+            turbine.initialize()
+            initialised = True
+        if not check_optimal_termination(solver.solve(m)):
+            initialised = False
+            continue
+        rows["flow"].append(flow)
+        rows["enth_in"].append(h_in)
+        rows["pressure_in"].append(P_in)
+        rows["pressure_out"].append(P_out)
+        rows["h_isentropic"].append(value(turbine.properties_isentropic[0].enth_mass))
+        rows["Tsat_in"].append(value(turbine.control_volume.properties_in[0].temperature_sat))
+        rows["Tsat_out"].append(value(turbine.control_volume.properties_out[0].temperature_sat))
+        rows["a"].append(value(turbine.willans_a[0]))
+        rows["b"].append(value(turbine.willans_b[0]))
+        rows["efficiency"].append(value(turbine.willans_efficiency[0]))
+        rows["slope"].append(value(turbine.willans_slope[0]) / mw)
+        rows["intercept"].append(value(turbine.willans_intercept[0]))
+        rows["work_mechanical"].append(value(turbine.work_mechanical[0]))
+    rows = {k: np.array(v) for k, v in rows.items()}
+
+    result = willans_work(
+        rows["flow"], rows["enth_in"], rows["pressure_in"], rows["pressure_out"], max_flow,
+        calculation_method=calculation_method,
+        h_isentropic=rows["h_isentropic"],
+        Tsat_in=rows["Tsat_in"],
+        Tsat_out=rows["Tsat_out"],
+    )
+    report = {"n_points": int(len(rows["flow"]))}
+    for k in keys:
+        scale = np.maximum(np.abs(rows[k]), 1e-8)
+        report[k] = float(np.max(np.abs(result[k] - rows[k]) / scale)) if len(scale) else None
+    if tables is not None and len(rows["flow"]):
+        h_is = tables.h_ps(rows["pressure_out"], tables.s(rows["pressure_in"], rows["enth_in"]))
+        report["h_isentropic_table_error"] = float(np.max(np.abs(h_is - rows["h_isentropic"])))
+    return report
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    n = 20
+    samples = {
+        "flow": rng.uniform(5, 40, n),
+        "enth_in": rng.uniform(3.1e6, 3.4e6, n),
+        "pressure_in": rng.uniform(40e5, 60e5, n),
+        "pressure_out": rng.uniform(8e5, 12e5, n),
+    }
+    for method in ("CT_willans", "BPST_willans", "Tsat_willans"):
+        print(method, check_against_model(samples, max_flow=50.0, calculation_method=method))
@@ -0,0 +1,240 @@
+'''
+Fitting of the Willans line correlations to plant operating data.
+
+TurbineBase evaluates Willans a, b and efficiency from the published
+correlations (WILLANS_COEFFICIENTS) in inlet and outlet pressure (CT, BPST)
+or the saturation temperature drop (Tsat). fit_willans refits those
+coefficients for each machine from logged operating points: inlet and outlet
+pressure, inlet temperature, mass flow and electrical or shaft power.
+
+Writing L = flow / max_flow and dh for the isentropic enthalpy drop, the
+Willans line of TurbineBase gives the power produced as
+
+    W = (dh * max_flow - b) * (1 - (1 - L) * (c + 1)) / a
+
+with efficiency = 1 / (c + 1), and a, b and c linear in the correlation
+features. For fixed c this is linear in the a and b coefficients, so the fit
+starts from one linear least squares pass with the c coefficients of the
+published correlation, then refines all coefficients together by nonlinear
+least squares on the power residuals with an analytic Jacobian. Every step
+is vectorised over the rows, so a million operating points fit in seconds.
+
+Everything is on a mass basis: flow in kg/s, pressure in Pa, temperature in
+K and power in W. The returned coefficients are in the format of
+WILLANS_COEFFICIENTS and plug straight into TurbineBase:
+
+    coefficients, report = fit_willans(data, "CT_willans", tables)
+    m.fs.turbine = TurbineBase(
+        property_package=m.fs.water,
+        calculation_method="CT_willans",
+        willans_coefficients=coefficients["TG1"],
+    )
+'''
+
+import time
+
+import numpy as np
+from scipy.optimize import least_squares
+
+import idaes.logger as idaeslog
+
+from .turbine_base_model import WILLANS_COEFFICIENTS
+
+
+_log = idaeslog.getLogger(__name__)
+
+# Columns of the operating data
+DATA_COLUMNS = ("flow", "pressure_in", "pressure_out", "temperature_in", "power")
+
+
+def willans_features(calculation_method, P_in, P_out, Tsat_in=None, Tsat_out=None):
+    """
+    Features the correlation coefficients of calculation_method multiply,
+    as an (n, k) array: (1, P_in, P_out) in bar or (1, Tsat_in - Tsat_out) in K
+    """
+    P_in = np.asarray(P_in, dtype=float)
+    if calculation_method in ("CT_willans", "BPST_willans"):
+        return np.column_stack([np.ones_like(P_in), P_in / 1e5, np.asarray(P_out, dtype=float) / 1e5])
+    if calculation_method == "Tsat_willans":
+        return np.column_stack([np.ones_like(P_in), np.asarray(Tsat_in, dtype=float) - np.asarray(Tsat_out, dtype=float)])
+    raise ValueError(f"Unrecognised Willans calculation method '{calculation_method}'")
+
+
+class _WillansModel:
+    """
+    Power produced on the Willans line as a function of the stacked
+    coefficient vector (a, b, c), with its Jacobian.
+
+    Args:
+        X: (n, k) correlation features
+        dh: isentropic enthalpy drop [J/kg]
+        load: flow / max_flow [-]
+        max_flow: mass flow at the top of the Willans line [kg/s]
+        c_features: False when c (the efficiency) is a single constant, as
+            in the Tsat correlation
+    """
+
+    def __init__(self, X, dh, load, max_flow, c_features=True):
+        self.X = X
+        self.Xc = X if c_features else X[:, :1]
+        self.k = X.shape[1]
+        self.full = dh * max_flow
+        self.part = 1 - load
+
+    def split(self, p):
+        k = self.k
+        return p[:k], p[k: 2 * k], p[2 * k:]
+
+    def power(self, p):
+        alpha, beta, gamma = self.split(p)
+        a, b, c = self.X @ alpha, 1000 * (self.X @ beta), self.Xc @ gamma
+        return (self.full - b) * (1 - self.part * (c + 1)) / a
+
+    def jacobian(self, p):
+        alpha, beta, gamma = self.split(p)
+        a, b, c = self.X @ alpha, 1000 * (self.X @ beta), self.Xc @ gamma
+        g = 1 - self.part * (c + 1)
+        W = (self.full - b) * g / a
+        return np.hstack([
+            (-W / a)[:, None] * self.X,
+            (-1000 * g / a)[:, None] * self.X,
+            (-(self.full - b) * self.part / a)[:, None] * self.Xc,
+        ])
+
+    def linear_start(self, gamma, power):
+        # a * W + b * g = dh * max_flow * g is linear in the a and b coefficients for fixed c
+        g = 1 - self.part * (self.Xc @ gamma + 1)
+        A = np.hstack([power[:, None] * self.X, (1000 * g)[:, None] * self.X])
+        alpha_beta = np.linalg.lstsq(A, self.full * g, rcond=None)[0]
+        return np.concatenate([alpha_beta, gamma])
+
+
+def _coefficients(calculation_method, p, k):
+    alpha, beta, gamma = p[:k], p[k: 2 * k], p[2 * k:]
+    coeffs = {"a": tuple(float(x) for x in alpha), "b": tuple(float(x) for x in beta)}
+    if calculation_method == "Tsat_willans":
+        coeffs["efficiency"] = float(1 / (gamma[0] + 1))
+    else:
+        coeffs["c"] = tuple(float(x) for x in gamma)
+    return coeffs
+
+
+def _initial_c(calculation_method, coefficients):
+    if calculation_method == "Tsat_willans":
+        return np.array([1 / coefficients["efficiency"] - 1])
+    return np.array(coefficients["c"], dtype=float)
+
+
+def fit_willans_machine(
+    flow,
+    P_in,
+    P_out,
+    power,
+    max_flow,
+    h_in=None,
+    T_in=None,
+    calculation_method="CT_willans",
+    tables=None,
+    initial=None,
+    max_nfev=50,
+):
+    """
+    Fit the Willans correlation coefficients of one machine.
+
+    Args:
+        flow: inlet mass flow [kg/s]
+        P_in, P_out: inlet and outlet pressure [Pa]
+        power: power produced [W], positive
+        max_flow: mass flow at the top of the Willans line [kg/s]
+        h_in, T_in: inlet specific enthalpy [J/kg] or, if not given, inlet
+            temperature [K]
+        calculation_method: "CT_willans", "BPST_willans" or "Tsat_willans"
+        tables: SteamTables for the inlet enthalpy, isentropic enthalpy and
+            saturation temperatures
+        initial: starting coefficients, defaults to the published correlation
+        max_nfev: largest number of residual evaluations of the refinement
+
+    Returns:
+        (coefficients in the format of WILLANS_COEFFICIENTS, report dict of
+        n_points, rmse and max_abs_error [W] and r2 of the fitted power)
+    """
+    flow, P_in, P_out, power = (np.asarray(v, dtype=float) for v in (flow, P_in, P_out, power))
+    if h_in is None:
+        h_in = tables.h(T_in, P_in)
+    h_in = np.asarray(h_in, dtype=float)
+    dh = h_in - tables.h_ps(P_out, tables.s(P_in, h_in))
+    Tsat_in = Tsat_out = None
+    if calculation_method == "Tsat_willans":
+        Tsat_in, Tsat_out = tables.Tsat(P_in), tables.Tsat(P_out)
+    X = willans_features(calculation_method, P_in, P_out, Tsat_in, Tsat_out)
+
+    # Points on the Willans line: positive flow and power below the clipping at zero work
+    keep = np.isfinite(X).all(axis=1) & np.isfinite(dh) & np.isfinite(power) & (flow > 0) & (power > 0)
+    if keep.sum() < 2 * X.shape[1] + 1:
+        raise ValueError(f"Too few operating points on the Willans line to fit {calculation_method}: {int(keep.sum())}")
+    model = _WillansModel(
+        X[keep], dh[keep], flow[keep] / max_flow, max_flow, c_features=calculation_method != "Tsat_willans"
+    )
+    power = power[keep]
+
+    initial = initial if initial is not None else WILLANS_COEFFICIENTS[calculation_method]
+    p0 = model.linear_start(_initial_c(calculation_method, initial), power)
+    scale = max(float(np.std(power)), 1.0)
+    fit = least_squares(
+        lambda p: (model.power(p) - power) / scale,
+        p0,
+        jac=lambda p: model.jacobian(p) / scale,
+        x_scale="jac",
+        max_nfev=max_nfev,
+    )
+    residual = model.power(fit.x) - power
+    report = {
+        "n_points": int(keep.sum()),
+        "rmse": float(np.sqrt(np.mean(residual**2))),
+        "max_abs_error": float(np.max(np.abs(residual))),
+        "r2": float(1 - np.sum(residual**2) / np.sum((power - power.mean()) ** 2)),
+        "status": fit.message,
+    }
+    return _coefficients(calculation_method, fit.x, X.shape[1]), report
+
+
+def fit_willans(data, calculation_method="CT_willans", tables=None, max_flow=None, machine="machine"):
+    """
+    Fit the Willans correlation coefficients of every machine in a table of
+    operating data.
+
+    Args:
+        data: DataFrame with DATA_COLUMNS (flow [kg/s], pressure_in and
+            pressure_out [Pa], temperature_in [K], power produced [W]) and a
+            machine column, or "enth_in" [J/kg] in place of temperature_in
+        calculation_method: "CT_willans", "BPST_willans" or "Tsat_willans"
+        tables: SteamTables
+        max_flow: dict of machine to mass flow at the top of the Willans line
+            [kg/s], defaults to the largest logged flow of each machine
+        machine: name of the machine column, None if data holds one machine
+
+    Returns:
+        (dict of machine to coefficients, dict of machine to fit report)
+    """
+    if tables is None:
+        raise ValueError("SteamTables are required to fit Willans correlations")
+    groups = data.groupby(machine, sort=False) if machine is not None else [(None, data)]
+    coefficients, reports = {}, {}
+    for name, df in groups:
+        start = time.perf_counter()
+        mf = (max_flow or {}).get(name, float(df["flow"].max()))
+        coefficients[name], reports[name] = fit_willans_machine(
+            df["flow"].to_numpy(),
+            df["pressure_in"].to_numpy(),
+            df["pressure_out"].to_numpy(),
+            df["power"].to_numpy(),
+            mf,
+            h_in=df["enth_in"].to_numpy() if "enth_in" in df else None,
+            T_in=df["temperature_in"].to_numpy() if "enth_in" not in df else None,
+            calculation_method=calculation_method,
+            tables=tables,
+        )
+        reports[name]["max_flow"] = mf
+        reports[name]["time"] = time.perf_counter() - start
+        _log.info(f"Fitted {calculation_method} for {name}: rmse {reports[name]['rmse']:.4g} W, r2 {reports[name]['r2']:.4f}")
+    return coefficients, reports
@@ -0,0 +1,293 @@
+'''
+Streaming reader and one-pass writer for the site workbook.
+
+An .xlsm file is a zip of XML parts. Loading it with openpyxl parses every
+sheet, the shared strings, styles, charts and external links before a single
+value can be read. Workbook opens only workbook.xml and its relationships,
+then streams the one sheet part it is asked for with iterparse, so the load
+time depends on the size of the sheets read and not on the rest of the
+workbook. Cached values are returned, formulas are never evaluated.
+
+write_cells copies every part of the zip unchanged except the sheets it
+writes to. Those are edited as text, one <row> at a time, so VBA
+(vbaProject.bin), charts, drawings, formulas and the namespace declarations
+Excel relies on are left exactly as they were. Cells holding a formula are
+never overwritten.
+'''
+
+import math
+import numbers
+import os
+import posixpath
+import re
+import tempfile
+import zipfile
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils.cell import column_index_from_string, coordinate_from_string, get_column_letter
+
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+_ROW = re.compile(r"<row\b[^>]*?(?:/>|>.*?</row>)", re.S)
+_CELL = re.compile(r"<c\b[^>]*?(?:/>|>.*?</c>)", re.S)
+_ROW_NUMBER = re.compile(r'\br="(\d+)"')
+_CELL_REF = re.compile(r'\br="([A-Z]+)(\d+)"')
+_STYLE = re.compile(r'\bs="(\d+)"')
+_SPANS = re.compile(r'\s+spans="[^"]*"')
+
+
+class Workbook:
+    """
+    Read-only view of a workbook that parses sheets on demand.
+
+    Args:
+        path: .xlsx or .xlsm file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        self._strings = None
+
+        rels = {}
+        with self._zip.open("xl/_rels/workbook.xml.rels") as f:
+            for _, elem in iterparse(f):
+                if elem.tag.endswith("Relationship"):
+                    target = elem.get("Target")
+                    if target.startswith("/"):
+                        target = target[1:]
+                    else:
+                        target = posixpath.normpath(posixpath.join("xl", target))
+                    rels[elem.get("Id")] = target
+        self.sheets = {}
+        with self._zip.open("xl/workbook.xml") as f:
+            for _, elem in iterparse(f):
+                if elem.tag == _NS + "sheet":
+                    self.sheets[elem.get("name")] = rels[elem.get(_REL_ID)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    def _shared_strings(self):
+        if self._strings is None:
+            self._strings = []
+            if "xl/sharedStrings.xml" in self._zip.namelist():
+                with self._zip.open("xl/sharedStrings.xml") as f:
+                    for _, elem in iterparse(f):
+                        if elem.tag == _NS + "si":
+                            # Rich text strings are split over several <t> runs
+                            self._strings.append("".join(t.text or "" for t in elem.iter(_NS + "t")))
+                            elem.clear()
+        return self._strings
+
+    def _cell_value(self, cell):
+        kind = cell.get("t", "n")
+        if kind == "inlineStr":
+            return "".join(t.text or "" for t in cell.iter(_NS + "t"))
+        v = cell.find(_NS + "v")
+        if v is None or v.text is None:
+            return None
+        if kind == "s":
+            return self._shared_strings()[int(v.text)]
+        if kind == "b":
+            return v.text == "1"
+        if kind in ("str", "e"):
+            return v.text
+        if any(c in v.text for c in ".eE"):
+            return float(v.text)
+        return int(v.text)
+
+    def iter_rows(self, sheet_name):
+        """
+        Yield the cached values of a sheet one row at a time, starting from
+        row 1 and column A. Missing rows are yielded as empty lists.
+        """
+        if sheet_name not in self.sheets:
+            raise KeyError(f"Workbook {self.path} has no sheet '{sheet_name}'")
+        expected = 1
+        with self._zip.open(self.sheets[sheet_name]) as f:
+            for _, elem in iterparse(f):
+                if elem.tag != _NS + "row":
+                    continue
+                r = int(elem.get("r", expected))
+                while expected < r:
+                    yield []
+                    expected += 1
+                row = []
+                for cell in elem.iter(_NS + "c"):
+                    col = column_index_from_string(coordinate_from_string(cell.get("r"))[0])
+                    row.extend([None] * (col - len(row)))
+                    row[col - 1] = self._cell_value(cell)
+                elem.clear()
+                yield row
+                expected = r + 1
+
+    def read_table(self, sheet_name, keys, n_rows=None):
+        """
+        Read a table whose header row holds any of keys, down to the first
+        row with no numeric value under those headers.
+
+        Returns:
+            DataFrame with one float column per key found in the header
+        """
+        columns = None
+        data = []
+        for row in self.iter_rows(sheet_name):
+            if columns is None:
+                columns = {c: j for j, c in enumerate(row) if c in keys} or None
+                continue
+            entry = {k: row[j] for k, j in columns.items() if j < len(row) and _is_number(row[j])}
+            if not entry:
+                break
+            data.append(entry)
+            if n_rows is not None and len(data) == n_rows:
+                break
+        if columns is None:
+            raise ValueError(f"No table found on sheet '{sheet_name}', expected a header row with any of {keys}")
+        return pd.DataFrame(data, columns=list(columns), dtype=float)
+
+
+def _is_number(v):
+    # numbers.Real covers Python and NumPy floats and integers
+    return isinstance(v, numbers.Real) and not isinstance(v, (bool, np.bool_))
+
+
+def _cell_xml(ref, value, style):
+    s = f' s="{style}"' if style is not None else ""
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{ref}"{s} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Integral):
+        return f'<c r="{ref}"{s}><v>{int(value)}</v></c>'
+    if _is_number(value):
+        value = float(value)
+        if not math.isfinite(value):
+            # Excel has no NaN or infinity, leave the cell blank
+            return f'<c r="{ref}"{s}/>'
+        return f'<c r="{ref}"{s}><v>{value!r}</v></c>'
+    return f'<c r="{ref}"{s} t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+
+def _write_row(row_xml, r, values):
+    # values: column index -> value, merged into the cells of an existing row
+    cells = {}
+    attrs, body = row_xml, ""
+    if not row_xml.endswith("/>"):
+        attrs, body = row_xml[: row_xml.index(">") + 1], row_xml[row_xml.index(">") + 1: -len("</row>")]
+    else:
+        attrs = row_xml[:-2] + ">"
+    for cell in _CELL.findall(body):
+        col = column_index_from_string(_CELL_REF.search(cell).group(1))
+        cells[col] = cell
+    for col, v in values.items():
+        ref = f"{get_column_letter(col)}{r}"
+        old = cells.get(col)
+        if old is not None and "<f" in old:
+            raise ValueError(f"Cell {ref} holds a formula and is not overwritten")
+        style = _STYLE.search(old.split(">", 1)[0]) if old is not None else None
+        cells[col] = _cell_xml(ref, v, style.group(1) if style else None)
+    # spans is only an optimisation hint and may no longer be right
+    return _SPANS.sub("", attrs) + "".join(cells[c] for c in sorted(cells)) + "</row>"
+
+
+def _write_sheet(xml, values):
+    # values: (row, column) -> value, None values are skipped
+    rows = {}
+    for (r, col), v in values.items():
+        if v is not None:
+            rows.setdefault(r, {})[col] = v
+    if not rows:
+        return xml
+
+    if "<sheetData/>" in xml:
+        xml = xml.replace("<sheetData/>", "<sheetData></sheetData>")
+    start = xml.index("<sheetData>") + len("<sheetData>")
+    end = xml.index("</sheetData>")
+    existing = {int(_ROW_NUMBER.search(row).group(1)): row for row in _ROW.findall(xml[start:end])}
+    for r, cols in rows.items():
+        existing[r] = _write_row(existing.get(r, f'<row r="{r}"/>'), r, cols)
+
+    xml = xml[:start] + "".join(existing[r] for r in sorted(existing)) + xml[end:]
+
+    # Grow the used range to cover the written cells
+    def dimension(match):
+        first, last = match.group(1), match.group(2) or match.group(1)
+        (c0, r0), (c1, r1) = coordinate_from_string(first), coordinate_from_string(last)
+        cols = [col for c in rows.values() for col in c]
+        return (
+            f'<dimension ref="{get_column_letter(min(column_index_from_string(c0), *cols))}{min(r0, *rows)}:'
+            f'{get_column_letter(max(column_index_from_string(c1), *cols))}{max(r1, *rows)}"/>'
+        )
+
+    return re.sub(r'<dimension ref="([A-Z]+\d+)(?::([A-Z]+\d+))?"/>', dimension, xml, count=1)
+
+
+def write_cells(path, cells, out_path=None, full_calc_on_load=True):
+    """
+    Write values to one or more sheets in a single pass over the workbook.
+
+    Args:
+        path: workbook to update
+        cells: dict of sheet name to a dict of (row, column) -> value, rows
+            and columns numbered from 1, values numbers, bools or strings
+        out_path: file to write, defaults to replacing path
+        full_calc_on_load: ask Excel to recalculate the formulas that depend
+            on the written cells when the workbook is next opened
+
+    Raises:
+        ValueError if any target cell holds a formula, in which case the
+        workbook is left unchanged
+    """
+    with Workbook(path) as wb:
+        parts = {}
+        for sheet_name in cells:
+            if sheet_name not in wb.sheets:
+                raise KeyError(f"Workbook {path} has no sheet '{sheet_name}'")
+            parts[wb.sheets[sheet_name]] = cells[sheet_name]
+
+    out_path = out_path or path
+    fd, tmp = tempfile.mkstemp(suffix=os.path.splitext(out_path)[1], dir=os.path.dirname(os.path.abspath(out_path)))
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(path) as zin, zipfile.ZipFile(tmp, "w") as zout:
+            for info in zin.infolist():
+                data = zin.read(info)
+                if info.filename in parts:
+                    data = _write_sheet(data.decode("utf-8"), parts[info.filename]).encode("utf-8")
+                elif info.filename == "xl/workbook.xml" and full_calc_on_load:
+                    text = data.decode("utf-8")
+                    if "fullCalcOnLoad" not in text:
+                        text = text.replace("<calcPr ", '<calcPr fullCalcOnLoad="1" ', 1)
+                    data = text.encode("utf-8")
+                zout.writestr(info, data)
+        os.replace(tmp, out_path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return out_path
+
+
+def results_cells(records, anchor, columns=None):
+    """
+    Lay out a list of results records as a table: a header row of column
+    names at anchor (e.g. "B40") and one row per record beneath it.
+    """
+    if columns is None:
+        columns = list(dict.fromkeys(k for record in records for k in record))
+    col, row = coordinate_from_string(anchor)
+    col = column_index_from_string(col)
+    cells = {(row, col + j): name for j, name in enumerate(columns)}
+    for i, record in enumerate(records, start=1):
+        for j, name in enumerate(columns):
+            cells[row + i, col + j] = record.get(name)
+    return cells
@@ -0,0 +1,105 @@
+'''
+Consistency of the vectorised Willans evaluator (scripts.willans) with the
+TurbineBase model.
+
+The algebra tests need NumPy only. The model tests solve TurbineBase on
+sampled points and are skipped without ipopt or the Helmholtz library.
+'''
+
+import numpy as np
+import pytest
+from pyomo.environ import SolverFactory
+from idaes.core.util.math import smooth_min
+from idaes.models.properties.general_helmholtz import helmholtz_available
+
+from scripts.turbine_base_model import WILLANS_COEFFICIENTS, WILLANS_SMOOTHING_EPS
+from scripts.willans import _smooth_min, check_against_model, willans_parameters, willans_work
+from scripts.willans_fit import willans_features
+
+
+solver_available = SolverFactory("ipopt").available(exception_flag=False) and helmholtz_available()
+
+# Sampled operating points of each method, pressures in Pa, CT exhausts below atmospheric
+SAMPLE_PRESSURES = {
+    "CT_willans": ((40e5, 45e5), (0.5e5, 0.7e5)),
+    "BPST_willans": ((40e5, 45e5), (10e5, 12e5)),
+    "Tsat_willans": ((40e5, 45e5), (10e5, 12e5)),
+}
+MAX_FLOW = 60.0  # kg/s
+
+
+def _samples(calculation_method, n=5, seed=0):
+    rng = np.random.default_rng(seed)
+    (p_in_low, p_in_high), (p_out_low, p_out_high) = SAMPLE_PRESSURES[calculation_method]
+    return {
+        "flow": rng.uniform(20, 50, n),
+        "enth_in": rng.uniform(3.12e6, 3.2e6, n),
+        "pressure_in": rng.uniform(p_in_low, p_in_high, n),
+        "pressure_out": rng.uniform(p_out_low, p_out_high, n),
+    }
+
+
+@pytest.mark.parametrize("x", [-5.0, -1e-3, 0.0, 1e-3, 5.0])
+@pytest.mark.parametrize("eps", [WILLANS_SMOOTHING_EPS, 1e-4])
+def test_smooth_min_matches_idaes(x, eps):
+    assert _smooth_min(np.array([x]), 0.0, eps)[0] == pytest.approx(smooth_min(x, 0.0, eps), rel=1e-12, abs=1e-15)
+
+
+def test_smooth_min_limits():
+    x = np.array([-10.0, -1.0, 1.0, 10.0])
+    assert np.allclose(_smooth_min(x, 0.0, 1e-8), np.minimum(x, 0.0), atol=1e-8)
+    assert np.all(_smooth_min(x, 0.0, 0.1) <= np.minimum(x, 0.0))
+
+
+@pytest.mark.parametrize("calculation_method", ["CT_willans", "BPST_willans"])
+def test_pressure_parameters_use_coefficients(calculation_method):
+    P_in, P_out = np.array([42e5, 45e5]), np.array([0.6e5, 11e5])
+    coeffs = WILLANS_COEFFICIENTS[calculation_method]
+    X = willans_features(calculation_method, P_in, P_out)
+    a, b, efficiency = willans_parameters(calculation_method, P_in, P_out)
+    assert np.allclose(a, X @ coeffs["a"])
+    assert np.allclose(b, 1000 * (X @ coeffs["b"]))
+    assert np.allclose(efficiency, 1 / (X @ coeffs["c"] + 1))
+
+
+def test_Tsat_parameters_use_coefficients():
+    Tsat_in, Tsat_out = np.array([527.0, 530.0]), np.array([457.0, 460.0])
+    coeffs = WILLANS_COEFFICIENTS["Tsat_willans"]
+    a, b, efficiency = willans_parameters("Tsat_willans", None, None, Tsat_in, Tsat_out)
+    assert np.allclose(a, coeffs["a"][0] + coeffs["a"][1] * 70.0)
+    assert np.allclose(b, 1000 * (coeffs["b"][0] + coeffs["b"][1] * 70.0))
+    assert np.allclose(efficiency, coeffs["efficiency"])
+
+
+def test_configured_coefficients_replace_published():
+    coeffs = {"a": (1.0, 0.0, 0.0), "b": (0.0, 0.0, 0.0), "c": (0.25, 0.0, 0.0)}
+    a, b, efficiency = willans_parameters("BPST_willans", 42e5, 11e5, coefficients=coeffs)
+    assert (float(a), float(b), float(efficiency)) == pytest.approx((1.0, 0.0, 0.8))
+
+
+def test_work_on_the_willans_line():
+    flow = np.array([0.0, 10.0, 30.0, MAX_FLOW])
+    h_in, h_isentropic = 3.17e6, 2.9e6
+    result = willans_work(
+        flow, h_in, 42e5, 11e5, MAX_FLOW, calculation_method="BPST_willans", h_isentropic=h_isentropic, eps=1e-10
+    )
+    a, b, efficiency = willans_parameters("BPST_willans", 42e5, 11e5)
+    dh = h_in - h_isentropic
+    slope = (dh - b / MAX_FLOW) / (efficiency * a)
+    intercept = (1 - efficiency) / (efficiency * a) * (dh * MAX_FLOW - b)
+    assert np.allclose(result["slope"], slope)
+    assert np.allclose(result["intercept"], intercept)
+    # Work out is negative, clipped at zero below the intercept flow
+    expected = -np.maximum(slope * flow - intercept, 0.0)
+    assert np.allclose(result["work_mechanical"], expected, rtol=1e-8, atol=1e-3)
+    assert result["work_mechanical"][-1] == pytest.approx(-(slope * MAX_FLOW - intercept))
+
+
+@pytest.mark.skipif(not solver_available, reason="ipopt or the Helmholtz library is not available")
+@pytest.mark.parametrize("calculation_method", ["CT_willans", "BPST_willans", "Tsat_willans"])
+def test_evaluator_matches_turbine_base(calculation_method):
+    samples = _samples(calculation_method)
+    report = check_against_model(samples, max_flow=MAX_FLOW, calculation_method=calculation_method)
+    assert report["n_points"] == len(samples["flow"])
+    for key in ("a", "b", "efficiency", "slope", "intercept", "work_mechanical"):
+        assert report[key] < 1e-5, key